@@ -0,0 +1,109 @@
+"""
+File: auto_exposure_menu.py
+Description: Executes the menu flow for the auto exposure analysis module
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+from src.modules.AE.ae_module import AutoExposureModule
+from src.menu.menu_common_func import (
+    back_to_tuning_tool_message,
+    print_and_select_menu,
+    get_yes_no_options,
+    end_tuning_tool,
+)
+from src.utils.gui_common_utils import generate_separator, menu_title
+
+
+class AutoExposureMenu:
+    """
+    Auto Exposure Analysis Menu
+    """
+
+    start_options = [
+        "Load Images",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    restart_ae_menu_options = [
+        "Restart the Auto Exposure Analysis Tool",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    def __init__(self, in_config_file):
+        self.ae_module = AutoExposureModule(in_config_file)
+
+    def start_menu(self):
+        """
+        Start menu for the module.
+        """
+        # Welcome note
+        self.welcome_to_ae()
+
+        while True:
+            choice = print_and_select_menu(self.start_options)
+
+            if choice == "1":
+                if not self.ae_module.is_images_selected():
+                    continue
+
+                generate_separator("Analysis Started", "*")
+                is_done = self.ae_module.execute()
+                generate_separator("Analysis Ended", "*")
+
+                if is_done:
+                    self.save_results_menu()
+
+                if self.restart_ae_menu() == "Tuning_tool":
+                    back_to_tuning_tool_message()
+                    break
+
+            elif choice == "2":
+                back_to_tuning_tool_message()
+                break
+
+            elif choice == "3":
+                end_tuning_tool()
+
+    def welcome_to_ae(self):
+        """
+        Welcome note for the module
+        """
+        os.system("cls")
+        menu_title("Welcome to the \033[36mAuto Exposure Analysis Tool\033[0m")
+        print("Images: raw (Name_WxH_Nbits_Bayer.raw), png or jpg")
+        print("The proposed targets assume the images are correctly exposed.\n")
+
+    def save_results_menu(self):
+        """
+        Ask user to save the statistics and the proposed AE targets
+        """
+        choice = print_and_select_menu(
+            get_yes_no_options(), "Do you want to save the statistics in a csv file?"
+        )
+        if choice == "1":
+            self.ae_module.save_report()
+
+        choice = print_and_select_menu(
+            get_yes_no_options(), "Save the proposed AE targets in configs.yml?"
+        )
+        if choice == "1":
+            self.ae_module.save_config_file_with_ae_targets()
+
+    def restart_ae_menu(self):
+        """
+        Menu apply to restart the module
+        """
+        while True:
+            choice = print_and_select_menu(self.restart_ae_menu_options)
+            if choice == "1":
+                self.welcome_to_ae()
+                return "Restart_ae"
+
+            elif choice == "2":
+                return "Tuning_tool"
+
+            elif choice == "3":
+                end_tuning_tool()
@@ -0,0 +1,129 @@
+"""
+File: auto_white_balance_menu.py
+Description: Executes the menu flow for the auto white balance evaluation module
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+from src.modules.AWB.awb_eval_module import AwbEvalModule
+from src.menu.menu_common_func import (
+    back_to_tuning_tool_message,
+    print_and_select_menu,
+    get_yes_no_options,
+    end_tuning_tool,
+)
+from src.utils.gui_common_utils import generate_separator, menu_title
+
+
+class AutoWhiteBalanceMenu:
+    """
+    Auto White Balance Evaluation Menu
+    """
+
+    start_options = [
+        "Evaluate with a Ground Truth File",
+        "Create the Ground Truth from ColorChecker Images and Evaluate",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    params_options = [
+        "Thresholds of configs.yml",
+        "Sweep of the Thresholds",
+    ]
+
+    restart_awb_menu_options = [
+        "Restart the Auto White Balance Evaluation Tool",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    def __init__(self, in_config_file):
+        self.awb_module = AwbEvalModule(in_config_file)
+
+    def start_menu(self):
+        """
+        Start menu for the module.
+        """
+        # Welcome note
+        self.welcome_to_awb()
+
+        while True:
+            choice = print_and_select_menu(self.start_options)
+
+            if choice in ["1", "2"]:
+                if not self.awb_module.is_images_selected():
+                    continue
+
+                if choice == "1" and not self.awb_module.is_ground_truth_loaded():
+                    continue
+
+                if choice == "2":
+                    if not self.awb_module.create_ground_truth():
+                        print("\033[31mError!\033[0m No ground truth is calculated.")
+                        generate_separator("", "*")
+                        continue
+                    self.awb_module.save_ground_truth()
+
+                params_choice = print_and_select_menu(
+                    self.params_options, "Select the AWB parameters to evaluate:"
+                )
+
+                generate_separator("Evaluation Started", "*")
+                is_done = self.awb_module.execute(is_sweep=params_choice == "2")
+                generate_separator("Evaluation Ended", "*")
+
+                if is_done:
+                    self.save_results_menu()
+
+                if self.restart_awb_menu() == "Tuning_tool":
+                    back_to_tuning_tool_message()
+                    break
+
+            elif choice == "3":
+                back_to_tuning_tool_message()
+                break
+
+            elif choice == "4":
+                end_tuning_tool()
+
+    def welcome_to_awb(self):
+        """
+        Welcome note for the module
+        """
+        os.system("cls")
+        menu_title("Welcome to the \033[36mAuto White Balance Evaluation Tool\033[0m")
+        print("Images: raw (Name_WxH_Nbits_Bayer.raw), png or jpg")
+        print("Ground truth file: csv with the columns file, r_gain and b_gain\n")
+
+    def save_results_menu(self):
+        """
+        Ask user to save the error statistics and the best thresholds
+        """
+        choice = print_and_select_menu(
+            get_yes_no_options(), "Do you want to save the errors in a csv file?"
+        )
+        if choice == "1":
+            self.awb_module.save_report()
+
+        choice = print_and_select_menu(
+            get_yes_no_options(), "Save the best AWB thresholds in configs.yml?"
+        )
+        if choice == "1":
+            self.awb_module.save_config_file_with_awb_thresholds()
+
+    def restart_awb_menu(self):
+        """
+        Menu apply to restart the module
+        """
+        while True:
+            choice = print_and_select_menu(self.restart_awb_menu_options)
+            if choice == "1":
+                self.welcome_to_awb()
+                return "Restart_awb"
+
+            elif choice == "2":
+                return "Tuning_tool"
+
+            elif choice == "3":
+                end_tuning_tool()
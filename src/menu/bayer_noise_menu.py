@@ -11,9 +11,12 @@ from src.menu.menu_common_func import (
     back_to_tuning_tool_message,
     print_and_select_menu,
     get_main_menu_options,
+    get_yes_no_options,
     end_tuning_tool,
+    ask_user_for_session_image,
+    ask_user_for_patches,
 )
-from src.utils.gui_common_utils import menu_title
+from src.utils.gui_common_utils import generate_separator, menu_title
 
 
 class BNEMenu:
@@ -21,9 +24,6 @@ class BNEMenu:
     Noise Estimation Tool
     """
 
-    # Define object of noise estimation module
-    bne_module = BNE()
-
     # Options for opening image
     open_image_menu_options = [
         "Load Raw Image",
@@ -38,12 +38,24 @@ class BNEMenu:
         "Quit\n",
     ]
 
+    tune_bnr_menu_options = [
+        "Recommend BNR Parameters",
+        "Add Another Exposure to the Noise Model",
+        "Skip\n",
+    ]
+
     restart_bne_menu_options = [
         "Restart the Bayer Noise Estimation Tool",
         "Return to the Main Menu",
         "Quit\n",
     ]
 
+    def __init__(self, in_config_file=None, workspace=None):
+        self.workspace = workspace
+
+        # Define object of noise estimation module
+        self.bne_module = BNE(in_config_file, workspace)
+
     def start_menu(self):
         """
         Start menu for the module.
@@ -60,14 +72,19 @@ class BNEMenu:
             choice = print_and_select_menu(get_main_menu_options())
 
             if choice == "1":
-                # Get raw image and its parameters.
-                is_loaded = self.bne_module.is_image_and_para_loaded()
+                # Get raw image and its parameters, the raw image of the
+                # session can be used instead.
+                is_loaded = self.bne_module.is_image_and_para_loaded(
+                    ask_user_for_session_image(self.workspace, raw_only=True)
+                )
                 if not is_loaded:
                     continue
 
                 # Allow user to select color checker patches. If patches are not
                 # selected or saved then display another menu for area selection again.
-                is_selection_done = self.bne_module.color_checker_selection_frame()
+                is_selection_done = self.bne_module.color_checker_selection_frame(
+                    ask_user_for_patches(self.workspace, self.bne_module.raw_image_para)
+                )
                 if not is_selection_done:
                     area_selection_error()
                     selection_status = self.start_frame_selection_menu()
@@ -76,9 +93,15 @@ class BNEMenu:
                         back_to_tuning_tool_message()
                         break
 
+                # Ask user to apply black levels before estimation.
+                self.ask_user_for_blc()
+
                 # Calculate Noise Estimation.
                 self.bne_module.implement_bne_algo()
 
+                # Recommend the BNR parameters from the estimated noise.
+                self.tune_bnr_menu()
+
                 apply_menu_status = self.restart_bne_menu()
 
                 if apply_menu_status == "Tuning_tool":
@@ -107,6 +130,22 @@ class BNEMenu:
         print("File name format: Name_WxH_Nbits_Bayer.raw")
         print("For example: ColorChecker_2592x1536_12bits_RGGB.raw\n")
 
+    def ask_user_for_blc(self):
+        """
+        Ask user to apply the black levels from the config
+        file before estimating noise levels
+        """
+        generate_separator("", "-")
+        choice = print_and_select_menu(
+            get_yes_no_options(), "Apply Black Levels from configs.yml?"
+        )
+
+        if choice == "1":
+            self.bne_module.set_blc_flag(True)
+
+        elif choice == "2":
+            self.bne_module.set_blc_flag(False)
+
     def start_frame_selection_menu(self):
         """
         Display selection frame menu
@@ -137,6 +176,7 @@ class BNEMenu:
         while True:
             choice = print_and_select_menu(self.restart_bne_menu_options)
             if choice == "1":
+                self.bne_module.reset_noise_model()
                 self.welcome_to_bne()
                 return "Restart_ne"
 
@@ -145,3 +185,35 @@ class BNEMenu:
 
             elif choice == "3":
                 end_tuning_tool()
+
+    def tune_bnr_menu(self):
+        """
+        Menu to recommend the BNR parameters, the noise model can use the
+        gray patches of multiple exposures of the ColorChecker.
+        """
+        while True:
+            choice = print_and_select_menu(self.tune_bnr_menu_options)
+
+            if choice == "1":
+                generate_separator("BNR Tuning Started", "*")
+                self.bne_module.implement_bnr_tuning()
+
+                save_choice = print_and_select_menu(
+                    get_yes_no_options(), "Save the BNR parameters in configs.yml?"
+                )
+                if save_choice == "1":
+                    self.bne_module.save_config_file_with_bnr_params()
+                return
+
+            if choice == "2":
+                if not self.bne_module.is_image_and_para_loaded():
+                    continue
+
+                if not self.bne_module.color_checker_selection_frame():
+                    area_selection_error()
+                    continue
+
+                self.bne_module.implement_bne_algo()
+
+            elif choice == "3":
+                return
@@ -26,10 +26,20 @@ class BlackLevelCalibrationMenu:
     start_options = [
         "Calculate Black Levels",
         "Apply Black Levels",
+        "Apply Black Levels on a Directory",
+        "Calculate Black Level Map",
+        "Analyze Row/Column FPN",
         "Return to the Main Menu",
         "Quit\n",
     ]
 
+    block_size_options = ["16", "32", "64", "128"]
+
+    levels_source_options = [
+        "Black Levels from configs.yml for all Files",
+        "Per-file Black Levels from a CSV File",
+    ]
+
     config_file_menu_options = [
         "Save config.yml with Calculated Black Levels",
         "Apply Calculated Black Levels",
@@ -103,10 +113,28 @@ class BlackLevelCalibrationMenu:
                     break
 
             elif opt == "3":
+                # Applying BLC on all the raw files of a directory
+                self.start_blc_batch_menu()
+
+            elif opt == "4":
+                # Calculating the spatial black level map
+                break_flag = self.start_blc_map_menu()
+
+            elif opt == "5":
+                # Analyzing the row and column FPN of dark frames
+                if self.blc_module.execute_fpn():
+                    save_choice = print_and_select_menu(
+                        get_yes_no_options(),
+                        message="Do you want to save the FPN report?",
+                    )
+                    if save_choice == "1":
+                        self.blc_module.save_fpn_report()
+
+            elif opt == "6":
                 back_to_tuning_tool_message()
                 break
 
-            elif opt == "4":
+            elif opt == "7":
                 end_tuning_tool()
 
             if break_flag is True or restart_flag is True:
@@ -149,6 +177,66 @@ class BlackLevelCalibrationMenu:
                 end_tuning_tool()
                 return True, False
 
+    def start_blc_batch_menu(self):
+        """
+        Menu flow for applying BLC on a directory of raw files
+        """
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        blc_levels = yaml_file.get_blc_data()
+
+        source_choice = print_and_select_menu(
+            self.levels_source_options, message="Select the source of black levels:"
+        )
+        is_per_file = source_choice == "2"
+
+        lin_choice = print_and_select_menu(
+            get_yes_no_options(), message="Do you want to apply linearization?"
+        )
+
+        self.blc_module.set_blc_para(lin_choice == "1")
+        return self.blc_module.apply_blc_levels_on_directory(blc_levels, is_per_file)
+
+    def start_blc_map_menu(self):
+        """
+        Menu flow for calculating the black level map
+        """
+        while True:
+            # Loading raw black image for the map calibration
+            choice = print_and_select_menu(get_main_menu_options())
+            if choice == "1":
+                image_loaded = self.blc_module.is_image_and_para_loaded()
+                if not image_loaded:
+                    continue
+
+                size_choice = print_and_select_menu(
+                    self.block_size_options, message="Select the block size:"
+                )
+                block_size = int(self.block_size_options[int(size_choice) - 1])
+
+                fpn_choice = print_and_select_menu(
+                    get_yes_no_options(),
+                    message="Do you want to evaluate the residual FPN?",
+                )
+
+                generate_separator("Calculation Started", "*")
+                self.blc_module.execute_map(block_size, fpn_choice == "1")
+                generate_separator("Calculation Ended", "*")
+
+                save_choice = print_and_select_menu(
+                    get_yes_no_options(),
+                    message="Do you want to save the black level map in configs.yml?",
+                )
+                if save_choice == "1":
+                    self.blc_module.save_config_file_with_black_level_map()
+                return False
+
+            elif choice == "2":
+                back_to_tuning_tool_message()
+                return True
+
+            elif choice == "3":
+                end_tuning_tool()
+
     def apply_restart_menu(self):
         """
         Start config menu
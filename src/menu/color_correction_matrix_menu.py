@@ -14,6 +14,8 @@ from src.menu.menu_common_func import (
     get_yes_no_options,
     end_tuning_tool,
     generate_separator,
+    ask_user_for_session_image,
+    ask_user_for_patches,
 )
 from src.utils.gui_common_utils import menu_title
 
@@ -62,9 +64,10 @@ class ColorCorrectionMatrixMenu:
         "Quit\n",
     ]
 
-    def __init__(self, in_config_file):
+    def __init__(self, in_config_file, workspace=None):
         self.in_config_file = in_config_file
-        self.ccm_module = CcmModule(in_config_file)
+        self.workspace = workspace
+        self.ccm_module = CcmModule(in_config_file, workspace)
         self.restart_ccm = False
 
     def start_menu(self):
@@ -90,9 +93,12 @@ class ColorCorrectionMatrixMenu:
 
             if choice == "0" or choice == "1":
                 if choice == "1":
-                    # Return true if image and its parameters are loaded.
+                    # Return true if image and its parameters are loaded, the
+                    # image of the session can be used instead.
                     self.restart_ccm = False
-                    image_loaded = self.ccm_module.is_image_and_para_loaded()
+                    image_loaded = self.ccm_module.is_image_and_para_loaded(
+                        ask_user_for_session_image(self.workspace)
+                    )
                     if not image_loaded:
                         continue
 
@@ -106,7 +112,16 @@ class ColorCorrectionMatrixMenu:
                 # not selected or saved then display another menu for
                 # area selection agian.
                 if choice == "1" or restart_color_checker == "2":
-                    patches_selected = self.ccm_module.color_checker_selection_frame()
+                    # The patches of the session or a stored patch geometry
+                    # can be used instead of the selection frame
+                    selection_frame = None
+                    if choice == "1":
+                        selection_frame = ask_user_for_patches(
+                            self.workspace, self.ccm_module.raw_image_para
+                        )
+                    patches_selected = self.ccm_module.color_checker_selection_frame(
+                        selection_frame
+                    )
                     if not patches_selected:
                         area_selection_error()
                         selection_status = self.start_frame_selection_menu()
@@ -118,6 +133,9 @@ class ColorCorrectionMatrixMenu:
                 # Get required parameters compulsory to run algo
                 print("\033[32mParameters required for ccm algorithm:\033[0m")
 
+                # Ask user to calculate statistics on the raw data.
+                self.ask_user_for_raw_stats()
+
                 # Ask user to apply white balance.
                 self.ask_user_for_wb()
 
@@ -262,6 +280,27 @@ class ColorCorrectionMatrixMenu:
         elif choice == "2":
             self.ccm_module.set_wb_flag(False)
 
+    def ask_user_for_raw_stats(self):
+        """
+        Ask user to calculate the patch statistics on the black level
+        corrected raw data, only asked if a raw image is loaded.
+        """
+        if not self.ccm_module.is_raw_image_loaded():
+            self.ccm_module.set_raw_stats_flag(False)
+            return
+
+        generate_separator("", "-")
+        choice = print_and_select_menu(
+            get_yes_no_options(),
+            "Calculate patch statistics on the raw data (black levels from configs.yml)?",
+        )
+
+        if choice == "1":
+            self.ccm_module.set_raw_stats_flag(True)
+
+        elif choice == "2":
+            self.ccm_module.set_raw_stats_flag(False)
+
     def update_choice(self, choice):
         """
         This function is used to give the one option above the
@@ -0,0 +1,115 @@
+"""
+File: dead_pixel_menu.py
+Description: Executes the menu flow for the defective pixels detection module
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+from src.modules.DPC.dpc_module import DefectPixelModule
+from src.menu.menu_common_func import (
+    back_to_tuning_tool_message,
+    print_and_select_menu,
+    get_yes_no_options,
+    end_tuning_tool,
+)
+from src.utils.gui_common_utils import generate_separator, menu_title
+
+
+class DeadPixelMenu:
+    """
+    Defective Pixels Detection Menu
+    """
+
+    start_options = [
+        "Scan Dark Frames",
+        "Scan Flat Frames",
+        "Scan Dark and Flat Frames",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    restart_dpc_menu_options = [
+        "Restart the Defective Pixels Detection Tool",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    def __init__(self, in_config_file):
+        self.dpc_module = DefectPixelModule(in_config_file)
+
+    def start_menu(self):
+        """
+        Start menu for the module.
+        """
+        # Welcome note
+        self.welcome_to_dpc()
+
+        while True:
+            choice = print_and_select_menu(self.start_options)
+
+            if choice in ["1", "2", "3"]:
+                # Dark frames are scanned for hot pixels and flat
+                # frames for both hot and dead pixels
+                is_loaded = self.dpc_module.is_frames_loaded(
+                    scan_dark=choice in ["1", "3"], scan_flat=choice in ["2", "3"]
+                )
+                if not is_loaded:
+                    continue
+
+                generate_separator("Detection Started", "*")
+                self.dpc_module.execute()
+                generate_separator("Detection Ended", "*")
+
+                self.save_results_menu()
+
+                if self.restart_dpc_menu() == "Tuning_tool":
+                    back_to_tuning_tool_message()
+                    break
+
+            elif choice == "4":
+                back_to_tuning_tool_message()
+                break
+
+            elif choice == "5":
+                end_tuning_tool()
+
+    def welcome_to_dpc(self):
+        """
+        Welcome note for the module
+        """
+        os.system("cls")
+        menu_title("Welcome to the \033[36mDefective Pixels Detection Tool\033[0m")
+        print("File name format: Name_WxH_Nbits_Bayer.raw")
+        print("For example: Dark_1920x1080_12bits_BGGR.raw\n")
+
+    def save_results_menu(self):
+        """
+        Ask user to save the defect list and the recommended threshold
+        """
+        choice = print_and_select_menu(
+            get_yes_no_options(), "Do you want to save the defect list?"
+        )
+        if choice == "1":
+            self.dpc_module.save_defect_list()
+
+        choice = print_and_select_menu(
+            get_yes_no_options(), "Save the recommended dp_threshold in configs.yml?"
+        )
+        if choice == "1":
+            self.dpc_module.save_config_file_with_dp_threshold()
+
+    def restart_dpc_menu(self):
+        """
+        Menu apply to restart the module
+        """
+        while True:
+            choice = print_and_select_menu(self.restart_dpc_menu_options)
+            if choice == "1":
+                self.welcome_to_dpc()
+                return "Restart_dpc"
+
+            elif choice == "2":
+                return "Tuning_tool"
+
+            elif choice == "3":
+                end_tuning_tool()
@@ -0,0 +1,110 @@
+"""
+File: lens_shading_menu.py
+Description: Executes the menu flow for the lens shading calibration module
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+from src.modules.LSC.lsc_module import LensShadingModule
+from src.menu.menu_common_func import (
+    back_to_tuning_tool_message,
+    print_and_select_menu,
+    get_yes_no_options,
+    end_tuning_tool,
+)
+from src.utils.gui_common_utils import generate_separator, menu_title
+
+
+class LensShadingMenu:
+    """
+    Lens Shading Calibration Menu
+    """
+
+    start_options = [
+        "Load Flat-field Images",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    block_size_options = ["16", "32", "64", "128"]
+
+    restart_lsc_menu_options = [
+        "Restart the Lens Shading Calibration Tool",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    def __init__(self, in_config_file):
+        self.lsc_module = LensShadingModule(in_config_file)
+
+    def start_menu(self):
+        """
+        Start menu for the module.
+        """
+        # Welcome note
+        self.welcome_to_lsc()
+
+        while True:
+            choice = print_and_select_menu(self.start_options)
+
+            if choice == "1":
+                if not self.lsc_module.is_frames_loaded():
+                    continue
+
+                size_choice = print_and_select_menu(
+                    self.block_size_options, message="Select the block size:"
+                )
+                block_size = int(self.block_size_options[int(size_choice) - 1])
+
+                fit_choice = print_and_select_menu(
+                    get_yes_no_options(),
+                    message="Fit a polynomial surface on the gain grids?",
+                )
+
+                generate_separator("Calculation Started", "*")
+                is_done = self.lsc_module.execute(block_size, fit_choice == "1")
+                generate_separator("Calculation Ended", "*")
+
+                if is_done:
+                    save_choice = print_and_select_menu(
+                        get_yes_no_options(),
+                        message="Do you want to save the gains in configs.yml?",
+                    )
+                    if save_choice == "1":
+                        self.lsc_module.save_config_file_with_lsc_gains()
+
+                if self.restart_lsc_menu() == "Tuning_tool":
+                    back_to_tuning_tool_message()
+                    break
+
+            elif choice == "2":
+                back_to_tuning_tool_message()
+                break
+
+            elif choice == "3":
+                end_tuning_tool()
+
+    def welcome_to_lsc(self):
+        """
+        Welcome note for the module
+        """
+        os.system("cls")
+        menu_title("Welcome to the \033[34mLens Shading Calibration Tool\033[0m")
+        print("File name format: Name_WxH_Nbits_Bayer.raw")
+        print("For example: Flat_1920x1080_12bits_BGGR.raw\n")
+
+    def restart_lsc_menu(self):
+        """
+        Menu apply to restart the module
+        """
+        while True:
+            choice = print_and_select_menu(self.restart_lsc_menu_options)
+            if choice == "1":
+                self.welcome_to_lsc()
+                return "Restart_lsc"
+
+            elif choice == "2":
+                return "Tuning_tool"
+
+            elif choice == "3":
+                end_tuning_tool()
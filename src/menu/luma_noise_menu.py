@@ -13,6 +13,8 @@ from src.menu.menu_common_func import (
     get_main_menu_options,
     get_yes_no_options,
     end_tuning_tool,
+    ask_user_for_session_image,
+    ask_user_for_patches,
 )
 from src.utils.gui_common_utils import generate_separator, menu_title
 
@@ -22,9 +24,6 @@ class NEMenu:
     Noise Estimation Tool
     """
 
-    # Define object of noise estimation module
-    ne_module = NE()
-
     # Options for open area selection frame
     selection_frame_menu_options = [
         "Open ColorcChecker Selection Frame",
@@ -38,6 +37,12 @@ class NEMenu:
         "Quit\n",
     ]
 
+    def __init__(self, in_config_file, workspace=None):
+        self.workspace = workspace
+
+        # Define object of noise estimation module
+        self.ne_module = NE(in_config_file, workspace)
+
     def start_menu(self):
         """
         Start menu for the module.
@@ -52,14 +57,19 @@ class NEMenu:
             choice = print_and_select_menu(get_main_menu_options())
 
             if choice == "1":
-                # Get raw image and its parameters.
-                is_loaded = self.ne_module.is_image_and_para_loaded()
+                # Get raw image and its parameters, the image of the
+                # session can be used instead.
+                is_loaded = self.ne_module.is_image_and_para_loaded(
+                    ask_user_for_session_image(self.workspace)
+                )
                 if not is_loaded:
                     continue
 
                 # Allow user to select color checker patches. If patches are not
                 # selected or saved then display another menu for area selection again.
-                is_selection_done = self.ne_module.color_checker_selection_frame()
+                is_selection_done = self.ne_module.color_checker_selection_frame(
+                    ask_user_for_patches(self.workspace, self.ne_module.raw_image_para)
+                )
                 if not is_selection_done:
                     area_selection_error()
                     selection_status = self.start_frame_selection_menu()
@@ -73,6 +83,9 @@ class NEMenu:
 
                 self.ne_module.implement_ne_algo(ask_user)
 
+                # Ask user to sweep the 2DNR parameter on the same patches.
+                self.ask_user_for_nr2d_sweep()
+
                 apply_menu_status = self.restart_ne_menu()
 
                 if apply_menu_status == "Tuning_tool":
@@ -155,3 +168,22 @@ class NEMenu:
 
         if choice == "2":
             return "2"
+
+    def ask_user_for_nr2d_sweep(self):
+        """
+        Ask user to sweep the 2DNR parameter and to save the recommended one
+        """
+        choice = print_and_select_menu(
+            get_yes_no_options(), "Sweep the 2DNR parameter (wts) on the gray patches?"
+        )
+        if choice != "1":
+            return
+
+        generate_separator("2DNR Sweep Started", "*")
+        self.ne_module.implement_nr2d_sweep()
+
+        choice = print_and_select_menu(
+            get_yes_no_options(), "Save the recommended wts in configs.yml?"
+        )
+        if choice == "1":
+            self.ne_module.save_config_file_with_2dnr_wts()
@@ -9,6 +9,8 @@ import sys
 import questionary
 from prompt_toolkit.styles import Style
 from src.utils.gui_common_utils import generate_separator, menu_title
+from src.utils.algo_common_utils import select_file
+from src.utils.patch_geometry import StoredPatchGeometry
 
 main_menu_options = [
     "Load an Image",
@@ -97,6 +99,80 @@ def area_selection_error():
     generate_separator("", "*")
 
 
+def ask_user_for_session_image(workspace, raw_only=False):
+    """
+    Ask user to use the image loaded in the session workspace instead of
+    loading a new one. Returns the parameters of the image to reuse, None
+    if there is no (raw) image in the workspace or a new one is loaded.
+    """
+    if workspace is None or workspace.get_image(raw_only) is None:
+        return None
+
+    choice = print_and_select_menu(
+        get_yes_no_options(),
+        "Use the loaded image \033[32m" + workspace.get_image_name() + "\033[0m?",
+    )
+    if choice == "1":
+        return workspace.get_image(raw_only)
+    return None
+
+
+def ask_user_for_patches(workspace, raw_image_para):
+    """
+    Ask user how to get the ColorChecker patches of the loaded image: the
+    patches selected on this image in the session workspace (if any), a
+    patch geometry stored for the camera setup or the selection frame.
+    Returns the selection to use, None if the selection frame is opened.
+    """
+    session_option = "Use the Patches Selected on This Image"
+    stored_option = "Load a Stored Patch Geometry"
+    patches_menu_options = ["Open ColorChecker Selection Frame", stored_option]
+    if workspace is not None and workspace.get_selection() is not None:
+        patches_menu_options.insert(0, session_option)
+
+    choice = print_and_select_menu(patches_menu_options)
+    selected_option = patches_menu_options[int(choice) - 1]
+
+    if selected_option == session_option:
+        return workspace.get_selection()
+
+    if workspace is not None:
+        workspace.invalidate_selection()
+
+    if selected_option == stored_option:
+        return load_stored_patches(raw_image_para)
+    return None
+
+
+def load_stored_patches(raw_image_para):
+    """
+    Allow user to select a patch geometry file and return the geometry
+    mapped on the loaded image, None if it is not loaded.
+    """
+    file_selected, file_name = select_file(
+        "Open a patch geometry file.", (("JSON Files", "*.json"),)
+    )
+    if not file_selected:
+        print("\033[31mError!\033[0m File is not selected.")
+        return None
+
+    height, width = raw_image_para.rgb_image.shape[:2]
+    stored_patches = StoredPatchGeometry.load(file_name.name, width, height)
+    if stored_patches is None:
+        print("\033[31mError!\033[0m Invalid patch geometry file.")
+        return None
+
+    if not stored_patches.is_aspect_ratio_matched():
+        print(
+            "\033[31mWarning!\033[0m The patch geometry is stored for images "
+            "of a different aspect ratio."
+        )
+    print(
+        "\033[32m" + os.path.basename(file_name.name) + "\033[0m" + " is loaded."
+    )
+    return stored_patches
+
+
 def remove_config_file():
     """
     Remove the configs.yml file that is present in the app_data folder.
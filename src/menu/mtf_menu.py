@@ -0,0 +1,104 @@
+"""
+File: mtf_menu.py
+Description: Executes the menu flow for the slanted edge MTF module
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+from src.modules.MTF.mtf_module import MtfModule
+from src.menu.menu_common_func import (
+    back_to_tuning_tool_message,
+    print_and_select_menu,
+    get_yes_no_options,
+    end_tuning_tool,
+)
+from src.utils.gui_common_utils import generate_separator, menu_title
+
+
+class MtfMenu:
+    """
+    Slanted Edge MTF Menu
+    """
+
+    start_options = [
+        "Load Images",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    restart_mtf_menu_options = [
+        "Restart the Sharpness (MTF) Measurement Tool",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    def __init__(self):
+        self.mtf_module = MtfModule()
+
+    def start_menu(self):
+        """
+        Start menu for the module.
+        """
+        # Welcome note
+        self.welcome_to_mtf()
+
+        while True:
+            choice = print_and_select_menu(self.start_options)
+
+            if choice == "1":
+                if not self.mtf_module.is_images_selected():
+                    continue
+
+                # Same ROIs are measured on all the images
+                if not self.mtf_module.is_rois_selected():
+                    continue
+
+                generate_separator("Measurement Started", "*")
+                is_done = self.mtf_module.execute()
+                generate_separator("Measurement Ended", "*")
+
+                if is_done:
+                    self.mtf_module.mtf_algo.show_mtf_curves()
+
+                    choice = print_and_select_menu(
+                        get_yes_no_options(), "Do you want to save the results in a csv file?"
+                    )
+                    if choice == "1":
+                        self.mtf_module.save_report()
+
+                if self.restart_mtf_menu() == "Tuning_tool":
+                    back_to_tuning_tool_message()
+                    break
+
+            elif choice == "2":
+                back_to_tuning_tool_message()
+                break
+
+            elif choice == "3":
+                end_tuning_tool()
+
+    def welcome_to_mtf(self):
+        """
+        Welcome note for the module
+        """
+        os.system("cls")
+        menu_title("Welcome to the \033[36mSharpness (MTF) Measurement Tool\033[0m")
+        print("Images: raw (Name_WxH_Nbits_Bayer.raw), png, jpg or tif")
+        print("Select ROIs of slanted edges (1-40 degrees), the same ROIs are")
+        print("measured on all the images, e.g. of a focus sweep.\n")
+
+    def restart_mtf_menu(self):
+        """
+        Menu apply to restart the module
+        """
+        while True:
+            choice = print_and_select_menu(self.restart_mtf_menu_options)
+            if choice == "1":
+                self.welcome_to_mtf()
+                return "Restart_mtf"
+
+            elif choice == "2":
+                return "Tuning_tool"
+
+            elif choice == "3":
+                end_tuning_tool()
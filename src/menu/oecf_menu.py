@@ -0,0 +1,104 @@
+"""
+File: oecf_menu.py
+Description: Executes the menu flow for the OECF calibration module
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+from src.modules.OECF.oecf_module import OecfModule
+from src.menu.menu_common_func import (
+    area_selection_error,
+    back_to_tuning_tool_message,
+    print_and_select_menu,
+    get_yes_no_options,
+    end_tuning_tool,
+)
+from src.utils.gui_common_utils import generate_separator, menu_title
+
+
+class OecfMenu:
+    """
+    OECF Calibration Menu
+    """
+
+    start_options = [
+        "Load an Exposure Series",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    restart_oecf_menu_options = [
+        "Restart the OECF Calibration Tool",
+        "Return to the Main Menu",
+        "Quit\n",
+    ]
+
+    def __init__(self, in_config_file):
+        self.oecf_module = OecfModule(in_config_file)
+
+    def start_menu(self):
+        """
+        Start menu for the module.
+        """
+        # Welcome note
+        self.welcome_to_oecf()
+
+        while True:
+            choice = print_and_select_menu(self.start_options)
+
+            if choice == "1":
+                if not self.oecf_module.is_series_loaded():
+                    continue
+
+                # Same patches are used for all the images of the series
+                if not self.oecf_module.color_checker_selection_frame():
+                    area_selection_error()
+                    continue
+
+                generate_separator("Calibration Started", "*")
+                is_done = self.oecf_module.execute()
+                generate_separator("Calibration Ended", "*")
+
+                if is_done:
+                    save_choice = print_and_select_menu(
+                        get_yes_no_options(),
+                        message="Do you want to save the LUT in configs.yml?",
+                    )
+                    if save_choice == "1":
+                        self.oecf_module.save_config_file_with_oecf_lut()
+
+                if self.restart_oecf_menu() == "Tuning_tool":
+                    back_to_tuning_tool_message()
+                    break
+
+            elif choice == "2":
+                back_to_tuning_tool_message()
+                break
+
+            elif choice == "3":
+                end_tuning_tool()
+
+    def welcome_to_oecf(self):
+        """
+        Welcome note for the module
+        """
+        os.system("cls")
+        menu_title("Welcome to the \033[35mOECF Calibration Tool\033[0m")
+        print("File name format: Name_expT_WxH_Nbits_Bayer.raw (T: relative exposure)")
+        print("For example: ColorChecker_exp10_2592x1536_12bits_RGGB.raw\n")
+
+    def restart_oecf_menu(self):
+        """
+        Menu apply to restart the module
+        """
+        while True:
+            choice = print_and_select_menu(self.restart_oecf_menu_options)
+            if choice == "1":
+                self.welcome_to_oecf()
+                return "Restart_oecf"
+
+            elif choice == "2":
+                return "Tuning_tool"
+
+            elif choice == "3":
+                end_tuning_tool()
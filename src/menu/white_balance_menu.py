@@ -11,7 +11,10 @@ from src.menu.menu_common_func import (
     back_to_tuning_tool_message,
     print_and_select_menu,
     get_main_menu_options,
+    get_yes_no_options,
     end_tuning_tool,
+    ask_user_for_session_image,
+    ask_user_for_patches,
 )
 from src.utils.gui_common_utils import generate_separator, menu_title
 
@@ -37,11 +40,12 @@ class WhiteBalanceMenu:
         "Quit\n",
     ]
 
-    def __init__(self, in_config_file):
+    def __init__(self, in_config_file, workspace=None):
         self.in_config_file = in_config_file
+        self.workspace = workspace
 
         # Define object of white balance module
-        self.wb_module = WBModule(in_config_file)
+        self.wb_module = WBModule(in_config_file, workspace)
 
     def start_menu(self):
         """
@@ -59,15 +63,20 @@ class WhiteBalanceMenu:
             choice = print_and_select_menu(get_main_menu_options())
 
             if choice == "1":
-                # Get raw image and its parameters.
-                image_loaded = self.wb_module.is_image_and_para_loaded()
+                # Get raw image and its parameters, the image of the
+                # session can be used instead.
+                image_loaded = self.wb_module.is_image_and_para_loaded(
+                    ask_user_for_session_image(self.workspace)
+                )
                 if not image_loaded:
                     continue
 
                 # Allow user to select color checker patches. If patches
                 # are not selected or saved then display another menu for
                 # area selection agian.
-                is_selection_done = self.wb_module.color_checker_selection_frame()
+                is_selection_done = self.wb_module.color_checker_selection_frame(
+                    ask_user_for_patches(self.workspace, self.wb_module.raw_image_para)
+                )
                 if not is_selection_done:
                     area_selection_error()
                     selection_status = self.start_frame_selection_menu()
@@ -76,6 +85,9 @@ class WhiteBalanceMenu:
                         back_to_tuning_tool_message()
                         break
 
+                # Ask user to calculate gains on the raw Bayer data.
+                self.ask_user_for_raw_domain()
+
                 # Calculate wb.
                 self.wb_module.implement_wb_algo()
                 generate_separator("", "*")
@@ -119,6 +131,27 @@ class WhiteBalanceMenu:
         print("Raw file name format: Name_WxH_Nbits_Bayer.raw")
         print("For example: ColorChecker_2592x1536_12bits_RGGB.raw\n")
 
+    def ask_user_for_raw_domain(self):
+        """
+        Ask user to calculate the gains on the raw Bayer data, only
+        asked if a raw image is loaded.
+        """
+        if not self.wb_module.is_raw_image_loaded():
+            self.wb_module.set_raw_domain(False)
+            return
+
+        generate_separator("", "-")
+        choice = print_and_select_menu(
+            get_yes_no_options(),
+            "Calculate gains on the raw Bayer data (black levels from configs.yml)?",
+        )
+
+        if choice == "1":
+            self.wb_module.set_raw_domain(True)
+
+        elif choice == "2":
+            self.wb_module.set_raw_domain(False)
+
     def start_frame_selection_menu(self):
         """
         Menu to open area selection frame
@@ -0,0 +1,204 @@
+"""
+File: ae_algo.py
+Description: Calculates the auto exposure statistics and proposes the AE targets
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import csv
+import numpy as np
+from src.utils.gui_common_utils import generate_separator
+from src.utils.algo_common_utils import get_bayer_channels
+
+
+class AutoExposureAlgo:
+    """
+    Auto Exposure Analysis
+    """
+
+    # Luminance weights of the R, G and B channels
+    lum_weights = np.array([0.299, 0.587, 0.114])
+
+    # Center weighted zones (rows x cols) for the weighted average luminance
+    zone_weights = np.array([[1, 1, 1], [1, 4, 1], [1, 1, 1]], dtype=np.float64)
+
+    # Decisions of the AE block of the ISP
+    decisions = {-1: "Underexposed", 0: "Correct", 1: "Overexposed"}
+
+    def __init__(self, center_illuminance, histogram_skewness, window_offset=(0, 0, 0, 0)):
+        """
+        center_illuminance : luminance (8 bits) around which the skewness is calculated
+        histogram_skewness : skewness range [-histogram_skewness, histogram_skewness]
+                             considered as correctly exposed
+        window_offset      : stats window offsets (top, bottom, left, right)
+        """
+        self.center_illuminance = center_illuminance
+        self.histogram_skewness = histogram_skewness
+        self.window_offset = window_offset
+
+        # Name, histogram and statistics of each analyzed image
+        self.names = []
+        self.histograms = []
+        self.stats = []
+
+    def get_luminance(self, raw_image_para):
+        """
+        Returns the 8 bits luminance of an image. For a raw image, the luminance
+        is calculated on the bayer channels (half resolution) and a gamma of 2.2
+        is applied to approximate the output of the ISP, as the AE block works
+        on the final 8 bits image.
+        """
+        if raw_image_para.raw_image is None:
+            return raw_image_para.rgb_image @ self.lum_weights
+
+        r_ch, gr_ch, gb_ch, b_ch = get_bayer_channels(
+            raw_image_para.raw_image, raw_image_para.bayer_pattern
+        )
+        rows = min(ch.shape[0] for ch in (r_ch, gr_ch, gb_ch, b_ch))
+        cols = min(ch.shape[1] for ch in (r_ch, gr_ch, gb_ch, b_ch))
+
+        g_ch = (gr_ch[:rows, :cols] / 2.0) + (gb_ch[:rows, :cols] / 2.0)
+        lum = (
+            self.lum_weights[0] * r_ch[:rows, :cols]
+            + self.lum_weights[1] * g_ch
+            + self.lum_weights[2] * b_ch[:rows, :cols]
+        )
+        lum = np.clip(lum / (2**raw_image_para.bit_depth - 1), 0, 1)
+        return 255 * lum ** (1 / 2.2)
+
+    def crop_stats_window(self, lum, is_raw):
+        """
+        Crop the stats window, the offsets are halved for the half
+        resolution luminance of a raw image.
+        """
+        top, bottom, left, right = (
+            off // 2 if is_raw else off for off in self.window_offset
+        )
+        return lum[top : lum.shape[0] - bottom, left : lum.shape[1] - right]
+
+    def get_histogram(self, lum):
+        """
+        Returns the 256 bins histogram of the 8 bits luminance.
+        """
+        lum = np.clip(np.rint(lum), 0, 255).astype(np.int64)
+        return np.bincount(lum.ravel(), minlength=256)
+
+    def get_skewness(self, histogram, centers):
+        """
+        Returns the skewness of the luminance around each of the given centers,
+        calculated from the histogram for all the centers at once.
+        """
+        centers = np.atleast_1d(np.asarray(centers, dtype=np.float64))
+        diff = np.arange(256)[np.newaxis, :] - centers[:, np.newaxis]
+        total = histogram.sum()
+
+        m_2 = (diff**2) @ histogram / total
+        m_3 = (diff**3) @ histogram / total
+        return np.divide(m_3, m_2**1.5, out=np.zeros_like(m_3), where=m_2 > 0)
+
+    def get_decision(self, skewness):
+        """
+        Simulate the decision of the AE block for the given skewness.
+        """
+        if skewness > self.histogram_skewness:
+            return 1
+        if skewness < -self.histogram_skewness:
+            return -1
+        return 0
+
+    def get_zone_means(self, lum):
+        """
+        Returns the mean luminance of each zone using block reductions.
+        """
+        zone_rows, zone_cols = self.zone_weights.shape
+        zone_h, zone_w = lum.shape[0] // zone_rows, lum.shape[1] // zone_cols
+        zones = lum[: zone_h * zone_rows, : zone_w * zone_cols].reshape(
+            zone_rows, zone_h, zone_cols, zone_w
+        )
+        return zones.mean(axis=(1, 3))
+
+    def analyze(self, name, raw_image_para):
+        """
+        Calculate the statistics of an image and simulate the AE decision.
+        """
+        is_raw = raw_image_para.raw_image is not None
+        lum = self.crop_stats_window(self.get_luminance(raw_image_para), is_raw)
+
+        histogram = self.get_histogram(lum)
+        zone_means = self.get_zone_means(lum)
+        skewness = float(self.get_skewness(histogram, self.center_illuminance)[0])
+
+        stats = {
+            "mean": float(np.arange(256) @ histogram / histogram.sum()),
+            "weighted_mean": float(
+                np.sum(zone_means * self.zone_weights) / self.zone_weights.sum()
+            ),
+            "skewness": skewness,
+            "decision": self.get_decision(skewness),
+        }
+
+        self.names.append(name)
+        self.histograms.append(histogram)
+        self.stats.append(stats)
+        return stats
+
+    def propose_targets(self, coverage=0.95):
+        """
+        Propose the AE targets, assuming the analyzed images are correctly exposed.
+        1) center_illuminance: the median of the centers around which the
+           skewness of each image is zero.
+        2) histogram_skewness: the range of the skewness (around the proposed
+           center) that covers the given ratio of the images.
+        """
+        centers = np.arange(256)
+        skew_curves = np.array(
+            [self.get_skewness(histogram, centers) for histogram in self.histograms]
+        )
+
+        # Skewness decreases with the center, so its zero crossing is
+        # the first center with a non-positive skewness.
+        zero_centers = np.argmax(skew_curves <= 0, axis=1)
+        center = int(np.median(zero_centers))
+
+        skewness = np.abs(skew_curves[:, center])
+        skew_range = float(np.ceil(np.quantile(skewness, coverage) * 100) / 100)
+        return center, skew_range
+
+    def display_report(self):
+        """
+        Display the statistics of all the images
+        """
+        generate_separator("Auto Exposure Statistics", "-")
+        print(
+            "{: <40}{: <10}{: <12}{: <10}{: <12}".format(
+                "Image", "Mean", "Wtd. Mean", "Skewness", "Decision"
+            )
+        )
+        for name, stats in zip(self.names, self.stats):
+            print(
+                "{: <40}{: <10}{: <12}{: <10}{: <12}".format(
+                    name[:38],
+                    f"{stats['mean']:.2f}",
+                    f"{stats['weighted_mean']:.2f}",
+                    f"{stats['skewness']:.3f}",
+                    self.decisions[stats["decision"]],
+                )
+            )
+        print()
+
+    def export_report(self, csv_file):
+        """
+        Save the statistics of all the images in a csv file.
+        """
+        with open(csv_file, "w", newline="", encoding="utf-8") as fil:
+            writer = csv.writer(fil)
+            writer.writerow(["Image", "Mean", "Weighted Mean", "Skewness", "Decision"])
+            for name, stats in zip(self.names, self.stats):
+                writer.writerow(
+                    [
+                        name,
+                        f"{stats['mean']:.4f}",
+                        f"{stats['weighted_mean']:.4f}",
+                        f"{stats['skewness']:.4f}",
+                        self.decisions[stats["decision"]],
+                    ]
+                )
@@ -0,0 +1,130 @@
+"""
+File: ae_module.py
+Description: Executes the module flow for the auto exposure analysis
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+from src.modules.AE.ae_algo import AutoExposureAlgo
+from src.utils.algo_common_utils import select_files, load_image_para
+from src.utils.gui_common_utils import file_saving_path, generate_separator
+from src.utils.read_yaml_file import ReadWriteYMLFile
+
+
+class AutoExposureModule:
+    """
+    Auto Exposure Analysis Module
+    """
+
+    # Extensions of the images that can be analyzed
+    image_extensions = (".raw", ".png", ".jpg", ".jpeg", ".bmp")
+
+    def __init__(self, in_config_file):
+        self.in_config_file = in_config_file
+        self.file_names = []
+        self.ae_algo = None
+        self.targets = None
+
+    def get_image_files(self, path):
+        """
+        Returns the sorted list of the images in a directory.
+        """
+        return [
+            os.path.join(path, file_name)
+            for file_name in sorted(os.listdir(path))
+            if file_name.lower().endswith(self.image_extensions)
+        ]
+
+    def is_images_selected(self):
+        """
+        Select the images (raw and / or rgb) to analyze.
+        """
+        file_type = (
+            ("Image Files", "*.raw *.png *.jpg *.jpeg *.bmp"),
+            ("RAW Files", "*.raw"),
+        )
+        is_selected, file_names = select_files("Open the images.", file_type)
+        if not is_selected:
+            print("\033[31mError!\033[0m File is not selected.")
+            generate_separator("", "*")
+            return False
+
+        self.file_names = list(file_names)
+        return True
+
+    def execute(self):
+        """
+        Analyze all the images with the AE parameters of the config file
+        and propose the AE targets.
+        """
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        center_illuminance, histogram_skewness = yaml_file.get_ae_data()
+        self.ae_algo = AutoExposureAlgo(
+            center_illuminance, histogram_skewness, yaml_file.get_ae_stats_window()
+        )
+
+        for file_name in self.file_names:
+            raw_image_para = load_image_para(file_name)
+            if raw_image_para is None:
+                print(
+                    f"\033[31mWarning!\033[0m {os.path.basename(file_name)} is skipped, "
+                    "invalid file name format or size."
+                )
+                continue
+            self.ae_algo.analyze(os.path.basename(file_name), raw_image_para)
+
+        if not self.ae_algo.stats:
+            print("\033[31mError!\033[0m No valid image is found.")
+            return False
+
+        self.ae_algo.display_report()
+        self.targets = self.ae_algo.propose_targets()
+        self.display_targets()
+        return True
+
+    def display_targets(self):
+        """
+        Display the current and the proposed AE targets
+        """
+        generate_separator("Proposed AE Targets", "-")
+        print(
+            f"center_illuminance = {self.ae_algo.center_illuminance} (current), "
+            f"{self.targets[0]} (proposed)"
+        )
+        print(
+            f"histogram_skewness = {self.ae_algo.histogram_skewness} (current), "
+            f"{self.targets[1]} (proposed)\n"
+        )
+
+    def save_report(self):
+        """
+        Save the statistics of all the images in a csv file.
+        """
+        file_path = file_saving_path(".csv", [("CSV Files", "*.csv")], "ae_stats.csv")
+        if not file_path:
+            print("\033[31mWarning!\033[0m File destination path is not selected.")
+            generate_separator("", "*")
+            return
+
+        self.ae_algo.export_report(file_path)
+        print(f"Report saved to:\n {file_path}")
+        generate_separator("", "*")
+
+    def save_config_file_with_ae_targets(self):
+        """
+        Save the proposed AE targets in Config File.
+        """
+        if not os.path.exists(self.in_config_file):
+            print(
+                "\n\033[31mError!\033[0m File configs.yml does "
+                'not exist in "app_data" directory.'
+            )
+            generate_separator("", "*")
+            return
+
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        yaml_file.set_ae_data(*self.targets)
+        yaml_file.save_file(self.in_config_file)
+
+        print("File saved at:", os.path.dirname(self.in_config_file))
+        generate_separator("", "*")
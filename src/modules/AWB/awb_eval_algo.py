@@ -0,0 +1,333 @@
+"""
+File: awb_eval_algo.py
+Description: Evaluates the auto white balance estimators over a set of images
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+import csv
+import time
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.modules.BLC.blc_algo import BlackLevelsAlgo
+from src.utils.algo_common_utils import load_image_para, get_bayer_channels
+from src.utils.gui_common_utils import generate_separator
+
+
+def get_awb_pixels(file_name, blc_levels, sat_levels, window_offset):
+    """
+    Returns the (N x 3) normalized [0, 1] RGB pixels of the stats window of an
+    image. For a raw image, the pixels are taken from the black level corrected
+    bayer channels (half resolution) as the AWB block of the ISP works on the
+    raw data. Returns None for an invalid image.
+    """
+    raw_image_para = load_image_para(file_name)
+    if raw_image_para is None:
+        return None
+
+    if raw_image_para.raw_image is None:
+        rgb = raw_image_para.rgb_image / 255.0
+        top, bottom, left, right = window_offset
+    else:
+        corrected_raw = BlackLevelsAlgo(raw_image_para).get_corrected_raw(
+            blc_levels, sat_levels
+        )
+        r_ch, gr_ch, gb_ch, b_ch = get_bayer_channels(
+            corrected_raw, raw_image_para.bayer_pattern
+        )
+        rows = min(ch.shape[0] for ch in (r_ch, gr_ch, gb_ch, b_ch))
+        cols = min(ch.shape[1] for ch in (r_ch, gr_ch, gb_ch, b_ch))
+        rgb = np.dstack(
+            [
+                r_ch[:rows, :cols],
+                (gr_ch[:rows, :cols] / 2.0) + (gb_ch[:rows, :cols] / 2.0),
+                b_ch[:rows, :cols],
+            ]
+        ) / (2**raw_image_para.bit_depth - 1)
+        top, bottom, left, right = (off // 2 for off in window_offset)
+
+    rgb = rgb[top : rgb.shape[0] - bottom, left : rgb.shape[1] - right]
+    return rgb.reshape(-1, 3).astype(np.float32)
+
+
+def gray_world(pixels):
+    """
+    Gray world: the average of the scene is achromatic.
+    """
+    return pixels.mean(axis=0, dtype=np.float64)
+
+
+def white_patch(pixels):
+    """
+    White patch: the brightest pixels (99th percentile of each
+    channel, to be robust to outliers) are achromatic.
+    """
+    return np.percentile(pixels, 99, axis=0)
+
+
+def pca_illuminant(pixels, ratio=0.035):
+    """
+    PCA based estimation (Cheng et al.): the principal component of the
+    pixels having the largest and the smallest projections on the mean
+    color direction.
+    """
+    mean_dir = pixels.mean(axis=0, dtype=np.float64)
+    mean_dir /= max(np.linalg.norm(mean_dir), np.finfo(np.float64).eps)
+
+    norms = np.maximum(np.linalg.norm(pixels, axis=1), np.finfo(np.float32).eps)
+    distance = np.abs(pixels @ mean_dir / norms - 1)
+
+    total = max(int(len(pixels) * ratio), 1)
+    order = np.argsort(distance)
+    selected = pixels[np.concatenate([order[:total], order[-total:]])].astype(np.float64)
+
+    _, eig_vectors = np.linalg.eigh(selected.T @ selected)
+    return np.abs(eig_vectors[:, -1])
+
+
+def evaluate_awb_on_file(file_name, blc_levels, sat_levels, window_offset, params):
+    """
+    Estimate the AWB gains of an image with all the given parameters, i.e.
+    (underexposed %, overexposed %, method). The image is loaded once and the
+    pixels range of each pixel is calculated once for all the thresholds.
+    This function runs in the worker processes and returns the file name,
+    dict of parameters to (r_gain, b_gain) and the error message (None on success).
+    """
+    pixels = get_awb_pixels(file_name, blc_levels, sat_levels, window_offset)
+    if pixels is None:
+        return file_name, {}, "Invalid file name format or size."
+
+    min_value = pixels.min(axis=1)
+    max_value = pixels.max(axis=1)
+
+    estimates = {}
+    for under_exp, over_exp, method in params:
+        # Same exclusion of the dark and the saturated pixels as the ISP
+        valid = (min_value >= under_exp / 100) & (max_value <= 1 - over_exp / 100)
+        if np.count_nonzero(valid) < 2:
+            continue
+
+        illuminant = AwbEvalAlgo.methods[method](pixels[valid])
+        if np.any(illuminant <= 0):
+            continue
+        estimates[(under_exp, over_exp, method)] = (
+            float(illuminant[1] / illuminant[0]),
+            float(illuminant[1] / illuminant[2]),
+        )
+
+    return file_name, estimates, None
+
+
+class AwbEvalAlgo:
+    """
+    Auto White Balance Evaluation
+    """
+
+    # AWB estimators, each returns the (R, G, B) illuminant of the pixels
+    methods = {
+        "gray_world": gray_world,
+        "white_patch": white_patch,
+        "pca": pca_illuminant,
+    }
+
+    # Estimator of the AWB block of the ISP, its thresholds are saved in the config
+    isp_method = "gray_world"
+
+    def __init__(
+        self, blc_levels, sat_levels, window_offset, under_exps, over_exps, methods=None,
+        workers=None,
+    ):
+        """
+        blc_levels    : black levels (R, Gr, Gb, B) of the raw images
+        sat_levels    : saturation levels for linearization, None to disable it
+        window_offset : stats window offsets (top, bottom, left, right)
+        under_exps    : underexposed percentages to evaluate
+        over_exps     : overexposed percentages to evaluate
+        methods       : names of the estimators to evaluate, None for all
+        workers       : total worker processes, None for the cpu count
+        """
+        self.blc_levels = tuple(blc_levels[:4])
+        self.sat_levels = None if sat_levels is None else tuple(sat_levels[:4])
+        self.window_offset = tuple(window_offset)
+        self.params = list(
+            product(under_exps, over_exps, methods if methods else list(self.methods))
+        )
+        self.workers = workers
+
+        self.estimates = {}
+        self.failed = {}
+        self.errors = {}
+        self.elapsed_time = 0
+
+    def evaluate(self, file_names):
+        """
+        Estimate the gains of all the images with all the parameters,
+        distributing the images on a process pool.
+        """
+        start_time = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(
+                    evaluate_awb_on_file,
+                    file_name,
+                    self.blc_levels,
+                    self.sat_levels,
+                    self.window_offset,
+                    self.params,
+                )
+                for file_name in file_names
+            ]
+            for future in futures:
+                file_name, estimates, error = future.result()
+                if error is None:
+                    self.estimates[os.path.basename(file_name)] = estimates
+                else:
+                    self.failed[os.path.basename(file_name)] = error
+        self.elapsed_time = time.perf_counter() - start_time
+
+        return self.estimates
+
+    @staticmethod
+    def read_ground_truth(csv_file):
+        """
+        Read the ground truth gains from a csv file having the
+        columns file, r_gain and b_gain.
+        """
+        ground_truth = {}
+        with open(csv_file, "r", newline="", encoding="utf-8") as fil:
+            for row in csv.DictReader(fil):
+                ground_truth[os.path.basename(row["file"])] = (
+                    float(row["r_gain"]),
+                    float(row["b_gain"]),
+                )
+        return ground_truth
+
+    @staticmethod
+    def write_ground_truth(csv_file, ground_truth):
+        """
+        Save the ground truth gains in a csv file.
+        """
+        with open(csv_file, "w", newline="", encoding="utf-8") as fil:
+            writer = csv.writer(fil)
+            writer.writerow(["file", "r_gain", "b_gain"])
+            for file_name, (r_gain, b_gain) in ground_truth.items():
+                writer.writerow([file_name, r_gain, b_gain])
+
+    @staticmethod
+    def get_angular_errors(gains, gt_gains):
+        """
+        Returns the angular errors (degrees) between the illuminants of
+        the estimated and the ground truth (N x 2) gains.
+        """
+        gains = np.asarray(gains, dtype=np.float64)
+        gt_gains = np.asarray(gt_gains, dtype=np.float64)
+
+        # Illuminant of the gains is (1 / r_gain, 1, 1 / b_gain)
+        est = np.column_stack([1 / gains[:, 0], np.ones(len(gains)), 1 / gains[:, 1]])
+        ref = np.column_stack(
+            [1 / gt_gains[:, 0], np.ones(len(gt_gains)), 1 / gt_gains[:, 1]]
+        )
+        cos = np.sum(est * ref, axis=1) / (
+            np.linalg.norm(est, axis=1) * np.linalg.norm(ref, axis=1)
+        )
+        return np.degrees(np.arccos(np.clip(cos, -1, 1)))
+
+    @staticmethod
+    def get_error_stats(errors):
+        """
+        Returns the usual statistics of the angular errors.
+        """
+        errors = np.sort(errors)
+        quartiles = np.percentile(errors, [25, 50, 75])
+        quarter = max(len(errors) // 4, 1)
+        return {
+            "mean": float(errors.mean()),
+            "median": float(quartiles[1]),
+            "trimean": float((quartiles[0] + 2 * quartiles[1] + quartiles[2]) / 4),
+            "best_25": float(errors[:quarter].mean()),
+            "worst_25": float(errors[-quarter:].mean()),
+            "max": float(errors[-1]),
+        }
+
+    def compare(self, ground_truth):
+        """
+        Calculate the angular error statistics of each parameter set on
+        the images having ground truth gains.
+        """
+        files = [name for name in self.estimates if name in ground_truth]
+        gt_gains = np.array([ground_truth[name] for name in files])
+
+        self.errors = {}
+        for param in self.params:
+            has_estimate = np.array([param in self.estimates[name] for name in files])
+            if not np.any(has_estimate):
+                continue
+
+            gains = [self.estimates[name][param] for name in files if param in self.estimates[name]]
+            errors = self.get_angular_errors(gains, gt_gains[has_estimate])
+            self.errors[param] = self.get_error_stats(errors)
+            self.errors[param]["images"] = int(has_estimate.sum())
+
+        return self.errors
+
+    def get_best_params(self, method=None):
+        """
+        Returns the parameters with the minimum median error (mean error in
+        case of a tie), for the given method or all the methods.
+        """
+        candidates = [
+            param for param in self.errors if method is None or param[2] == method
+        ]
+        if not candidates:
+            return None
+        return min(
+            candidates,
+            key=lambda param: (self.errors[param]["median"], self.errors[param]["mean"]),
+        )
+
+    def display_report(self):
+        """
+        Display the error statistics of all the parameters, sorted by the median error
+        """
+        generate_separator("AWB Angular Errors (degrees)", "-")
+        print(
+            f"Images evaluated = {len(self.estimates)}, failed = {len(self.failed)}, "
+            f"time = {self.elapsed_time:.2f} s\n"
+        )
+        for file_name, error in self.failed.items():
+            print(f"\033[31mError\033[0m {file_name}: {error}")
+
+        header = "{: <12}{: <7}{: <7}{: <8}{: <8}{: <8}{: <9}{: <9}{: <9}{: <7}"
+        print(
+            header.format(
+                "Method", "Under", "Over", "Mean", "Median", "Trimean",
+                "Best25", "Worst25", "Max", "Images",
+            )
+        )
+        for param in sorted(self.errors, key=lambda param: self.errors[param]["median"]):
+            stats = self.errors[param]
+            print(
+                header.format(
+                    param[2], param[0], param[1],
+                    f"{stats['mean']:.2f}", f"{stats['median']:.2f}",
+                    f"{stats['trimean']:.2f}", f"{stats['best_25']:.2f}",
+                    f"{stats['worst_25']:.2f}", f"{stats['max']:.2f}",
+                    stats["images"],
+                )
+            )
+        print()
+
+    def export_report(self, csv_file):
+        """
+        Save the error statistics of all the parameters in a csv file.
+        """
+        keys = ["mean", "median", "trimean", "best_25", "worst_25", "max", "images"]
+        with open(csv_file, "w", newline="", encoding="utf-8") as fil:
+            writer = csv.writer(fil)
+            writer.writerow(["method", "underexposed_percentage", "overexposed_percentage"] + keys)
+            for param, stats in self.errors.items():
+                writer.writerow(
+                    [param[2], param[0], param[1]]
+                    + [stats[key] if key == "images" else f"{stats[key]:.4f}" for key in keys]
+                )
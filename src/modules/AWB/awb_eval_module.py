@@ -0,0 +1,242 @@
+"""
+File: awb_eval_module.py
+Description: Executes the module flow for the auto white balance evaluation
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+from src.modules.AWB.awb_eval_algo import AwbEvalAlgo
+from src.modules.BLC.blc_algo import BlackLevelsAlgo
+from src.modules.WB.white_balance_algo import WhiteBalanceAlgo, RawWhiteBalanceAlgo
+from src.utils.algo_common_utils import (
+    select_file,
+    select_files,
+    load_image_para,
+    get_rgb_preview,
+)
+from src.utils.area_selection_frame import SelectAreaFrame as select_area_frame
+from src.utils.gui_common_utils import file_saving_path, generate_separator
+from src.utils.read_yaml_file import ReadWriteYMLFile
+
+
+class AwbEvalModule:
+    """
+    Auto White Balance Evaluation Module
+    """
+
+    # Extensions of the images that can be evaluated
+    image_extensions = (".raw", ".png", ".jpg", ".jpeg", ".bmp")
+
+    # Underexposed and overexposed percentages of the parameter sweep
+    sweep_percentages = [0, 1, 2, 5, 10]
+
+    def __init__(self, in_config_file):
+        self.in_config_file = in_config_file
+        self.file_names = []
+        self.ground_truth = {}
+        self.awb_algo = None
+        self.best_params = None
+
+    def get_image_files(self, path):
+        """
+        Returns the sorted list of the images in a directory.
+        """
+        return [
+            os.path.join(path, file_name)
+            for file_name in sorted(os.listdir(path))
+            if file_name.lower().endswith(self.image_extensions)
+        ]
+
+    def is_images_selected(self):
+        """
+        Select the images (raw and / or rgb) to evaluate.
+        """
+        file_type = (
+            ("Image Files", "*.raw *.png *.jpg *.jpeg *.bmp"),
+            ("RAW Files", "*.raw"),
+        )
+        is_selected, file_names = select_files("Open the images.", file_type)
+        if not is_selected:
+            print("\033[31mError!\033[0m File is not selected.")
+            generate_separator("", "*")
+            return False
+
+        self.file_names = list(file_names)
+        return True
+
+    def is_ground_truth_loaded(self):
+        """
+        Select the csv file of the ground truth gains (file, r_gain, b_gain).
+        """
+        is_selected, file_name = select_file(
+            "Open the ground truth file.", (("CSV Files", "*.csv"),)
+        )
+        if not is_selected:
+            print("\033[31mError!\033[0m File is not selected.")
+            generate_separator("", "*")
+            return False
+
+        try:
+            self.ground_truth = AwbEvalAlgo.read_ground_truth(file_name.name)
+        except (KeyError, ValueError):
+            print(
+                "\033[31mError!\033[0m Invalid ground truth file, "
+                "the columns must be file, r_gain and b_gain."
+            )
+            generate_separator("", "*")
+            return False
+
+        return True
+
+    def create_ground_truth(self):
+        """
+        Calculate the ground truth gains of each selected ColorChecker image
+        from its gray patches, as done by the white balance tool. The gains of
+        the raw images are calculated on the raw data, corrected with the black
+        levels of the config file, to match the domain of the AWB block.
+        """
+        self.ground_truth = {}
+        for file_name in self.file_names:
+            raw_image_para = load_image_para(file_name)
+            if raw_image_para is None:
+                print(f"\033[31mWarning!\033[0m {os.path.basename(file_name)} is skipped.")
+                continue
+
+            if raw_image_para.raw_image is not None:
+                raw_image_para.rgb_image = get_rgb_preview(raw_image_para)
+
+            print(f"Select the ColorChecker of {os.path.basename(file_name)}")
+            selection_frame = select_area_frame(raw_image_para.rgb_image)
+            if not selection_frame.data.is_data_saved:
+                print(f"\033[31mWarning!\033[0m {os.path.basename(file_name)} is skipped.")
+                continue
+
+            sub_rect_points = selection_frame.get_sub_rect_points()
+            chart_layout = selection_frame.get_chart_layout()
+            if raw_image_para.raw_image is None:
+                wb_algo = WhiteBalanceAlgo(
+                    raw_image_para.rgb_image, sub_rect_points, chart_layout
+                )
+            else:
+                corrected_raw = BlackLevelsAlgo(raw_image_para).get_config_corrected_raw(
+                    self.in_config_file
+                )
+                wb_algo = RawWhiteBalanceAlgo(
+                    raw_image_para, sub_rect_points, corrected_raw, chart_layout
+                )
+
+            self.ground_truth[os.path.basename(file_name)] = wb_algo.calculate_wb_gains()
+
+        return len(self.ground_truth) > 0
+
+    def save_ground_truth(self):
+        """
+        Save the ground truth gains in a csv file.
+        """
+        file_path = file_saving_path(
+            ".csv", [("CSV Files", "*.csv")], "awb_ground_truth.csv"
+        )
+        if not file_path:
+            print("\033[31mWarning!\033[0m File destination path is not selected.")
+            generate_separator("", "*")
+            return
+
+        AwbEvalAlgo.write_ground_truth(file_path, self.ground_truth)
+        print(f"Ground truth saved to:\n {file_path}")
+        generate_separator("", "*")
+
+    def execute(self, is_sweep, methods=None, workers=None):
+        """
+        Evaluate the AWB estimators on all the images, with the thresholds of
+        the config file or with a sweep of the thresholds.
+        """
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        blc_levels = yaml_file.get_blc_data()
+        sat_levels = yaml_file.get_blc_sat_data()
+
+        # Last value of the saturation data is the is_linear state
+        if not sat_levels[4]:
+            sat_levels = None
+
+        if is_sweep:
+            under_exps = over_exps = self.sweep_percentages
+        else:
+            under_exp, over_exp = yaml_file.get_awb_data()
+            under_exps, over_exps = [under_exp], [over_exp]
+
+        self.awb_algo = AwbEvalAlgo(
+            blc_levels,
+            sat_levels,
+            yaml_file.get_awb_stats_window(),
+            under_exps,
+            over_exps,
+            methods,
+            workers,
+        )
+
+        print(f"Evaluating {len(self.awb_algo.params)} parameter sets on "
+              f"{len(self.file_names)} images...")
+        self.awb_algo.evaluate(self.file_names)
+        if not self.awb_algo.compare(self.ground_truth):
+            print("\033[31mError!\033[0m No image with a ground truth is evaluated.")
+            return False
+
+        self.awb_algo.display_report()
+        self.best_params = self.awb_algo.get_best_params(AwbEvalAlgo.isp_method)
+        self.display_best_params()
+        return True
+
+    def display_best_params(self):
+        """
+        Display the best parameters overall and for the estimator of the ISP
+        """
+        generate_separator("Best Parameters", "-")
+        best = self.awb_algo.get_best_params()
+        print(
+            f"Overall        : {best[2]}, underexposed_percentage = {best[0]}, "
+            f"overexposed_percentage = {best[1]}"
+        )
+        if self.best_params is not None:
+            print(
+                f"ISP ({AwbEvalAlgo.isp_method}): underexposed_percentage = "
+                f"{self.best_params[0]}, overexposed_percentage = {self.best_params[1]}"
+            )
+        print()
+
+    def save_report(self):
+        """
+        Save the error statistics in a csv file.
+        """
+        file_path = file_saving_path(".csv", [("CSV Files", "*.csv")], "awb_errors.csv")
+        if not file_path:
+            print("\033[31mWarning!\033[0m File destination path is not selected.")
+            generate_separator("", "*")
+            return
+
+        self.awb_algo.export_report(file_path)
+        print(f"Report saved to:\n {file_path}")
+        generate_separator("", "*")
+
+    def save_config_file_with_awb_thresholds(self):
+        """
+        Save the best thresholds of the ISP estimator in Config File.
+        """
+        if self.best_params is None:
+            print(f"\033[31mError!\033[0m {AwbEvalAlgo.isp_method} is not evaluated.")
+            generate_separator("", "*")
+            return
+
+        if not os.path.exists(self.in_config_file):
+            print(
+                "\n\033[31mError!\033[0m File configs.yml does "
+                'not exist in "app_data" directory.'
+            )
+            generate_separator("", "*")
+            return
+
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        yaml_file.set_awb_data(self.best_params[0], self.best_params[1])
+        yaml_file.save_file(self.in_config_file)
+
+        print("File saved at:", os.path.dirname(self.in_config_file))
+        generate_separator("", "*")
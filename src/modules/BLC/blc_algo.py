@@ -6,13 +6,15 @@ Author: 10xEngineers
 """
 import os
 import numpy as np
-from fxpmath import Fxp
 from src.utils.gui_common_utils import (
     file_saving_path,
     generate_separator,
     pop_up_msg,
 )
 from src.utils.read_yaml_file import ReadWriteYMLFile
+from src.utils.algo_common_utils import get_bayer_channels
+from src.utils.fixed_point import FixedPoint
+from src.utils.profiling import timed
 
 
 class BlackLevelsAlgo:
@@ -56,15 +58,75 @@ class BlackLevelsAlgo:
 
     def get_approximate(self, decimal, register_bits, frac_precision_bits):
         """
-        Returns Fixed Float Approximation of a decimal
-        -- Fxp function from fxpmath library of python is used that takes following inputs:
-        decimal : number to be converted to fixed point number
-        signed_value : falg to indicate if we need signed fixed point number
+        Returns Fixed Float Approximation of a decimal (or an array of decimals)
+        along with its binary representation.
+        -- FixedPoint class is used that takes following inputs:
+        signed_value : flag to indicate if we need signed fixed point number
         register_bits : bit depth of fixed point number
         frac_precision_bits : bit depth of fractional part of a fixed point number
         """
-        fixed_float = Fxp(decimal, False, register_bits, frac_precision_bits)
-        return fixed_float(), fixed_float.bin()
+        fixed_point = FixedPoint(False, register_bits, frac_precision_bits)
+        fixed_float, fixed_int = fixed_point.quantize(decimal)
+        return fixed_float, fixed_point.to_bin(fixed_int)
+
+    def get_linearization_factors(self, blc_levels, sat_levels):
+        """
+        Returns the linearization factors of R, Gr, Gb and B channels
+        approximated with U16.14 precision.
+        """
+        max_value = (2**self.raw_image_para.bit_depth) - 1
+        offsets = np.array(blc_levels[:4], dtype=np.float64)
+        saturations = np.array(sat_levels[:4], dtype=np.float64)
+
+        lin_factors, _ = self.get_approximate(
+            max_value / (saturations - offsets), 16, 14
+        )
+
+        return [float(lin_fact) for lin_fact in lin_factors]
+
+    @timed("get_corrected_raw", "blc")
+    def get_corrected_raw(self, blc_levels, sat_levels=None):
+        """
+        Returns the black level corrected raw image in float32. The image is
+        also linearized if the saturation levels are given. The output is
+        neither rounded nor clipped so that it can be used for statistics.
+        The result is cached in the raw image parameters, so it is computed
+        only once per image and levels for all the modules.
+        """
+        if sat_levels is not None:
+            sat_levels = tuple(sat_levels[:4])
+        key = ("blc", tuple(blc_levels[:4]), sat_levels)
+
+        raw = self.raw_image_para.get_preprocessed(key)
+        if raw is not None:
+            return raw
+
+        raw = np.float32(self.raw_image_para.raw_image)
+
+        lin_factors = None
+        if sat_levels is not None:
+            lin_factors = self.get_linearization_factors(blc_levels, sat_levels)
+
+        # Channels are strided views, so the correction is done in-place.
+        self.correct_band(raw, self.raw_image_para.bayer_pattern, blc_levels, lin_factors)
+
+        self.raw_image_para.store_preprocessed(key, raw)
+        return raw
+
+    def get_config_corrected_raw(self, in_config_file):
+        """
+        Returns the corrected raw image using the black levels, saturation
+        levels and linearization state saved in the config file.
+        """
+        yaml_file = ReadWriteYMLFile(in_config_file)
+        blc_levels = yaml_file.get_blc_data()
+        sat_levels = yaml_file.get_blc_sat_data()
+
+        # Last value of the saturation data is the is_linear state
+        if not sat_levels[4]:
+            sat_levels = None
+
+        return self.get_corrected_raw(blc_levels, sat_levels)
 
     def display_black_levels(self, blc):
         """
@@ -89,79 +151,21 @@ class BlackLevelsAlgo:
         """
         Applying black levels to the raw image
         """
-        bayer_saturation = None
         sat_levels = None
-        bayer = self.raw_image_para.bayer_pattern
-        bpp = self.raw_image_para.bit_depth
-        raw = np.float32(self.raw_image_para.raw_image)
-
-        # Reading black levels
-        r_offset = blc_levels[0]
-        gr_offset = blc_levels[1]
-        gb_offset = blc_levels[2]
-        b_offset = blc_levels[3]
+        lin_factors = None
 
         # Get sat values from config if the linearization is true
         if is_linear is True:
             # Reading saturation levels from config
             yaml_file = ReadWriteYMLFile(in_config_file)
             sat_levels = yaml_file.get_blc_sat_data()
-
-            r_sat = sat_levels[0]
-            gr_sat = sat_levels[1]
-            gb_sat = sat_levels[2]
-            b_sat = sat_levels[3]
-
-            ## Get Approximates for Linearization - U16.14 precision
-            # print("Approximated Linearization Factor")
-            r_linfact, _ = self.get_approximate(
-                ((2**bpp) - 1) / (r_sat - r_offset), 16, 14
-            )
-            gr_linfact, _ = self.get_approximate(
-                ((2**bpp) - 1) / (gr_sat - gr_offset), 16, 14
-            )
-            gb_linfact, _ = self.get_approximate(
-                ((2**bpp) - 1) / (gb_sat - gb_offset), 16, 14
-            )
-            b_linfact, _ = self.get_approximate(
-                ((2**bpp) - 1) / (b_sat - b_offset), 16, 14
-            )
-
-            bayer_saturation = {
-                "rggb": [r_linfact, gr_linfact, gb_linfact, b_linfact],
-                "grbg": [gr_linfact, r_linfact, b_linfact, gb_linfact],
-                "gbrg": [gb_linfact, b_linfact, r_linfact, gr_linfact],
-                "bggr": [b_linfact, gb_linfact, gr_linfact, r_linfact],
-            }
-
-        bayer_offsets = {
-            "rggb": [r_offset, gr_offset, gb_offset, b_offset],
-            "grbg": [gr_offset, r_offset, b_offset, gb_offset],
-            "gbrg": [gb_offset, b_offset, r_offset, gr_offset],
-            "bggr": [b_offset, gb_offset, gr_offset, r_offset],
-        }
-
-        offset_1, offset_2, offset_3, offset_4 = bayer_offsets[bayer.lower()]
+            lin_factors = self.get_linearization_factors(blc_levels, sat_levels)
 
         generate_separator("Applied Black Levels", "-")
-        self.display_black_levels((r_offset, gr_offset, gb_offset, b_offset))
-
-        raw[0::2, 0::2] = raw[0::2, 0::2] - offset_1
-        raw[0::2, 1::2] = raw[0::2, 1::2] - offset_2
-        raw[1::2, 0::2] = raw[1::2, 0::2] - offset_3
-        raw[1::2, 1::2] = raw[1::2, 1::2] - offset_4
+        self.display_black_levels(blc_levels)
 
         if is_linear is True:
             self.display_sat_levels(sat_levels)
-            sat_1, sat_2, sat_3, sat_4 = bayer_saturation[bayer.lower()]
-            raw[0::2, 0::2] = raw[0::2, 0::2] * sat_1
-            raw[0::2, 1::2] = raw[0::2, 1::2] * sat_2
-            raw[1::2, 0::2] = raw[1::2, 0::2] * sat_3
-            raw[1::2, 1::2] = raw[1::2, 1::2] * sat_4
-
-        raw = np.where(raw >= 0, np.floor(raw + 0.5), np.ceil(raw - 0.5))
-
-        raw = np.uint16(np.clip(raw, 0, (2**bpp) - 1))
 
         # Saving raw file
         def_ext = ".raw"
@@ -171,10 +175,90 @@ class BlackLevelsAlgo:
         name_fil = "BLC-" + os.path.basename(self.raw_image_para.file_name)
         path = file_saving_path(def_ext, file_types, name_fil)
         if path:
-            raw.tofile(path)
+            if os.path.abspath(path) == os.path.abspath(self.raw_image_para.file_name):
+                pop_up_msg("File not saved.")
+                print("\033[31mError!\033[0m Input raw file can not be overwritten.")
+                return False, False
+
+            # The raw file is streamed from the disk in row bands
+            self.apply_blclevels_to_file(path, blc_levels, lin_factors)
             print(f"Raw file saved to:\n {path}")
             return True, True
         else:
             pop_up_msg("File not saved.")
             print("\033[31mWarning!\033[0m File destination path is not selected.")
             return False, False
+
+    @timed("apply_blclevels_to_file", "io")
+    def apply_blclevels_to_file(
+        self, out_file, blc_levels, lin_factors=None, band_size=8 * 2**20
+    ):
+        """
+        Apply black levels (and linearization factors, if given) on the raw
+        file of the raw image parameters and write the output raw file.
+        The input is read, corrected, rounded and written in bands of rows
+        using preallocated buffers of about band_size bytes, so the memory
+        used does not depend on the image size. A file containing multiple
+        frames of the same size is processed frame by frame.
+        Returns the number of processed frames.
+        """
+        width = self.raw_image_para.width
+        height = self.raw_image_para.height
+        bpp = self.raw_image_para.bit_depth
+        bayer = self.raw_image_para.bayer_pattern
+
+        in_type = np.uint8 if bpp == 8 else np.uint16
+        frame_size = width * height * np.dtype(in_type).itemsize
+        file_size = os.path.getsize(self.raw_image_para.file_name)
+
+        if file_size == 0 or file_size % frame_size != 0:
+            raise ValueError("File size is not a multiple of the frame size.")
+        total_frames = file_size // frame_size
+
+        # Number of rows in a band is kept even to maintain the bayer
+        # phase of each band.
+        band_rows = max(2, (band_size // (width * 4)) // 2 * 2)
+        band_rows = min(band_rows, height + height % 2)
+
+        # Preallocated buffers for input, processing and output
+        in_buf = np.empty((band_rows, width), dtype=in_type)
+        work_buf = np.empty((band_rows, width), dtype=np.float32)
+        out_buf = np.empty((band_rows, width), dtype=np.uint16)
+
+        with open(self.raw_image_para.file_name, "rb") as in_fil, open(
+            out_file, "wb"
+        ) as out_fil:
+            for _ in range(total_frames):
+                for row in range(0, height, band_rows):
+                    rows = min(band_rows, height - row)
+                    in_band = in_buf[:rows]
+                    in_fil.readinto(memoryview(in_band).cast("B"))
+
+                    work_band = work_buf[:rows]
+                    np.copyto(work_band, in_band)
+                    self.correct_band(work_band, bayer, blc_levels, lin_factors)
+
+                    # Round half up, negative values are clipped to zero
+                    np.add(work_band, 0.5, out=work_band)
+                    np.floor(work_band, out=work_band)
+                    np.clip(work_band, 0, (2**bpp) - 1, out=work_band)
+
+                    out_band = out_buf[:rows]
+                    np.copyto(out_band, work_band, casting="unsafe")
+                    out_fil.write(memoryview(out_band).cast("B"))
+
+        return total_frames
+
+    def correct_band(self, band, bayer, blc_levels, lin_factors=None):
+        """
+        Subtract black levels and apply linearization factors in-place on
+        a float32 band of rows starting at an even row of the raw image.
+        """
+        channels = get_bayer_channels(band, bayer)
+
+        for channel, offset in zip(channels, blc_levels[:4]):
+            channel -= offset
+
+        if lin_factors is not None:
+            for channel, lin_fact in zip(channels, lin_factors):
+                channel *= lin_fact
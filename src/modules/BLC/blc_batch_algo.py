@@ -0,0 +1,251 @@
+"""
+File: blc_batch_algo.py
+Description: Applies black levels on a batch of raw files using a worker pool
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
+from src.modules.BLC.blc_algo import BlackLevelsAlgo
+from src.utils.algo_common_utils import RawImageParameters, parse_file_name
+from src.utils.gui_common_utils import generate_separator
+
+
+def apply_blc_on_raw_file(in_file, out_file, blc_levels, sat_levels):
+    """
+    Apply black levels (and linearization if saturation levels are given)
+    on a single raw file. This function runs in the worker processes and
+    returns the input file, its size in bytes, total frames and the error
+    message (None on success).
+    """
+    parameters = parse_file_name(os.path.basename(in_file))
+    if not parameters:
+        return in_file, 0, 0, "Invalid file name format."
+
+    raw_image_para = RawImageParameters(in_file)
+    raw_image_para.store_parameters(parameters)
+    blc_algo = BlackLevelsAlgo(raw_image_para)
+
+    lin_factors = None
+    if sat_levels is not None:
+        lin_factors = blc_algo.get_linearization_factors(blc_levels, sat_levels)
+
+    try:
+        frames = blc_algo.apply_blclevels_to_file(out_file, blc_levels, lin_factors)
+    except (OSError, ValueError) as error:
+        return in_file, 0, 0, str(error)
+
+    return in_file, os.path.getsize(in_file), frames, None
+
+
+class BlackLevelsBatchAlgo:
+    """
+    Black Levels Application on a batch of raw files
+    """
+
+    # Prefix of the output files
+    out_prefix = "BLC-"
+
+    def __init__(self, blc_levels, sat_levels=None, per_file_levels=None, workers=None):
+        """
+        blc_levels      : black levels (R, Gr, Gb, B) applied on all the files
+        sat_levels      : saturation levels for linearization, None to disable it
+        per_file_levels : dict of file path to its black levels, used instead of
+                          blc_levels for the files matching it (see get_level_key)
+        workers         : total worker processes, None for the cpu count
+        """
+        self.blc_levels = tuple(blc_levels[:4])
+        self.sat_levels = None if sat_levels is None else tuple(sat_levels[:4])
+        self.per_file_levels = per_file_levels if per_file_levels else {}
+        self.workers = workers
+        self.results = []
+        self.elapsed_time = 0
+
+    def get_raw_files(self, directory):
+        """
+        Return the sorted list of raw files present in the directory. Files
+        generated by a previous run (with output prefix) are skipped.
+        """
+        return sorted(
+            os.path.join(directory, file_name)
+            for file_name in os.listdir(directory)
+            if file_name.lower().endswith(".raw")
+            and not file_name.startswith(self.out_prefix)
+        )
+
+    def get_out_file(self, in_file, out_dir, in_root=None):
+        """
+        Return the deterministic name of the output file. The file keeps its
+        directory relative to in_root (the common directory of the batch), so
+        the files of the same name in different directories are not mixed up.
+        """
+        rel_dir = ""
+        if in_root is not None:
+            rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(in_file)), in_root)
+        return os.path.normpath(
+            os.path.join(out_dir, rel_dir, self.out_prefix + os.path.basename(in_file))
+        )
+
+    def get_in_root(self, raw_files):
+        """
+        Return the common directory of the raw files, None if there is none.
+        """
+        if not raw_files:
+            return None
+        return os.path.commonpath(
+            [os.path.dirname(os.path.abspath(in_file)) for in_file in raw_files]
+        )
+
+    def get_out_files(self, raw_files, out_dir):
+        """
+        Return the output files of the raw files, relative to their common
+        directory.
+        """
+        in_root = self.get_in_root(raw_files)
+        return [self.get_out_file(in_file, out_dir, in_root) for in_file in raw_files]
+
+    def get_level_key(self, in_file):
+        """
+        Return the per-file levels key of the given file, None if there is no
+        key for it. A key matches the files whose path ends with it (e.g.
+        "dark.raw" or "day/dark.raw"), the longest matching key is used.
+        """
+        file_parts = os.path.abspath(in_file).split(os.sep)
+
+        matches = []
+        for key in self.per_file_levels:
+            key_parts = key.split(os.sep)
+            if file_parts[-len(key_parts) :] == key_parts:
+                matches.append((len(key_parts), key))
+        return max(matches)[1] if matches else None
+
+    def get_file_levels(self, in_file):
+        """
+        Return the black levels to be applied on the given file.
+        """
+        key = self.get_level_key(in_file)
+        return self.blc_levels if key is None else self.per_file_levels[key]
+
+    def check_raw_files(self, raw_files, out_files):
+        """
+        Return a dict of raw file to its error message for the files that
+        cannot be processed deterministically: files with the same output
+        file (e.g. given twice) and files sharing per-file levels given by
+        a file name only (e.g. two dark.raw of different directories).
+        """
+        errors = {}
+
+        in_files_of_out = {}
+        in_files_of_key = {}
+        for in_file, out_file in zip(raw_files, out_files):
+            in_files_of_out.setdefault(out_file, []).append(in_file)
+            key = self.get_level_key(in_file)
+            if key is not None:
+                in_files_of_key.setdefault(key, []).append(in_file)
+
+        for in_files in in_files_of_out.values():
+            if len(in_files) > 1:
+                for in_file in in_files:
+                    errors[in_file] = "Duplicate input file."
+
+        for key, in_files in in_files_of_key.items():
+            if len(in_files) > 1:
+                for in_file in in_files:
+                    errors.setdefault(
+                        in_file,
+                        f"Per-file levels of {key} match {len(in_files)} files, "
+                        "give their relative paths in the csv file.",
+                    )
+        return errors
+
+    def read_per_file_levels(self, csv_file):
+        """
+        Read per-file black levels from a csv file having the columns
+        file, r_offset, gr_offset, gb_offset and b_offset. The file column
+        is a file name, or its path to tell apart the files of the same name
+        in different directories.
+        """
+        per_file_levels = {}
+        with open(csv_file, "r", newline="", encoding="utf-8") as fil:
+            for row in csv.DictReader(fil):
+                key = os.path.normpath(row["file"])
+                if key in per_file_levels:
+                    print(
+                        f"\033[31mWarning!\033[0m {row['file']} is repeated in the "
+                        "csv file, its last levels are used."
+                    )
+                per_file_levels[key] = (
+                    int(row["r_offset"]),
+                    int(row["gr_offset"]),
+                    int(row["gb_offset"]),
+                    int(row["b_offset"]),
+                )
+
+        self.per_file_levels = per_file_levels
+        return per_file_levels
+
+    def apply(self, raw_files, out_dir):
+        """
+        Apply black levels on all the raw files, distributing the files on a
+        process pool, and write the outputs in the out_dir.
+        """
+        out_files = self.get_out_files(raw_files, out_dir)
+        errors = self.check_raw_files(raw_files, out_files)
+
+        start_time = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            for in_file, out_file in zip(raw_files, out_files):
+                if in_file in errors:
+                    continue
+                os.makedirs(os.path.dirname(out_file) or os.curdir, exist_ok=True)
+                futures[in_file] = executor.submit(
+                    apply_blc_on_raw_file,
+                    in_file,
+                    out_file,
+                    self.get_file_levels(in_file),
+                    self.sat_levels,
+                )
+            self.results = [
+                futures[in_file].result()
+                if in_file in futures
+                else (in_file, 0, 0, errors[in_file])
+                for in_file in raw_files
+            ]
+        self.elapsed_time = time.perf_counter() - start_time
+
+        return self.results
+
+    def get_throughput(self):
+        """
+        Return the total processed size in MB and the throughput in MB/s.
+        """
+        total_mb = sum(result[1] for result in self.results) / 2**20
+        if self.elapsed_time == 0:
+            return total_mb, 0
+        return total_mb, total_mb / self.elapsed_time
+
+    def display_summary(self):
+        """
+        Display the status of each file and the throughput.
+        """
+        generate_separator("Batch Summary", "-")
+
+        # Files are displayed relative to their common directory
+        in_root = self.get_in_root([result[0] for result in self.results])
+        for in_file, _, frames, error in self.results:
+            name = os.path.relpath(os.path.abspath(in_file), in_root)
+            if error is None:
+                print(f"\033[32mDone\033[0m  {name} ({frames} frames)")
+            else:
+                print(f"\033[31mError\033[0m {name}: {error}")
+
+        total_mb, throughput = self.get_throughput()
+        total_done = sum(1 for result in self.results if result[3] is None)
+
+        print(f"\nFiles processed = {total_done} / {len(self.results)}")
+        print(f"Data processed  = {total_mb:.2f} MB")
+        print(f"Time            = {self.elapsed_time:.2f} s")
+        print(f"Throughput      = {throughput:.2f} MB/s")
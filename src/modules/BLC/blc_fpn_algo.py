@@ -0,0 +1,166 @@
+"""
+File: blc_fpn_algo.py
+Description: Analyzes the row and column fixed pattern noise of dark frames
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import csv
+import numpy as np
+from src.utils.gui_common_utils import generate_separator
+from src.utils.algo_common_utils import bayer_channels_offsets, get_bayer_channels
+
+
+class BlackLevelFpnAlgo:
+    """
+    Row / Column Fixed Pattern Noise Analysis
+    """
+
+    channel_names = ["R", "Gr", "Gb", "B"]
+
+    # Scale factor of the median absolute deviation (MAD) to
+    # estimate the standard deviation of a normal distribution
+    mad_scale = 1.4826
+
+    def __init__(self, bayer, outlier_threshold=5.0):
+        """
+        bayer             : bayer pattern of the dark frames
+        outlier_threshold : rows / columns deviating from the median by more
+                            than outlier_threshold x (scaled MAD) are outliers
+        """
+        self.bayer = bayer
+        self.outlier_threshold = outlier_threshold
+
+        # Per-frame row and column means of the R, Gr, Gb and B channels
+        self.row_means = [[], [], [], []]
+        self.col_means = [[], [], [], []]
+
+        self.report = []
+
+    def get_total_frames(self):
+        """
+        Return the total frames added for the analysis.
+        """
+        return len(self.row_means[0])
+
+    def add_frame(self, raw_image):
+        """
+        Store the row and column means of each bayer channel of a dark frame.
+        Only the means are kept, so any number of frames can be analyzed.
+        """
+        height, width = raw_image.shape[0] // 2 * 2, raw_image.shape[1] // 2 * 2
+        channels = get_bayer_channels(raw_image[:height, :width], self.bayer)
+
+        for idx, channel in enumerate(channels):
+            self.row_means[idx].append(channel.mean(axis=1, dtype=np.float64))
+            self.col_means[idx].append(channel.mean(axis=0, dtype=np.float64))
+
+    def get_outliers(self, profile):
+        """
+        Return the indices of the outliers of a profile using the MAD rule.
+        """
+        deviation = profile - np.median(profile)
+        mad = self.mad_scale * np.median(np.abs(deviation))
+        return np.flatnonzero(np.abs(deviation) > self.outlier_threshold * mad)
+
+    def get_profile_stats(self, profiles):
+        """
+        Separate the fixed and temporal components of the row (or column)
+        means of all the frames (frames x rows). Returns the mean level,
+        fixed FPN, temporal FPN (None for a single frame) and the outliers.
+        """
+        profiles = np.array(profiles)
+        total_frames = profiles.shape[0]
+
+        # Fixed pattern is the profile averaged over all the frames
+        fixed = profiles.mean(axis=0)
+        fixed_var = np.var(fixed)
+
+        temporal_fpn = None
+        if total_frames > 1:
+            # Temporal variance of each row averaged over all the rows. Its
+            # residual in the averaged profile is removed from the fixed part.
+            temporal_var = np.mean(np.var(profiles, axis=0, ddof=1))
+            fixed_var = max(fixed_var - temporal_var / total_frames, 0)
+            temporal_fpn = float(np.sqrt(temporal_var))
+
+        return (
+            float(np.mean(fixed)),
+            float(np.sqrt(fixed_var)),
+            temporal_fpn,
+            self.get_outliers(fixed),
+        )
+
+    def analyze(self):
+        """
+        Analyze the row and column FPN of each bayer channel. The outliers are
+        reported as row / column indices of the raw image.
+        """
+        self.report = []
+        offsets = bayer_channels_offsets[self.bayer]
+
+        for idx, name in enumerate(self.channel_names):
+            for axis, profiles in [("Row", self.row_means[idx]), ("Column", self.col_means[idx])]:
+                mean, fixed_fpn, temporal_fpn, outliers = self.get_profile_stats(profiles)
+                offset = offsets[idx][0] if axis == "Row" else offsets[idx][1]
+
+                self.report.append(
+                    {
+                        "channel": name,
+                        "axis": axis,
+                        "mean": mean,
+                        "fixed_fpn": fixed_fpn,
+                        "temporal_fpn": temporal_fpn,
+                        "outliers": (2 * outliers + offset).tolist(),
+                    }
+                )
+
+        return self.report
+
+    def display_report(self):
+        """
+        Display the FPN report
+        """
+        generate_separator("Row / Column FPN", "-")
+        print(f"Frames = {self.get_total_frames()}\n")
+        print(
+            "{: <10}{: <10}{: <12}{: <14}{: <14}{: <10}".format(
+                "Channel", "Axis", "Mean", "Fixed FPN", "Temporal FPN", "Outliers"
+            )
+        )
+        for line in self.report:
+            temporal = "N/A" if line["temporal_fpn"] is None else f"{line['temporal_fpn']:.3f}"
+            print(
+                "{: <10}{: <10}{: <12}{: <14}{: <14}{: <10}".format(
+                    line["channel"],
+                    line["axis"],
+                    f"{line['mean']:.2f}",
+                    f"{line['fixed_fpn']:.3f}",
+                    temporal,
+                    len(line["outliers"]),
+                )
+            )
+        print()
+
+    def export_report(self, csv_file):
+        """
+        Save the FPN report in a csv file, the outliers are
+        saved as a list of raw image rows / columns.
+        """
+        with open(csv_file, "w", newline="", encoding="utf-8") as fil:
+            writer = csv.writer(fil)
+            writer.writerow(
+                ["Channel", "Axis", "Mean", "Fixed FPN", "Temporal FPN", "Outliers"]
+            )
+            for line in self.report:
+                writer.writerow(
+                    [
+                        line["channel"],
+                        line["axis"],
+                        f"{line['mean']:.4f}",
+                        f"{line['fixed_fpn']:.4f}",
+                        ""
+                        if line["temporal_fpn"] is None
+                        else f"{line['temporal_fpn']:.4f}",
+                        " ".join(str(pos) for pos in line["outliers"]),
+                    ]
+                )
@@ -0,0 +1,189 @@
+"""
+File: blc_map_algo.py
+Description: Calculates a spatial map of black levels (per-region offsets)
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import numpy as np
+from src.utils.gui_common_utils import generate_separator
+from src.utils.algo_common_utils import (
+    bayer_channels_offsets,
+    get_bayer_channels,
+    block_means,
+    smooth_grid,
+    fit_poly_surface,
+    eval_poly_surface,
+)
+
+
+class BlackLevelMapAlgo:
+    """
+    Black Level Map Calibration
+    """
+
+    channel_names = ["R", "Gr", "Gb", "B"]
+
+    def __init__(self, raw_image_para, block_size=64, poly_order=2):
+        """
+        raw_image_para : parameters and data of the dark raw image
+        block_size     : size of the square blocks of each bayer channel
+        poly_order     : order of the polynomial surface fitted on the grid
+        """
+        self.raw_image_para = raw_image_para
+        self.block_size = block_size
+        self.poly_order = poly_order
+
+        # Grids (4 x grid_h x grid_w) and surface coefficients (4 x terms)
+        # of the R, Gr, Gb and B channels
+        self.grids = None
+        self.coeffs = None
+
+    def get_channels(self):
+        """
+        Returns the R, Gr, Gb and B channels of the raw image cropped
+        to an even size, so that all the channels have the same shape.
+        """
+        raw_image = self.raw_image_para.raw_image
+        height, width = raw_image.shape[0] // 2 * 2, raw_image.shape[1] // 2 * 2
+        return get_bayer_channels(
+            raw_image[:height, :width], self.raw_image_para.bayer_pattern
+        )
+
+    def get_channel_coords(self, channel_idx, indices, axis):
+        """
+        Returns the normalized [-1, 1] coordinates of the given channel
+        indices along an axis (0 for rows, 1 for columns) of the raw image.
+        """
+        offset = bayer_channels_offsets[self.raw_image_para.bayer_pattern][
+            channel_idx
+        ][axis]
+        full_size = self.raw_image_para.height if axis == 0 else self.raw_image_para.width
+
+        coords = 2 * np.asarray(indices, dtype=np.float64) + offset
+        return 2 * coords / (full_size - 1) - 1
+
+    def get_block_coords(self, channel_idx, total_blocks, axis):
+        """
+        Returns the normalized coordinates of the block centers along an axis.
+        """
+        centers = np.arange(total_blocks) * self.block_size + (self.block_size - 1) / 2
+        return self.get_channel_coords(channel_idx, centers, axis)
+
+    def calculate_map(self):
+        """
+        There are 3 steps involved in the function.
+        1) Calculate the block means of each bayer channel.
+        2) Smooth the grids with a 3x3 box filter.
+        3) Fit a low order polynomial surface on each grid.
+        """
+        channels = self.get_channels()
+
+        # A block can not be larger than the channel
+        self.block_size = max(1, min(self.block_size, *channels[0].shape))
+
+        grids = []
+        coeffs = []
+        for idx, channel in enumerate(channels):
+            grid = smooth_grid(block_means(channel, self.block_size))
+
+            x_coords = self.get_block_coords(idx, grid.shape[1], 1)
+            y_coords = self.get_block_coords(idx, grid.shape[0], 0)
+
+            grids.append(grid)
+            coeffs.append(fit_poly_surface(grid, x_coords, y_coords, self.poly_order))
+
+        self.grids = np.array(grids)
+        self.coeffs = np.array(coeffs)
+        return self.grids, self.coeffs
+
+    def get_channel_surface(self, channel_idx, shape):
+        """
+        Returns the fitted surface evaluated on all the pixels of a channel.
+        """
+        x_coords = self.get_channel_coords(channel_idx, np.arange(shape[1]), 1)
+        y_coords = self.get_channel_coords(channel_idx, np.arange(shape[0]), 0)
+
+        return eval_poly_surface(
+            self.coeffs[channel_idx], x_coords, y_coords, self.poly_order
+        )
+
+    def get_grid_surfaces(self):
+        """
+        Returns the fitted surfaces sampled at the block centers of the grids.
+        """
+        surfaces = []
+        for idx in range(4):
+            grid_h, grid_w = self.grids[idx].shape
+            surfaces.append(
+                eval_poly_surface(
+                    self.coeffs[idx],
+                    self.get_block_coords(idx, grid_w, 1),
+                    self.get_block_coords(idx, grid_h, 0),
+                    self.poly_order,
+                )
+            )
+        return np.array(surfaces)
+
+    def get_fpn_stats(self, corrected):
+        """
+        Returns the residual offset, row FPN, column FPN and the block level
+        shading (standard deviations) of a corrected channel.
+        """
+        return (
+            float(np.mean(corrected)),
+            float(np.std(np.mean(corrected, axis=1))),
+            float(np.std(np.mean(corrected, axis=0))),
+            float(np.std(block_means(corrected, self.block_size))),
+        )
+
+    def calculate_residual_fpn(self, blc_levels):
+        """
+        Compare the residual fixed pattern noise of each channel after the
+        correction with the global black levels and with the fitted surface.
+        Returns a list of (global_stats, map_stats) for R, Gr, Gb and B.
+        """
+        channels = self.get_channels()
+
+        residuals = []
+        for idx, channel in enumerate(channels):
+            channel = np.float32(channel)
+            global_stats = self.get_fpn_stats(channel - blc_levels[idx])
+
+            channel -= np.float32(self.get_channel_surface(idx, channel.shape))
+            residuals.append((global_stats, self.get_fpn_stats(channel)))
+
+        return residuals
+
+    def display_map_summary(self):
+        """
+        Display the size and the range of the black level grids
+        """
+        generate_separator("Black Level Map", "-")
+        grid_h, grid_w = self.grids.shape[1:]
+        print(f"Block size = {self.block_size} ({grid_w}x{grid_h} blocks per channel)")
+        print(f"Surface    = polynomial of order {self.poly_order}\n")
+
+        for name, grid in zip(self.channel_names, self.grids):
+            print(
+                f"{name: <2} Channel  min = {grid.min():.2f}, max = {grid.max():.2f}, "
+                f"mean = {grid.mean():.2f}"
+            )
+        print()
+
+    def display_residual_fpn(self, residuals):
+        """
+        Display the residual FPN after global and map based correction
+        """
+        generate_separator("Residual FPN (Global / Map)", "-")
+        print(
+            "{: <10}{: <20}{: <20}{: <20}{: <20}".format(
+                "Channel", "Offset", "Row FPN", "Column FPN", "Shading"
+            )
+        )
+        for name, (global_stats, map_stats) in zip(self.channel_names, residuals):
+            values = [
+                f"{glob:.2f} / {mapped:.2f}"
+                for glob, mapped in zip(global_stats, map_stats)
+            ]
+            print("{: <10}{: <20}{: <20}{: <20}{: <20}".format(name, *values))
+        print()
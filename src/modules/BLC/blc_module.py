@@ -5,11 +5,23 @@ Author: 10xEngineers
 ------------------------------------------------------------
 """
 import os
-from src.utils.algo_common_utils import select_image_and_get_para
+from src.utils.algo_common_utils import (
+    select_image_and_get_para,
+    select_directory,
+    select_file,
+    select_files,
+    parse_file_name,
+    get_total_frames,
+    read_raw_frame,
+)
 from src.utils.gui_common_utils import (
+    file_saving_path,
     generate_separator,
 )
 from src.modules.BLC.blc_algo import BlackLevelsAlgo
+from src.modules.BLC.blc_batch_algo import BlackLevelsBatchAlgo
+from src.modules.BLC.blc_map_algo import BlackLevelMapAlgo
+from src.modules.BLC.blc_fpn_algo import BlackLevelFpnAlgo
 from src.utils.read_yaml_file import ReadWriteYMLFile
 
 
@@ -32,6 +44,8 @@ class BlackLevelCalibrationModule:
         self.__b = 0
 
         self.blc_algo = None
+        self.blc_map_algo = None
+        self.blc_fpn_algo = None
 
     def is_image_and_para_loaded(self):
         """
@@ -60,6 +74,109 @@ class BlackLevelCalibrationModule:
 
         return (self.__r, self.__gr, self.__gb, self.__b)
 
+    def execute_map(self, block_size, is_residual_fpn):
+        """
+        This function will calculate the black level map and, if
+        is_residual_fpn is true, evaluate the residual FPN after the
+        correction with the map.
+        """
+        self.blc_map_algo = BlackLevelMapAlgo(self.raw_image_para, block_size)
+        self.blc_map_algo.calculate_map()
+        self.blc_map_algo.display_map_summary()
+
+        if is_residual_fpn:
+            blc_levels = self.blc_algo.calculate_blc()
+            residuals = self.blc_map_algo.calculate_residual_fpn(blc_levels)
+            self.blc_map_algo.display_residual_fpn(residuals)
+
+    def execute_fpn(self):
+        """
+        This function will analyze the row and column FPN of one or many
+        dark raw files. Each file may contain multiple frames, all the
+        files must have the same size, bit depth and bayer pattern.
+        """
+        file_type = (("RAW Files", "*.raw"),)
+        is_selected, file_names = select_files("Open dark raw files.", file_type)
+        if not is_selected:
+            print("\033[31mError!\033[0m File is not selected.")
+            generate_separator("", "*")
+            return False
+
+        parameters = [parse_file_name(file_name)[1:] for file_name in file_names]
+        if not all(parameters) or any(para != parameters[0] for para in parameters):
+            print(
+                "\033[31mError!\033[0m Invalid file name format or "
+                "files of different sizes."
+            )
+            generate_separator("", "*")
+            return False
+
+        width, height, bits, bayer = parameters[0]
+        self.blc_fpn_algo = BlackLevelFpnAlgo(bayer)
+
+        generate_separator("Analysis Started", "*")
+        for file_name in file_names:
+            total_frames = get_total_frames(file_name, width, height, bits)
+            if total_frames == 0:
+                print(f"\033[31mWarning!\033[0m Skipped {os.path.basename(file_name)}.")
+
+            for frame_idx in range(total_frames):
+                raw_image = read_raw_frame(file_name, width, height, bits, frame_idx)
+                self.blc_fpn_algo.add_frame(raw_image)
+
+        if self.blc_fpn_algo.get_total_frames() == 0:
+            print("\033[31mError!\033[0m File size does not match expected size.")
+            generate_separator("", "*")
+            return False
+
+        self.blc_fpn_algo.analyze()
+        self.blc_fpn_algo.display_report()
+        generate_separator("Analysis Ended", "*")
+        return True
+
+    def save_fpn_report(self):
+        """
+        Save the FPN report in a csv file.
+        """
+        file_path = file_saving_path(
+            ".csv", [("CSV Files", "*.csv")], "row_column_fpn.csv"
+        )
+        if not file_path:
+            print("\033[31mWarning!\033[0m File destination path is not selected.")
+            generate_separator("", "*")
+            return
+
+        self.blc_fpn_algo.export_report(file_path)
+        print(f"CSV file saved to:\n {file_path}")
+        generate_separator("", "*")
+
+    def save_config_file_with_black_level_map(self):
+        """
+        Save the black level map in Config File.
+        """
+        if not os.path.exists(self.in_config_file):
+            # Display a warning message.
+            print(
+                "\n\033[31mError!\033[0m File configs.yml does "
+                'not exist in "app_data" directory.'
+            )
+
+            generate_separator("", "*")
+            return
+
+        # Read the existing file, set the black level map and save the output file.
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        yaml_file.set_blc_map_data(
+            self.blc_map_algo.block_size,
+            self.blc_map_algo.poly_order,
+            self.blc_map_algo.grids,
+            self.blc_map_algo.coeffs,
+        )
+        yaml_file.save_file(self.in_config_file)
+
+        print("File saved at:", os.path.dirname(self.in_config_file))
+        generate_separator("", "*")
+
     def save_config_file_with_calculated_black_level(self):
         """
         Save Black levels in Config File.
@@ -93,3 +210,55 @@ class BlackLevelCalibrationModule:
         )
         generate_separator("", "*")
         return status, apply_flag
+
+    def apply_blc_levels_on_directory(self, blc_levels, is_per_file):
+        """
+        Applying black levels to all the raw files of a directory. If is_per_file
+        is true, black levels of each file are read from a csv file and
+        blc_levels are used for the files not present in it.
+        """
+        is_selected, in_dir = select_directory("Select the directory of raw files.")
+        if not is_selected:
+            print("\033[31mError!\033[0m Directory is not selected.")
+            generate_separator("", "*")
+            return False
+
+        sat_levels = None
+        if self.is_linear:
+            sat_levels = ReadWriteYMLFile(self.in_config_file).get_blc_sat_data()
+
+        batch_algo = BlackLevelsBatchAlgo(blc_levels, sat_levels)
+        raw_files = batch_algo.get_raw_files(in_dir)
+        if not raw_files:
+            print("\033[31mError!\033[0m No raw file exists in the directory.")
+            generate_separator("", "*")
+            return False
+
+        if is_per_file:
+            file_type = (("CSV Files", "*.csv"),)
+            is_selected, csv_file = select_file("Open a black levels csv file.", file_type)
+            if not is_selected:
+                print("\033[31mError!\033[0m File is not selected.")
+                generate_separator("", "*")
+                return False
+            batch_algo.read_per_file_levels(csv_file.name)
+
+        is_selected, out_dir = select_directory("Select the output directory.")
+        if not is_selected:
+            print("\033[31mWarning!\033[0m File destination path is not selected.")
+            generate_separator("", "*")
+            return False
+
+        generate_separator("Applied Black Levels", "-")
+        self.blc_algo = BlackLevelsAlgo(None)
+        self.blc_algo.display_black_levels(blc_levels)
+        if self.is_linear:
+            self.blc_algo.display_sat_levels(sat_levels)
+
+        print(f"Applying black levels on {len(raw_files)} raw files...")
+        batch_algo.apply(raw_files, out_dir)
+        batch_algo.display_summary()
+
+        print(f"\nRaw files saved to:\n {out_dir}")
+        generate_separator("", "*")
+        return True
@@ -9,6 +9,8 @@ from tkinter import Entry, Tk, END
 import csv
 import numpy as np
 from src.utils.gui_common_utils import file_saving_path, pop_up_msg, generate_separator
+from src.utils.algo_common_utils import extract_bayer_patch
+from src.utils.chart_layout import get_chart_layout
 
 
 class BneAlgo:
@@ -16,89 +18,67 @@ class BneAlgo:
     Bayer Noise Estimation Algorithm
     """
 
-    def __init__(self, raw_img_para, patches_info):
+    def __init__(self, raw_img_para, patches_info, raw_image=None, gray_patches=None):
         self.raw_image_para = raw_img_para
         self.sub_rect_points = patches_info
 
-    def generate_rgb_mask(self):
+        # Indices of the gray patches of the chart, from the lightest to the
+        # darkest (the gray patches of the ColorChecker 24 by default).
+        if gray_patches is None:
+            gray_patches = get_chart_layout().get_neutral_patches()
+        self.gray_patches = gray_patches
+
+        # Raw image used for the statistics, it can be a pre-processed
+        # (e.g. black level corrected) version of the loaded raw image.
+        if raw_image is None:
+            raw_image = raw_img_para.raw_image
+        self.raw_image = raw_image
+
+    def get_patch_channels(self, patch_points):
         """
-        Generate R,G & B masks to generate raw R,B & G channels
+        Extract the R, G & B raw channels of a patch. The G channel
+        contains both Gr and Gb pixels of the patch.
         """
-        # Loading raw image
-        raw_data = self.raw_image_para.raw_image
-        pattern = self.raw_image_para.bayer_pattern
-
-        # dict will be creating 3 channel boolean type array of given shape with the name
-        # tag like 'r_channel': [False False ....] , 'g_channel': [False False ....] ,
-        # 'b_channel': [False False ....]
-        channels = dict(
-            (channel, np.zeros(raw_data.shape, dtype=bool)) for channel in "RGB"
+        r_channel, gr_channel, gb_channel, b_channel = extract_bayer_patch(
+            self.raw_image, self.raw_image_para.bayer_pattern, patch_points
         )
+        g_channel = np.concatenate((gr_channel.ravel(), gb_channel.ravel()))
 
-        # Following comment will create boolean masks for each channel r_channel,
-        # g_channel and b_channel
-        for channel, (y_channel, x_channel) in zip(
-            pattern, [(0, 0), (0, 1), (1, 0), (1, 1)]
-        ):
-            channels[channel][y_channel::2, x_channel::2] = True
-
-        # tuple will return 3 channel boolean pattern for r_channel,
-        # g_channel and b_channel with True at corresponding value
-        # For example in rggb pattern, the r_channel mask would then be
-        # [ [ True, False, True, False], [ False, False, False, False]]
-        raw_rgb = np.zeros([self.raw_image_para.height, self.raw_image_para.width, 3])
-        mask_r, mask_g, mask_b = tuple(channels[c] for c in "RGB")
-
-        # Adding 0.0001 just to keep data zeros different from masking zeros
-        raw_data = np.float32(raw_data) + 0.0001
-
-        # Generating R, G & B channels from raw image
-        r_channel = raw_data * mask_r
-        g_channel = raw_data * mask_g
-        b_channel = raw_data * mask_b
-        raw_rgb[:, :, 0] = r_channel
-        raw_rgb[:, :, 1] = g_channel
-        raw_rgb[:, :, 2] = b_channel
-        return raw_rgb
+        return r_channel, g_channel, b_channel
 
-    def apply_algo(self):
+    def get_patches_stats(self):
         """
-        Apply Algorithm to the R,B & G raw channels
+        Returns the mean and the std (normalized between 0-1) of the
+        R, G & B raw channels of the gray patches.
         """
-        # Generating R, G, & B raw channels
-        raw_rgb = self.generate_rgb_mask()
-
-        # Normalization between 0-1
-        raw_rgb = raw_rgb / (2**self.raw_image_para.bit_depth - 1)
+        # Normalization factor to get the std between 0-1
+        max_value = 2**self.raw_image_para.bit_depth - 1
 
-        # Creating matrix to store standard deviations
-        std_mat = np.zeros([6, 3])
+        # Creating matrices to store means and standard deviations
+        mean_mat = np.zeros([len(self.gray_patches), 3])
+        std_mat = np.zeros([len(self.gray_patches), 3])
         ind = 0
 
-        # Extracting last six patches from each channel
-        for i in range(18, 24, 1):
-            point_at_time = self.sub_rect_points[i]
-            start_point = point_at_time[0]
-            end_point = point_at_time[1]
-
+        # Extracting the gray patches from each channel
+        for i in self.gray_patches:
             # Extracting patches from each R, G & B bayer channels.
-            crop_ch1_raw = raw_rgb[
-                start_point[1] : end_point[1], start_point[0] : end_point[0], 0
-            ]
-            crop_ch2_raw = raw_rgb[
-                start_point[1] : end_point[1], start_point[0] : end_point[0], 1
-            ]
-            crop_ch3_raw = raw_rgb[
-                start_point[1] : end_point[1], start_point[0] : end_point[0], 2
-            ]
-
-            # Calculating std for each channel patch excluding masking zeros.
-            std_mat[ind, 0] = np.std(crop_ch1_raw[crop_ch1_raw != 0])
-            std_mat[ind, 1] = np.std(crop_ch2_raw[crop_ch2_raw != 0])
-            std_mat[ind, 2] = np.std(crop_ch3_raw[crop_ch3_raw != 0])
+            channels = self.get_patch_channels(self.sub_rect_points[i])
+
+            # Calculating mean and std for each channel patch.
+            for ch_idx, channel in enumerate(channels):
+                mean_mat[ind, ch_idx] = np.mean(channel, dtype=np.float64) / max_value
+                std_mat[ind, ch_idx] = np.std(channel, dtype=np.float64) / max_value
             ind += 1
 
+        return mean_mat, std_mat
+
+    def apply_algo(self):
+        """
+        Apply Algorithm to the R,B & G raw channels
+        """
+        mean_mat, std_mat = self.get_patches_stats()
         self.display_matrix(std_mat)
+        return mean_mat, std_mat
 
     def display_matrix(self, matrix):
         """
@@ -4,9 +4,14 @@ Description: Executes the module flow with the algorithm for the bayer noise est
 Author: 10xEngineers
 ------------------------------------------------------------
 """
+import os
 from src.modules.BNR.bnr_algo import BneAlgo as bne_algo
+from src.modules.BNR.bnr_tuning_algo import BnrTuningAlgo
+from src.modules.BLC.blc_algo import BlackLevelsAlgo
 from src.utils.algo_common_utils import select_image_and_get_para, generate_separator
 from src.utils.area_selection_frame import SelectAreaFrame as select_area_frame
+from src.utils.session_workspace import SessionWorkspace
+from src.utils.read_yaml_file import ReadWriteYMLFile
 
 
 class BneModule:
@@ -14,32 +19,62 @@ class BneModule:
     Bayer Noise Estimation Module
     """
 
-    def __init__(self):
+    def __init__(self, in_config_file=None, workspace=None):
+        self.in_config_file = in_config_file
+
+        # Image and patches shared with the other modules of the session
+        self.workspace = SessionWorkspace() if workspace is None else workspace
         self.raw_image_para = None
         self.selection_frame = None
+        self.apply_blc = False
+
+        # Raw image used for the last estimation and the noise model
+        # of all the estimated exposures
+        self.raw_image = None
+        self.bnr_tuning = None
 
-    def is_image_and_para_loaded(self):
+    def is_image_and_para_loaded(self, raw_image_para=None):
         """
         To check if the raw image is loaded, if true store respective parameters.
+        The image of the session workspace is used if its parameters are given,
+        otherwise a newly loaded image is kept in the workspace.
         """
+        if raw_image_para is not None:
+            self.raw_image_para = raw_image_para
+            return True
+
         file_type = (("RAW Files", "*.raw"),)
 
         is_selected, self.raw_image_para = select_image_and_get_para(file_type)
+        if is_selected:
+            self.workspace.set_image(self.raw_image_para)
 
         return is_selected
 
-    def color_checker_selection_frame(self):
+    def color_checker_selection_frame(self, selection_frame=None):
         """
         Open the color checker patches selection frame and return true
         if patches are drawn and saved using continue button otherwise
-        return false
+        return false.
+        The patches of the session workspace are used if their selection
+        frame is given.
         """
-        self.selection_frame = select_area_frame(self.raw_image_para.rgb_image)
+        if selection_frame is None:
+            selection_frame = select_area_frame(self.raw_image_para.rgb_image)
+        self.selection_frame = selection_frame
 
         if self.selection_frame.data.is_data_saved is False:
             return False
+        self.workspace.set_selection(self.selection_frame)
         return True
 
+    def set_blc_flag(self, flag):
+        """
+        Set flag to true if the black levels (and linearization) from
+        the config file need to be applied before estimation.
+        """
+        self.apply_blc = flag
+
     def implement_bne_algo(self):
         """
         Extract patches and apply algorithm on the image
@@ -49,9 +84,71 @@ class BneModule:
         # for extracting patches from each channel
         sub_rect_points = self.selection_frame.get_sub_rect_points()
 
+        # Get the black level corrected raw image if required
+        raw_image = None
+        if self.apply_blc and self.in_config_file is not None:
+            raw_image = BlackLevelsAlgo(self.raw_image_para).get_config_corrected_raw(
+                self.in_config_file
+            )
+
         # Applying Noise Estimation Algorithm
-        noise_est = bne_algo(self.raw_image_para, sub_rect_points)
-        noise_est.apply_algo()
+        noise_est = bne_algo(
+            self.raw_image_para,
+            sub_rect_points,
+            raw_image,
+            self.selection_frame.get_chart_layout().get_neutral_patches(),
+        )
+        mean_mat, std_mat = noise_est.apply_algo()
+        self.raw_image = noise_est.raw_image
+
+        # Add the gray patches statistics to the noise model, a new model
+        # is started for an exposure of a different bit depth
+        bit_depth = self.raw_image_para.bit_depth
+        if self.bnr_tuning is None or self.bnr_tuning.bit_depth != bit_depth:
+            self.bnr_tuning = BnrTuningAlgo(bit_depth)
+        self.bnr_tuning.add_measurements(mean_mat, std_mat)
         generate_separator("Noise Levels Estimated Successfully!", "-")
         generate_separator("", "*")
         return True
+
+    def reset_noise_model(self):
+        """
+        Discard the measurements of the previous exposures.
+        """
+        self.bnr_tuning = None
+
+    def implement_bnr_tuning(self):
+        """
+        Recommend the BNR parameters from the noise model and preview them
+        on the gray patches of the last estimated exposure.
+        """
+        self.bnr_tuning.recommend()
+        self.bnr_tuning.display_params()
+
+        sub_rect_points = self.selection_frame.get_sub_rect_points()
+        gray_patches = self.selection_frame.get_chart_layout().get_neutral_patches()
+        self.bnr_tuning.preview_patches(
+            self.raw_image,
+            self.raw_image_para.bayer_pattern,
+            [sub_rect_points[i] for i in gray_patches],
+        )
+        generate_separator("", "*")
+
+    def save_config_file_with_bnr_params(self):
+        """
+        Save the recommended BNR parameters in Config File.
+        """
+        if not os.path.exists(self.in_config_file):
+            print(
+                "\n\033[31mError!\033[0m File configs.yml does "
+                'not exist in "app_data" directory.'
+            )
+            generate_separator("", "*")
+            return
+
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        yaml_file.set_bnr_data(*self.bnr_tuning.get_config_params())
+        yaml_file.save_file(self.in_config_file)
+
+        print("File saved at:", os.path.dirname(self.in_config_file))
+        generate_separator("", "*")
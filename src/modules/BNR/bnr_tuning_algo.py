@@ -0,0 +1,271 @@
+"""
+File: bnr_tuning_algo.py
+Description: Recommends the bayer noise reduction parameters from the measured noise
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import numpy as np
+from matplotlib import pyplot as plt
+from src.utils.create_h_file.create_h_data import CreateHFileData
+from src.utils.gui_common_utils import generate_separator
+from src.utils.algo_common_utils import get_bayer_channels
+from src.utils.profiling import timed
+
+
+class BnrTuningAlgo:
+    """
+    Bayer Noise Reduction Tuning
+    """
+
+    channel_names = ["R", "G", "B"]
+
+    # Distance (raw pixels) between the neighbours of a channel, as used
+    # for the spatial kernels of the .h file
+    channel_strides = [2, 1, 2]
+
+    # Allowed filter windows, the spatial kernel size (filter_window + 1) / 2
+    # must be odd
+    filter_windows = [5, 9, 13]
+
+    def __init__(self, bit_depth, range_factor=2.0, target_snr=40.0):
+        """
+        bit_depth    : bit depth of the raw images
+        range_factor : range sigma as a multiple of the noise std
+        target_snr   : SNR (mean / std) targeted by the spatial filtering
+        """
+        self.bit_depth = bit_depth
+        self.range_factor = range_factor
+        self.target_snr = target_snr
+
+        # Normalized (0-1) means and stds (N x 3) of the gray patches of all
+        # the added exposures
+        self.means = np.zeros((0, 3))
+        self.stds = np.zeros((0, 3))
+
+        self.noise_model = None
+        self.params = None
+
+    def add_measurements(self, mean_mat, std_mat):
+        """
+        Add the gray patches statistics of an exposure.
+        """
+        self.means = np.vstack([self.means, mean_mat])
+        self.stds = np.vstack([self.stds, std_mat])
+
+    @timed("bnr.fit_noise_model", "optimizer")
+    def fit_noise_model(self):
+        """
+        Fit the noise model var = gain x mean + read_var of each channel
+        (shot and read noise) by least squares on all the measurements.
+        Returns the (3 x 2) model of gains and read noise variances.
+        """
+        model = np.zeros((3, 2))
+        for ch_idx in range(3):
+            means, variances = self.means[:, ch_idx], self.stds[:, ch_idx] ** 2
+            if len(means) > 1 and np.ptp(means) > 0:
+                design = np.column_stack([means, np.ones(len(means))])
+                model[ch_idx] = np.linalg.lstsq(design, variances, rcond=None)[0]
+            else:
+                model[ch_idx] = [0, np.mean(variances)]
+
+        # Non-negative noise components
+        self.noise_model = np.clip(model, 0, None)
+        return self.noise_model
+
+    def get_noise_std(self, level):
+        """
+        Returns the modeled noise std of each channel at the given level.
+        """
+        variances = self.noise_model[:, 0] * level + self.noise_model[:, 1]
+        return np.sqrt(np.maximum(variances, np.finfo(np.float64).eps))
+
+    def recommend(self, ref_level=None):
+        """
+        There are 3 steps involved in the function.
+        1) Fit the noise model and get the noise std of each channel at the
+           reference level (average of the gray patches by default).
+        2) Range sigmas: the range_factor multiple of the noise std, so the
+           noise differences are smoothed and the larger edges preserved.
+        3) Spatial sigmas: a gaussian of sigma s (channel pixels) averages
+           about 4 x pi x s^2 pixels, s is selected to reach the target SNR
+           at the reference level, limited to [0.5, 2] channel pixels. The
+           filter window is the smallest one covering 2 sigmas.
+        """
+        self.fit_noise_model()
+        if ref_level is None:
+            ref_level = float(np.mean(self.means))
+
+        noise_std = self.get_noise_std(ref_level)
+        range_sigmas = self.range_factor * noise_std
+
+        reduction = np.maximum(self.target_snr * noise_std / max(ref_level, 1e-6), 1)
+        channel_sigmas = np.clip(reduction / (2 * np.sqrt(np.pi)), 0.5, 2.0)
+        spatial_sigmas = channel_sigmas * self.channel_strides
+
+        half_taps = int(np.clip(np.ceil(2 * channel_sigmas.max()), 1, 3))
+        filter_window = self.filter_windows[half_taps - 1]
+
+        self.params = {
+            "filter_window": filter_window,
+            "ref_level": ref_level,
+            "noise_std": noise_std,
+        }
+        for ch_idx, name in enumerate(["r", "g", "b"]):
+            self.params[f"{name}_std_dev_s"] = round(float(spatial_sigmas[ch_idx]), 2)
+            self.params[f"{name}_std_dev_r"] = round(float(range_sigmas[ch_idx]), 4)
+
+        return self.params
+
+    def get_config_params(self):
+        """
+        Returns the parameters in the order of the config file.
+        """
+        return (
+            self.params["filter_window"],
+            self.params["r_std_dev_s"],
+            self.params["r_std_dev_r"],
+            self.params["g_std_dev_s"],
+            self.params["g_std_dev_r"],
+            self.params["b_std_dev_s"],
+            self.params["b_std_dev_r"],
+        )
+
+    def get_filter_luts(self, ch_idx):
+        """
+        Returns the spatial kernel and the range curve of a channel, built as
+        in the .h file (weights scaled to 255).
+        """
+        name = self.channel_names[ch_idx].lower()
+        max_value = 2**self.bit_depth - 1
+        sigma_r = self.params[f"{name}_std_dev_r"] * max_value
+
+        spatial = CreateHFileData.gauss_kern_raw(
+            (self.params["filter_window"] + 1) // 2,
+            self.params[f"{name}_std_dev_s"],
+            self.channel_strides[ch_idx],
+        )
+        curve = CreateHFileData.x_bf_make_color_curve(9, 2 * sigma_r, sigma_r, 255)
+        return spatial.astype(np.float64), curve
+
+    def apply_bilateral(self, channel, ch_idx):
+        """
+        Reference bilateral filter of a bayer channel with the
+        recommended parameters of the channel.
+        """
+        spatial, curve = self.get_filter_luts(ch_idx)
+        taps = spatial.shape[0]
+        pad = taps // 2
+
+        # Differences below the first curve point get the max weight and
+        # above the last point get zero weight
+        x_points = np.concatenate([[0], curve[:, 0]])
+        y_points = np.concatenate([[255], curve[:, 1]])
+
+        channel = channel.astype(np.float64)
+        padded = np.pad(channel, pad, mode="reflect")
+        height, width = channel.shape
+
+        filtered = np.zeros_like(channel)
+        sum_weights = np.zeros_like(channel)
+        for row in range(taps):
+            for col in range(taps):
+                shifted = padded[row : row + height, col : col + width]
+                range_wts = np.interp(np.abs(shifted - channel), x_points, y_points, right=0)
+                weights = spatial[row, col] * range_wts
+                filtered += weights * shifted
+                sum_weights += weights
+
+        return filtered / np.maximum(sum_weights, np.finfo(np.float64).eps)
+
+    def preview_patches(self, raw_image, bayer, gray_patches_points):
+        """
+        Filter the gray patches only (with a margin for the filter support),
+        display the std of each channel before and after the filtering and
+        show the G channel of the patches before and after.
+        """
+        max_value = 2**self.bit_depth - 1
+        margin = self.params["filter_window"]
+
+        before, after, previews = [], [], []
+        for (x_0, y_0), (x_1, y_1) in gray_patches_points:
+            # Even aligned ROI keeps the bayer phase of the raw image
+            roi_x0, roi_y0 = max((x_0 - margin) // 2 * 2, 0), max((y_0 - margin) // 2 * 2, 0)
+            roi = raw_image[roi_y0 : y_1 + margin, roi_x0 : x_1 + margin]
+
+            # Patch area in channel coordinates
+            inner = np.s_[
+                (y_0 - roi_y0 + 1) // 2 : (y_1 - roi_y0) // 2,
+                (x_0 - roi_x0 + 1) // 2 : (x_1 - roi_x0) // 2,
+            ]
+
+            r_ch, gr_ch, gb_ch, b_ch = get_bayer_channels(roi, bayer)
+            channels = [(r_ch, 0), (gr_ch, 1), (gb_ch, 1), (b_ch, 2)]
+            filtered = [self.apply_bilateral(channel, ch_idx) for channel, ch_idx in channels]
+
+            before.append([np.std(channel[inner]) for channel, _ in channels])
+            after.append([np.std(channel[inner]) for channel in filtered])
+            previews.append((gr_ch[inner], filtered[1][inner]))
+
+        # Gr and Gb stds are averaged for the G channel
+        before = np.array(before) / max_value
+        after = np.array(after) / max_value
+        before = np.column_stack([before[:, 0], before[:, 1:3].mean(axis=1), before[:, 3]])
+        after = np.column_stack([after[:, 0], after[:, 1:3].mean(axis=1), after[:, 3]])
+
+        self.display_preview(before, after)
+        self.show_preview(previews)
+        return before, after
+
+    def display_params(self):
+        """
+        Display the noise model and the recommended parameters
+        """
+        generate_separator("Bayer Noise Model", "-")
+        print(f"Measurements = {len(self.means)} gray patches")
+        for ch_idx, name in enumerate(self.channel_names):
+            print(
+                f"{name} Channel  var = {self.noise_model[ch_idx, 0]:.3e} x mean + "
+                f"{self.noise_model[ch_idx, 1]:.3e}"
+            )
+
+        generate_separator("Recommended BNR Parameters", "-")
+        print(f"Reference level = {self.params['ref_level']:.4f}")
+        print("filter_window   = ", self.params["filter_window"])
+        for name in ["r", "g", "b"]:
+            print(
+                f"{name}_std_dev_s     =  {self.params[f'{name}_std_dev_s']}, "
+                f"{name}_std_dev_r = {self.params[f'{name}_std_dev_r']}"
+            )
+        print()
+
+    def display_preview(self, before, after):
+        """
+        Display the std of the gray patches before and after the filtering
+        """
+        generate_separator("BNR Preview (std before -> after)", "-")
+        print("{: <8}{: <22}{: <22}{: <22}".format("Patch", "R", "G", "B"))
+        for count, (row_before, row_after) in enumerate(zip(before, after)):
+            print(
+                "{: <8}{: <22}{: <22}{: <22}".format(
+                    count + 1,
+                    *[f"{val_b:.4f} -> {val_a:.4f}" for val_b, val_a in zip(row_before, row_after)],
+                )
+            )
+        print()
+
+    def show_preview(self, previews):
+        """
+        Show the G channel of the gray patches before and after the filtering
+        """
+        fig, axes = plt.subplots(2, len(previews), squeeze=False)
+        fig.suptitle("BNR Preview (Gr channel)")
+        for count, (before, after) in enumerate(previews):
+            vmin, vmax = np.percentile(before, [1, 99])
+            axes[0, count].imshow(before, cmap="gray", vmin=vmin, vmax=vmax)
+            axes[1, count].imshow(after, cmap="gray", vmin=vmin, vmax=vmax)
+            axes[0, count].set_title(f"Patch {count + 1}")
+            axes[0, count].axis("off")
+            axes[1, count].axis("off")
+        axes[0, 0].text(-0.1, 0.5, "Before", transform=axes[0, 0].transAxes, ha="right")
+        axes[1, 0].text(-0.1, 0.5, "After", transform=axes[1, 0].transAxes, ha="right")
+        plt.show()
@@ -13,6 +13,10 @@ from scipy.optimize import minimize
 from skimage import color
 from src.menu.menu_common_func import end_tuning_tool
 from src.modules.WB.white_balance_algo import WhiteBalanceAlgo as WBAlgo
+from src.utils.chart_layout import get_chart_layout
+from src.utils.fixed_point import FixedPoint
+from src.utils.profiling import span, timed
+from src.utils.result_cache import result_cache
 from src.utils.gui_common_utils import (
     generate_separator,
     determine_image_scale_factor,
@@ -28,12 +32,17 @@ class ColorCorrectionMatrixAlgo:
     Color Correction Matrix (CCM)
     """
 
-    def __init__(self):
+    def __init__(self, chart_layout=None):
         """
         At the start of the algorithm, first of all,
-         reads the input reference files.
+         reads the input reference files of the chart.
+        The ColorChecker 24 layout is used if no chart layout is given.
         """
         self.data = CcmAlgoStorage()
+        self.data.chart_layout = (
+            get_chart_layout() if chart_layout is None else chart_layout
+        )
+        self.data.total_patches = self.data.chart_layout.total_patches
         self.load_ref_files()
 
     def load_ref_files(self):
@@ -41,44 +50,32 @@ class ColorCorrectionMatrixAlgo:
         Loading reference files
         """
         data = self.data
-
-        # Load the reference file (refD65Lab.txt) that is present in
-        # the "Input Files" directory of this project.
-        ref_file_dir = "app_data"
-        file_ref_d65_lab = "refD65Lab.txt"
-        file_ref_d65_lin = "refD65Lin.txt"
-
-        # Join file and dir and load file if file exists
-        ref_d65_lab_path = os.path.join(os.getcwd(), ref_file_dir, file_ref_d65_lab)
-        ref_d65_lin_path = os.path.join(os.getcwd(), ref_file_dir, file_ref_d65_lin)
-
-        # Check and exit the project if refD65Lab file does not exit.
-        if os.path.exists(ref_d65_lab_path):
-            data.ref_d65_lab = self.read_input_file(ref_d65_lab_path)
-        else:
-            print(
-                "\n\033[31mError!\033[0m File (refD65Lab.txt) does not exist in ' "
-                + ref_file_dir
-                + '" directory.',
-            )
-            end_tuning_tool()
-
-        # Check and exit the program if refD65Lin file does not exit.
-        if os.path.exists(ref_d65_lin_path):
-            data.ref_d65_lin = self.read_input_file(ref_d65_lin_path)
-        else:
-            print(
-                "\n\033[31mError!\033[0m File (refD65Lin.txt) does not exist in '"
-                + ref_file_dir
-                + '" directory.'
-            )
-            end_tuning_tool()
+        chart_layout = data.chart_layout
+
+        # Load the reference files of the chart (e.g. refD65Lab.txt and
+        # refD65Lin.txt) that are present in the "app_data" directory of
+        # this project. Check and exit the project if a file does not exist
+        # or does not contain 3 values for each patch of the chart.
+        data.ref_d65_lab = chart_layout.get_reference_lab()
+        data.ref_d65_lin = chart_layout.get_reference_lin()
+
+        for file_name, ref_data in (
+            (chart_layout.reference_lab, data.ref_d65_lab),
+            (chart_layout.reference_lin, data.ref_d65_lin),
+        ):
+            if ref_data is None:
+                print(
+                    "\n\033[31mError!\033[0m File ("
+                    + file_name
+                    + ') does not exist in "app_data" directory or has invalid data.'
+                )
+                end_tuning_tool()
 
         self.data = data
 
     def get_input_image_data(self):
         """
-        This function returns a mat by joining the data of the 24
+        This function returns a mat by joining the data of the patches
          obtained from the input image and taking its transpose.
         """
         input_mat = np.column_stack((self.data.r_avg, self.data.g_avg, self.data.b_avg))
@@ -185,58 +182,6 @@ class ColorCorrectionMatrixAlgo:
 
         self.data = data
 
-    def read_input_file(self, file_name):
-        """
-        This function takes the input reference files and returns the read data.
-        As the files contains 24 rows and 3 columns with floating points,
-        so if anything does not satisfy the format, the program will exit.
-        """
-        # Open the file in reading mode
-        with open(file_name, "r") as fil:
-            file = fil.read()
-
-            # Split file into lines
-            lines = file.split("\n")
-
-            # Check number of lines
-            if len(lines) != 24:
-                print(
-                    '\n\033[31mError!\033[0m Invalid file "',
-                    os.path.basename(file_name),
-                    '" data.',
-                )
-                end_tuning_tool()
-
-            # Data storage array
-            data = []
-
-            for line in lines:
-                # Split the values in each line
-                values = line.split()
-
-                # Check number of values in a line
-                if len(values) != 3:
-                    print(
-                        '\n\033[31mError!\033[0m Invalid file "',
-                        os.path.basename(file_name),
-                        '" data.',
-                    )
-                    end_tuning_tool()
-                # Convert the values to float
-                try:
-                    values = [float(val) for val in values]
-                except:
-                    print(
-                        '\n\033[31mError!\033[0m Invalid file "',
-                        os.path.basename(file_name),
-                        '" data.',
-                    )
-                    end_tuning_tool()
-
-                data.append(values)
-        data = np.array(data)
-        return data
-
     def calculate_ccm_matrix(self):
         """
         Obtained all the required data/arguments for the algorithm,
@@ -266,30 +211,37 @@ class ColorCorrectionMatrixAlgo:
         cons_without_wb = [diag1, diag2, diag3]
 
         # Apply the minimze function according to the user's selected parameters.
-        if data.maintain_wb:
-            sol = minimize(
-                self.cosfunction,
-                data.initial_cccm,
-                args=arguments,
-                method="trust-constr",
-                constraints=cons_with_wb,
-            )
-        else:
-            sol = minimize(
-                self.cosfunction,
+        constraints = cons_with_wb if data.maintain_wb else cons_without_wb
+
+        # The solution is cached on disk by all the inputs of the optimizer
+        key = result_cache.get_key(
+            "ccm_solution",
+            params=[
+                arguments,
                 data.initial_cccm,
-                args=arguments,
-                method="trust-constr",
-                constraints=cons_without_wb,
+                data.maintain_wb,
+                data.is_delta_e,
+                data.total_patches,
+            ],
+        )
+        with span("ccm.minimize", "optimizer"):
+            solution = result_cache.get_or_compute(
+                key,
+                lambda: minimize(
+                    self.cosfunction,
+                    data.initial_cccm,
+                    args=arguments,
+                    method="trust-constr",
+                    constraints=constraints,
+                ).x,
             )
 
         # Convert the resultant-ccm array into a 3x3 mat
-        ccm_matrix_floating = sol.x.reshape((3, 3))
+        ccm_matrix_floating = solution.reshape((3, 3))
 
-        # Convert the resultant-ccm into int values
-        int_muliplier = np.power(2, 10)
-        ccm_matrix_int = ccm_matrix_floating * int_muliplier
-        ccm_matrix_int = np.round(ccm_matrix_int)
+        # Convert the resultant-ccm into int values with 10 fractional bits
+        fixed_point = FixedPoint(True, 16, 10, rounding="around")
+        ccm_matrix_int = fixed_point.to_int(ccm_matrix_floating)
         data.ccm_float = ccm_matrix_floating
 
         # Separate ccm matrix into red_channel,green_channel and blue_channel channels
@@ -382,15 +334,24 @@ class ColorCorrectionMatrixAlgo:
         """
         data = self.data
 
+        # Darkest neutral patch of the chart
+        black_patch = data.chart_layout.get_black_patch()
+        if black_patch is None:
+            print(
+                "\n\033[31mError!\033[0m Chart layout '"
+                + data.chart_layout.name
+                + "' has no black (neutral) patch."
+            )
+            end_tuning_tool()
         input_black_patch_avg = np.mean(
-            [data.r_avg[23], data.b_avg[23], data.g_avg[23]]
+            [data.r_avg[black_patch], data.b_avg[black_patch], data.g_avg[black_patch]]
         )
 
         # Zero division check
         if input_black_patch_avg == 0:
             amp_fact = 1
         else:
-            ref_black_patch_avg = np.mean(data.ref_d65_lin[23])
+            ref_black_patch_avg = np.mean(data.ref_d65_lin[black_patch])
             amp_fact = ref_black_patch_avg / input_black_patch_avg
 
         amp_fact_mat = np.array([[amp_fact]])
@@ -412,18 +373,33 @@ class ColorCorrectionMatrixAlgo:
 
         self.data = data
 
-    def execute_algo(self):
+    def set_raw_statistics(self, raw_stats_algo):
+        """
+        Set the algorithm that provides the patch statistics
+        calculated on the black level corrected raw data.
+        """
+        self.data.raw_stats_algo = raw_stats_algo
+
+    def execute_algo(self, display=True):
         """
-        Get requirements for algorithm and implement it
+        Get requirements for algorithm and implement it, the input and
+        output images are displayed if required.
         """
         data = self.data
         wb_flag = data.wb_flag
-        wb_algo = WBAlgo(data.rgb_image, data.sub_rect_points)
-        data.r_avg, data.g_avg, data.b_avg = wb_algo.get_patches_averages()
+        wb_algo = WBAlgo(data.rgb_image, data.sub_rect_points, data.chart_layout)
+
+        # Patch statistics are taken from the raw data if they are set,
+        # otherwise from the rgb image.
+        stats_algo = wb_algo
+        if data.raw_stats_algo is not None:
+            stats_algo = data.raw_stats_algo
+
+        data.r_avg, data.g_avg, data.b_avg = stats_algo.get_patches_averages()
 
         # Check if white balance flag is true
         if wb_flag is True:
-            r_gain, b_gain = wb_algo.calculate_wb_gains()
+            r_gain, b_gain = stats_algo.calculate_wb_gains()
             data.white_balanced_image = wb_algo.apply_wb_gains(r_gain, b_gain)
             self.apply_wb_gains_on_patches(r_gain, b_gain)
         else:
@@ -433,47 +409,41 @@ class ColorCorrectionMatrixAlgo:
         self.find_initial_ccm()
         ccm_mat = self.calculate_ccm_matrix()
         self.display_ccm_matrix(ccm_mat)
-        self.ccm_output_frame()
+        if display:
+            self.ccm_output_frame()
 
         self.data = data
 
     def calculate_error(self, ref_lab, lab_img):
         """
-        Calcuate the error depending on user's selected type.
+        Calcuate the error depending on user's selected type. The error
+        of all the patches (3 x total patches Lab mats) is calculated at once.
         """
         data = self.data
 
-        # Define a mat to store the error crossponding to 24 patches.
-        error_mat = np.ones((24, 1), dtype=np.float64)
-
+        # Error crossponding to each patch
         if not data.is_delta_e:
-            for i in range(data.total_patches):
-                error_mat[i, 0] = self.delta_c00(
-                    [ref_lab[0, i], ref_lab[1, i], ref_lab[2, i]],
-                    [lab_img[0, i], lab_img[1, i], lab_img[2, i]],
-                )
+            error_mat = self.delta_c00(ref_lab, lab_img)
         else:
-            for i in range(data.total_patches):
-                error_mat[i, 0] = self.delta_e00(
-                    [ref_lab[0, i], ref_lab[1, i], ref_lab[2, i]],
-                    [lab_img[0, i], lab_img[1, i], lab_img[2, i]],
-                )
+            error_mat = self.delta_e00(ref_lab, lab_img)
+
         self.data = data
-        return error_mat
+        return error_mat.reshape((data.total_patches, 1))
 
     def delta_e00(
         self, lab_color_vector, lab_color_array, kl_var=1, kc_var=1, kh_var=1
     ):
         """
-        Calculates the Delta E (CIE2000) of two colors.
+        Calculates the Delta E (CIE2000) of two colors, or of two arrays of
+        colors given as (L, a, b) arrays.
         """
         warnings.simplefilter("ignore")
         l_in_lab, a_in_lab, b_in_lab = lab_color_vector
 
         avg_lp = (l_in_lab + lab_color_array[0]) / 2.0
 
-        c1_var = np.sqrt(np.sum(np.power(lab_color_vector[1:], 2)))
-        c2_var = np.sqrt(np.sum(np.power(lab_color_array[1:], 2)))
+        c1_var = np.hypot(a_in_lab, b_in_lab)
+        c2_var = np.hypot(lab_color_array[1], lab_color_array[2])
 
         avg_c1_c2 = (c1_var + c2_var) / 2.0
 
@@ -542,15 +512,16 @@ class ColorCorrectionMatrixAlgo:
         self, lab_color_vector, lab_color_array, kl_var=1, kc_var=1, kh_var=1
     ):
         """
-        Calculates the Delta E (CIE2000) of two colors.
+        Calculates the Delta E (CIE2000) of two colors, or of two arrays of
+        colors given as (L, a, b) arrays.
         """
         warnings.simplefilter("ignore")
         _, a_in_lab, b_in_lab = lab_color_vector
 
         # avg_lp = (l_in_lab + lab_color_array[0]) / 2.0
 
-        c1_var = np.sqrt(np.sum(np.power(lab_color_vector[1:], 2)))
-        c2_var = np.sqrt(np.sum(np.power(lab_color_array[1:], 2)))
+        c1_var = np.hypot(a_in_lab, b_in_lab)
+        c2_var = np.hypot(lab_color_array[1], lab_color_array[2])
 
         avg_c1_c2 = (c1_var + c2_var) / 2.0
 
@@ -614,6 +585,7 @@ class ColorCorrectionMatrixAlgo:
             + r_t * (delta_cp / (s_c * kc_var)) * (delta_hp / (s_h * kh_var))
         )
 
+    @timed("apply_ccm", "color")
     def apply_ccm(self):
         """
         Apply CCM Params
@@ -781,12 +753,14 @@ class CcmAlgoStorage:
         self.root = None
 
         self.sub_rect_points = []
+        self.raw_stats_algo = None
         self.r_avg = []
         self.g_avg = []
         self.b_avg = []
         self.ref_d65_lab = None
         self.ref_d65_lin = None
-        self.total_patches = 24
+        self.chart_layout = None
+        self.total_patches = None
 
         self.ccm_r = []
         self.ccm_g = []
@@ -8,8 +8,11 @@ import os
 from src.utils.algo_common_utils import select_image_and_get_para
 from src.utils.gui_common_utils import generate_separator
 from src.utils.area_selection_frame import SelectAreaFrame as select_area_frame
+from src.utils.session_workspace import SessionWorkspace
 from src.utils.read_yaml_file import ReadWriteYMLFile
 from src.modules.CCM.ccm_algo import ColorCorrectionMatrixAlgo as CcmAlgo
+from src.modules.WB.white_balance_algo import RawWhiteBalanceAlgo
+from src.modules.BLC.blc_algo import BlackLevelsAlgo
 
 
 class ColorCorrectionMatrixModule:
@@ -17,19 +20,29 @@ class ColorCorrectionMatrixModule:
     CCM Module
     """
 
-    def __init__(self, in_config_file):
+    def __init__(self, in_config_file, workspace=None):
         self.in_config_file = in_config_file
+
+        # Image and patches shared with the other modules of the session
+        self.workspace = SessionWorkspace() if workspace is None else workspace
         self.raw_image_para = None
         self.maintain_wb = True
         self.selection_frame = None
         self.is_delta_e = True
         self.ccm_algo = None
         self.wb_flag = False
+        self.raw_stats_flag = False
 
-    def is_image_and_para_loaded(self):
+    def is_image_and_para_loaded(self, raw_image_para=None):
         """
         To check if the image is loaded, if true store respective parameters.
+        The image of the session workspace is used if its parameters are given,
+        otherwise a newly loaded image is kept in the workspace.
         """
+        if raw_image_para is not None:
+            self.raw_image_para = raw_image_para
+            return True
+
         file_type = (
             ("RAW Files (*.raw)", "*.raw"),
             (
@@ -40,18 +53,25 @@ class ColorCorrectionMatrixModule:
         )
 
         is_selected, self.raw_image_para = select_image_and_get_para(file_type)
+        if is_selected:
+            self.workspace.set_image(self.raw_image_para)
 
         return is_selected
 
-    def color_checker_selection_frame(self):
+    def color_checker_selection_frame(self, selection_frame=None):
         """
         Open the color checker patches selection frame and return
         true if patches are drawn and saved using continue button
-        otherwise return false
+        otherwise return false.
+        The patches of the session workspace are used if their selection
+        frame is given.
         """
-        self.selection_frame = select_area_frame(self.raw_image_para.rgb_image)
+        if selection_frame is None:
+            selection_frame = select_area_frame(self.raw_image_para.rgb_image)
+        self.selection_frame = selection_frame
 
         if self.selection_frame.data.is_data_saved:
+            self.workspace.set_selection(self.selection_frame)
             return True
         return False
 
@@ -62,6 +82,19 @@ class ColorCorrectionMatrixModule:
         """
         self.wb_flag = flag
 
+    def is_raw_image_loaded(self):
+        """
+        Return true if the loaded image is a raw image.
+        """
+        return self.raw_image_para.raw_image is not None
+
+    def set_raw_stats_flag(self, flag):
+        """
+        Set flag to true if the patch statistics need to be calculated
+        on the black level corrected raw data.
+        """
+        self.raw_stats_flag = flag
+
     def set_algo_type(self, algo_type):
         """
         Set the algorithm type, existing algorithms are
@@ -75,12 +108,14 @@ class ColorCorrectionMatrixModule:
         """
         self.maintain_wb = status
 
-    def start_algo(self):
+    def start_algo(self, display=True):
         """
         Start the ccm algorithm for which first get and set the
-        required parameters and then implement algo.
+        required parameters and then implement algo. The output
+        frame is not displayed if display is false.
         """
-        self.ccm_algo = CcmAlgo()
+        chart_layout = self.selection_frame.get_chart_layout()
+        self.ccm_algo = CcmAlgo(chart_layout)
         self.ccm_algo.set_parameters(
             self.selection_frame.get_sub_rect_points(),
             self.raw_image_para.rgb_image,
@@ -88,8 +123,22 @@ class ColorCorrectionMatrixModule:
             self.maintain_wb,
             self.wb_flag,
         )
+
+        if self.raw_stats_flag and self.is_raw_image_loaded():
+            corrected_raw = BlackLevelsAlgo(
+                self.raw_image_para
+            ).get_config_corrected_raw(self.in_config_file)
+            self.ccm_algo.set_raw_statistics(
+                RawWhiteBalanceAlgo(
+                    self.raw_image_para,
+                    self.selection_frame.get_sub_rect_points(),
+                    corrected_raw,
+                    chart_layout,
+                )
+            )
+
         generate_separator("Algorithm is running", "-")
-        self.ccm_algo.execute_algo()
+        self.ccm_algo.execute_algo(display)
         generate_separator("Process completed", "-")
 
     def save_ccm_config_file(self):
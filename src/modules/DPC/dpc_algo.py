@@ -0,0 +1,224 @@
+"""
+File: dpc_algo.py
+Description: Detects the defective (hot / dead) pixels and recommends the dp_threshold
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import numpy as np
+from src.utils.gui_common_utils import generate_separator
+from src.utils.algo_common_utils import get_bayer_channels
+
+
+class DefectPixelAlgo:
+    """
+    Defective Pixels Detection
+    """
+
+    # Kinds of defects, a pixel can be of both kinds in different frames
+    hot_pixel = 1
+    dead_pixel = 2
+
+    # Offsets of the 8 neighbours of the same bayer plane
+    neighbour_offsets = [
+        (-2, -2), (-2, 0), (-2, 2),
+        (0, -2), (0, 2),
+        (2, -2), (2, 0), (2, 2),
+    ]
+
+    # Scale factor of the median absolute deviation (MAD) to
+    # estimate the standard deviation of a normal distribution
+    mad_scale = 1.4826
+
+    def __init__(self, bayer, bit_depth, sigma_threshold=6.0, tile_rows=256):
+        """
+        bayer           : bayer pattern of the frames
+        bit_depth       : bit depth of the frames
+        sigma_threshold : pixels deviating from the median of their neighbours
+                          by more than sigma_threshold x noise are defective
+        tile_rows       : rows processed at once to bound the memory on large sensors
+        """
+        self.bayer = bayer
+        self.bit_depth = bit_depth
+        self.sigma_threshold = sigma_threshold
+        self.tile_rows = max(2, tile_rows // 2 * 2)
+
+        # Defects of all the frames as a dict of (row, col) to kind
+        self.defects = {}
+
+        # Histogram of the dpc detection metric of the non-defective pixels
+        self.metric_hist = np.zeros(2**bit_depth, dtype=np.int64)
+
+    def get_tiles(self, frame):
+        """
+        Yield the row tiles of a frame padded by 2 pixels (reflected at the
+        image borders), along with the index of the first row of the tile.
+        The reflection keeps the bayer phase of the padded pixels. For a
+        stack of frames (frames x height x width) the tiles are averaged
+        over all the frames to reduce the temporal noise.
+        """
+        height = frame.shape[-2]
+        for row in range(0, height, self.tile_rows):
+            end = min(row + self.tile_rows, height)
+            start_ext, end_ext = max(0, row - 2), min(height, end + 2)
+
+            tile = frame[..., start_ext:end_ext, :]
+            if tile.ndim == 3:
+                tile = tile.mean(axis=0, dtype=np.float32)
+            tile = np.float32(tile)
+            pad_top = 2 - (row - start_ext)
+            pad_bottom = 2 - (end_ext - end)
+
+            yield row, np.pad(tile, ((pad_top, pad_bottom), (2, 2)), mode="reflect")
+
+    def get_tile_stats(self, tile):
+        """
+        Returns the deviation of each pixel from the median of its 8 neighbours
+        of the same bayer plane and the dpc metric, i.e. the distance of the
+        pixel beyond the range (min, max) of its neighbours.
+        """
+        rows, cols = tile.shape[0] - 4, tile.shape[1] - 4
+        center = tile[2:-2, 2:-2]
+
+        neighbours = np.stack(
+            [tile[2 + dy : 2 + dy + rows, 2 + dx : 2 + dx + cols]
+             for dy, dx in self.neighbour_offsets]
+        )
+
+        # Median of 8 values is the average of the 4th and 5th smallest values
+        neighbours.partition([3, 4], axis=0)
+        median = (neighbours[3] + neighbours[4]) / 2
+        nb_min, nb_max = neighbours.min(axis=0), neighbours.max(axis=0)
+
+        deviation = center - median
+        metric = np.maximum(center - nb_max, nb_min - center)
+        return deviation, metric
+
+    def get_noise_levels(self, frame):
+        """
+        Estimate the median and the noise (scaled MAD) of the deviations of
+        each bayer plane using a decimated sample of each tile.
+        """
+        samples = [[], [], [], []]
+        for _, tile in self.get_tiles(frame):
+            deviation, _ = self.get_tile_stats(tile)
+            # Tile rows are even, so the bayer phase of the tiles is the same
+            for idx, channel in enumerate(get_bayer_channels(deviation, self.bayer)):
+                samples[idx].append(channel[::4, ::4].ravel())
+
+        levels = []
+        for sample in samples:
+            sample = np.concatenate(sample)
+            median = np.median(sample)
+            noise = self.mad_scale * np.median(np.abs(sample - median))
+            levels.append((median, max(noise, 1.0)))
+        return levels
+
+    def get_threshold_map(self, levels, shape):
+        """
+        Returns the (median, threshold) of the deviation of each pixel of a tile.
+        """
+        median_map = np.empty(shape, dtype=np.float32)
+        thresh_map = np.empty(shape, dtype=np.float32)
+        for (median, noise), med_ch, thr_ch in zip(
+            levels,
+            get_bayer_channels(median_map, self.bayer),
+            get_bayer_channels(thresh_map, self.bayer),
+        ):
+            med_ch[:] = median
+            thr_ch[:] = self.sigma_threshold * noise
+        return median_map, thresh_map
+
+    def detect(self, frame, kinds):
+        """
+        Detect the defective pixels of a frame (or a stack of frames). The
+        frame may be a numpy array or a memory map, only a tile of it is
+        processed at once. kinds is the combination of hot_pixel and
+        dead_pixel to look for (e.g. hot pixels only in a dark frame).
+        Returns the number of defects found.
+        """
+        levels = self.get_noise_levels(frame)
+        max_metric = 2**self.bit_depth - 1
+        total = 0
+
+        for row, tile in self.get_tiles(frame):
+            deviation, metric = self.get_tile_stats(tile)
+            median_map, thresh_map = self.get_threshold_map(levels, deviation.shape)
+            deviation -= median_map
+
+            is_hot = deviation > thresh_map
+            is_dead = deviation < -thresh_map
+            is_defect = (is_hot & bool(kinds & self.hot_pixel)) | (
+                is_dead & bool(kinds & self.dead_pixel)
+            )
+
+            # Histogram of the metric of the non-defective pixels
+            good_metric = np.clip(metric[~(is_hot | is_dead)], 0, max_metric)
+            self.metric_hist += np.bincount(
+                good_metric.astype(np.int64), minlength=max_metric + 1
+            )
+
+            rows, cols = np.nonzero(is_defect)
+            for d_row, d_col, hot in zip(rows + row, cols, is_hot[rows, cols]):
+                kind = self.hot_pixel if hot else self.dead_pixel
+                key = (int(d_row), int(d_col))
+                self.defects[key] = self.defects.get(key, 0) | kind
+            total += len(rows)
+
+        return total
+
+    def recommend_threshold(self, false_rate=1e-5):
+        """
+        Recommend the dp_threshold so that at most false_rate of the
+        non-defective pixels are detected (and corrected) by the dpc.
+        """
+        total = self.metric_hist.sum()
+        if total == 0:
+            return 0
+
+        cum_hist = np.cumsum(self.metric_hist)
+        threshold = int(np.searchsorted(cum_hist, (1 - false_rate) * total)) + 1
+        return threshold
+
+    def get_defect_arrays(self):
+        """
+        Returns the rows, columns and kinds of the defects sorted by position.
+        """
+        if not self.defects:
+            return (
+                np.zeros(0, np.uint16),
+                np.zeros(0, np.uint16),
+                np.zeros(0, np.uint8),
+            )
+
+        positions = np.array(sorted(self.defects), dtype=np.uint16)
+        kinds = np.array([self.defects[tuple(pos)] for pos in positions.tolist()], np.uint8)
+        return positions[:, 0], positions[:, 1], kinds
+
+    def save_defects(self, out_file, width, height):
+        """
+        Save the defect coordinate list in a compressed numpy (.npz) file.
+        """
+        rows, cols, kinds = self.get_defect_arrays()
+        np.savez_compressed(
+            out_file,
+            rows=rows,
+            cols=cols,
+            kinds=kinds,
+            width=width,
+            height=height,
+            bayer=self.bayer,
+        )
+
+    def display_summary(self, threshold, total_pixels):
+        """
+        Display the defects found and the recommended threshold
+        """
+        _, _, kinds = self.get_defect_arrays()
+        total_hot = int(np.count_nonzero(kinds & self.hot_pixel))
+        total_dead = int(np.count_nonzero(kinds & self.dead_pixel))
+
+        generate_separator("Defective Pixels", "-")
+        print("Hot pixels   = ", total_hot)
+        print("Dead pixels  = ", total_dead)
+        print(f"Defect ratio =  {len(kinds) / total_pixels * 1e6:.2f} ppm\n")
+        print("Recommended dp_threshold = ", threshold, "\n")
@@ -0,0 +1,128 @@
+"""
+File: dpc_module.py
+Description: Executes the module flow for the defective pixels detection
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+from src.modules.DPC.dpc_algo import DefectPixelAlgo
+from src.utils.algo_common_utils import (
+    select_files,
+    parse_file_name,
+    get_raw_frames_map,
+)
+from src.utils.gui_common_utils import file_saving_path, generate_separator
+from src.utils.read_yaml_file import ReadWriteYMLFile
+
+
+class DefectPixelModule:
+    """
+    Defective Pixels Detection Module
+    """
+
+    def __init__(self, in_config_file):
+        self.in_config_file = in_config_file
+        self.parameters = None
+        self.frames = []
+        self.dpc_algo = None
+        self.dp_threshold = None
+
+    def is_frames_loaded(self, scan_dark, scan_flat):
+        """
+        Select the dark and / or flat raw files. All the files must have
+        the same size, bit depth and bayer pattern, each file may contain
+        multiple frames.
+        """
+        self.frames = []
+        file_type = (("RAW Files", "*.raw"),)
+
+        selections = []
+        if scan_dark:
+            selections.append(("Open dark raw files.", DefectPixelAlgo.hot_pixel))
+        if scan_flat:
+            selections.append(
+                (
+                    "Open flat raw files.",
+                    DefectPixelAlgo.hot_pixel | DefectPixelAlgo.dead_pixel,
+                )
+            )
+
+        for title, kinds in selections:
+            is_selected, file_names = select_files(title, file_type)
+            if not is_selected:
+                print("\033[31mError!\033[0m File is not selected.")
+                generate_separator("", "*")
+                return False
+
+            for file_name in file_names:
+                parameters = parse_file_name(os.path.basename(file_name))
+                if not parameters or (
+                    self.frames and parameters[1:] != self.parameters[1:]
+                ):
+                    print(
+                        "\033[31mError!\033[0m Invalid file name format or "
+                        "files of different sizes."
+                    )
+                    generate_separator("", "*")
+                    return False
+
+                self.parameters = parameters
+                frames = get_raw_frames_map(file_name, *parameters[1:4])
+                if frames is None:
+                    print("\033[31mError!\033[0m File size does not match expected size.")
+                    generate_separator("", "*")
+                    return False
+
+                self.frames.append((file_name, frames, kinds))
+
+        return True
+
+    def execute(self):
+        """
+        Detect the defective pixels in all the selected files and
+        recommend the dp_threshold.
+        """
+        _, width, height, bit_depth, bayer = self.parameters
+        self.dpc_algo = DefectPixelAlgo(bayer, bit_depth)
+
+        for file_name, frames, kinds in self.frames:
+            total = self.dpc_algo.detect(frames, kinds)
+            print(f"{os.path.basename(file_name)}: {total} defective pixels")
+
+        self.dp_threshold = self.dpc_algo.recommend_threshold()
+        self.dpc_algo.display_summary(self.dp_threshold, width * height)
+
+    def save_defect_list(self):
+        """
+        Save the defect coordinate list in a compressed .npz file.
+        """
+        file_path = file_saving_path(
+            ".npz", [("NumPy Files", "*.npz")], "defect_pixels.npz"
+        )
+        if not file_path:
+            print("\033[31mWarning!\033[0m File destination path is not selected.")
+            generate_separator("", "*")
+            return
+
+        self.dpc_algo.save_defects(file_path, self.parameters[1], self.parameters[2])
+        print(f"Defect list saved to:\n {file_path}")
+        generate_separator("", "*")
+
+    def save_config_file_with_dp_threshold(self):
+        """
+        Save the recommended dp_threshold in Config File.
+        """
+        if not os.path.exists(self.in_config_file):
+            print(
+                "\n\033[31mError!\033[0m File configs.yml does "
+                'not exist in "app_data" directory.'
+            )
+            generate_separator("", "*")
+            return
+
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        yaml_file.set_dpc_data(self.dp_threshold)
+        yaml_file.save_file(self.in_config_file)
+
+        print("File saved at:", os.path.dirname(self.in_config_file))
+        generate_separator("", "*")
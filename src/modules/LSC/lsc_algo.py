@@ -0,0 +1,125 @@
+"""
+File: lsc_algo.py
+Description: Calculates the lens shading gain grids from flat-field captures
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import numpy as np
+from src.utils.gui_common_utils import generate_separator
+from src.utils.algo_common_utils import (
+    get_bayer_channels,
+    block_means,
+    smooth_grid,
+    fit_poly_surface,
+    eval_poly_surface,
+)
+
+
+class LensShadingAlgo:
+    """
+    Lens Shading Calibration
+    """
+
+    channel_names = ["R", "Gr", "Gb", "B"]
+
+    # Order of the polynomial surface, the radial shading of a lens is
+    # mostly of the 4th order
+    default_poly_order = 4
+
+    def __init__(
+        self, bayer, blc_levels, block_size=64, poly_order=default_poly_order, max_gain=8.0
+    ):
+        """
+        bayer      : bayer pattern of the flat-field captures
+        blc_levels : black levels (R, Gr, Gb, B) subtracted from the block means
+        block_size : size of the square blocks of each bayer channel
+        poly_order : order of the polynomial surface, 0 to only smooth the grids
+        max_gain   : gains are clipped to [1, max_gain]
+        """
+        self.bayer = bayer
+        self.blc_levels = np.array(blc_levels[:4], dtype=np.float64)
+        self.block_size = block_size
+        self.poly_order = poly_order
+        self.max_gain = max_gain
+
+        # Sum of the block means (4 x grid_h x grid_w) of all the frames
+        self.sum_grids = None
+        self.total_frames = 0
+
+        self.gains = None
+
+    def add_frame(self, frame):
+        """
+        Add the block means of each bayer channel of a flat-field frame. The
+        frame (a numpy array or a memory map) is processed in bands of one
+        block row, so only a band is loaded in memory at once.
+        """
+        band_rows = 2 * self.block_size
+        grid_h = frame.shape[0] // band_rows
+        grid_w = frame.shape[1] // band_rows
+
+        if grid_h == 0 or grid_w == 0:
+            raise ValueError("Frame is smaller than a block.")
+
+        if self.sum_grids is None:
+            self.sum_grids = np.zeros((4, grid_h, grid_w), dtype=np.float64)
+
+        for row in range(grid_h):
+            band = frame[row * band_rows : (row + 1) * band_rows, : grid_w * band_rows]
+            for idx, channel in enumerate(get_bayer_channels(band, self.bayer)):
+                self.sum_grids[idx, row] += block_means(channel, self.block_size)[0]
+
+        self.total_frames += 1
+
+    def get_mean_grids(self):
+        """
+        Returns the black level corrected block means averaged over all the frames.
+        """
+        mean_grids = self.sum_grids / self.total_frames
+        return mean_grids - self.blc_levels[:, np.newaxis, np.newaxis]
+
+    def get_grid_coords(self):
+        """
+        Returns the normalized [-1, 1] coordinates of the block centers.
+        """
+        grid_h, grid_w = self.sum_grids.shape[1:]
+        return np.linspace(-1, 1, grid_w), np.linspace(-1, 1, grid_h)
+
+    def calculate_gains(self):
+        """
+        There are 2 steps involved in the function.
+        1) Fit a polynomial surface on each averaged black level corrected
+           grid, or smooth it with a 3x3 box filter if poly_order is 0.
+        2) Normalize each grid with its maximum and invert it to get the gains.
+        """
+        x_coords, y_coords = self.get_grid_coords()
+
+        gains = []
+        for grid in self.get_mean_grids():
+            if self.poly_order > 0:
+                coeffs = fit_poly_surface(grid, x_coords, y_coords, self.poly_order)
+                grid = eval_poly_surface(coeffs, x_coords, y_coords, self.poly_order)
+            else:
+                grid = smooth_grid(grid)
+
+            grid = np.maximum(grid, np.finfo(np.float64).eps)
+            gains.append(np.clip(grid.max() / grid, 1, self.max_gain))
+
+        self.gains = np.array(gains)
+        return self.gains
+
+    def display_gains(self):
+        """
+        Display the size and the range of the gain grids
+        """
+        generate_separator("Lens Shading Gains", "-")
+        grid_h, grid_w = self.gains.shape[1:]
+        print(f"Frames     = {self.total_frames}")
+        print(f"Block size = {self.block_size} ({grid_w}x{grid_h} blocks per channel)\n")
+
+        for name, gain in zip(self.channel_names, self.gains):
+            print(
+                f"{name: <2} Channel  min = {gain.min():.3f}, max = {gain.max():.3f}, "
+                f"corner = {gain[0, 0]:.3f}"
+            )
+        print()
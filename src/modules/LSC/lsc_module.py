@@ -0,0 +1,102 @@
+"""
+File: lsc_module.py
+Description: Executes the module flow for the lens shading calibration
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+from src.modules.LSC.lsc_algo import LensShadingAlgo
+from src.utils.algo_common_utils import (
+    select_files,
+    parse_file_name,
+    get_raw_frames_map,
+)
+from src.utils.gui_common_utils import generate_separator
+from src.utils.read_yaml_file import ReadWriteYMLFile
+
+
+class LensShadingModule:
+    """
+    Lens Shading Calibration Module
+    """
+
+    def __init__(self, in_config_file):
+        self.in_config_file = in_config_file
+        self.parameters = None
+        self.file_names = []
+        self.lsc_algo = None
+
+    def is_frames_loaded(self):
+        """
+        Select the flat-field raw files. All the files must have the same size,
+        bit depth and bayer pattern, each file may contain multiple frames.
+        """
+        file_type = (("RAW Files", "*.raw"),)
+        is_selected, file_names = select_files("Open flat-field raw files.", file_type)
+        if not is_selected:
+            print("\033[31mError!\033[0m File is not selected.")
+            generate_separator("", "*")
+            return False
+
+        parameters = [parse_file_name(os.path.basename(name)) for name in file_names]
+        if not all(parameters) or any(
+            para[1:] != parameters[0][1:] for para in parameters
+        ):
+            print(
+                "\033[31mError!\033[0m Invalid file name format or "
+                "files of different sizes."
+            )
+            generate_separator("", "*")
+            return False
+
+        self.parameters = parameters[0]
+        self.file_names = file_names
+        return True
+
+    def execute(self, block_size, is_fit):
+        """
+        Average all the flat-field frames, streaming them from the disk, and
+        calculate the gain grids. The black levels are read from the config.
+        """
+        _, width, height, bit_depth, bayer = self.parameters
+        blc_levels = ReadWriteYMLFile(self.in_config_file).get_blc_data()
+
+        poly_order = LensShadingAlgo.default_poly_order if is_fit else 0
+        self.lsc_algo = LensShadingAlgo(bayer, blc_levels, block_size, poly_order)
+
+        for file_name in self.file_names:
+            frames = get_raw_frames_map(file_name, width, height, bit_depth)
+            if frames is None:
+                print(f"\033[31mWarning!\033[0m Skipped {os.path.basename(file_name)}.")
+                continue
+
+            for frame in frames:
+                self.lsc_algo.add_frame(frame)
+
+        if self.lsc_algo.total_frames == 0:
+            print("\033[31mError!\033[0m File size does not match expected size.")
+            generate_separator("", "*")
+            return False
+
+        self.lsc_algo.calculate_gains()
+        self.lsc_algo.display_gains()
+        return True
+
+    def save_config_file_with_lsc_gains(self):
+        """
+        Save the lens shading gains in Config File.
+        """
+        if not os.path.exists(self.in_config_file):
+            print(
+                "\n\033[31mError!\033[0m File configs.yml does "
+                'not exist in "app_data" directory.'
+            )
+            generate_separator("", "*")
+            return
+
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        yaml_file.set_lsc_data(self.lsc_algo.block_size, self.lsc_algo.gains)
+        yaml_file.save_file(self.in_config_file)
+
+        print("File saved at:", os.path.dirname(self.in_config_file))
+        generate_separator("", "*")
@@ -0,0 +1,291 @@
+"""
+File: mtf_algo.py
+Description: Measures the MTF of slanted edges (ISO 12233 style)
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import csv
+import numpy as np
+from matplotlib import pyplot as plt
+from src.utils.gui_common_utils import generate_separator
+from src.utils.algo_common_utils import get_bayer_channels, bayer_channels_offsets
+
+
+class SlantedEdgeAlgo:
+    """
+    Slanted Edge MTF Measurement
+    """
+
+    # Luminance weights of the R, G and B channels
+    lum_weights = np.array([0.299, 0.587, 0.114])
+
+    # Edge angles (degrees from the vertical or horizontal axis) outside this
+    # range give an unreliable edge spread function
+    angle_range = (1.0, 40.0)
+
+    def __init__(self, oversampling=4):
+        """
+        oversampling : total bins per pixel of the edge spread function
+        """
+        self.oversampling = oversampling
+
+        # Name, roi and measurements of each analyzed edge
+        self.results = []
+
+    def get_roi_planes(self, raw_image_para, roi_rect):
+        """
+        Returns the sample planes of the ROI (x, y, width, height), so only the
+        ROI is processed, as (plane, x shift, y shift) with the position of the
+        first sample of each plane. It is the luminance of an rgb image, or
+        the Gr and Gb channels of a raw image. The Gr and Gb samples are one
+        pixel apart on the diagonal, so they are kept separate and binned at
+        their true positions (averaging them would low-pass filter the edge).
+        The raw channels are sampled at 2 pixels, the shifts are in samples
+        and this pitch is also returned to express the frequencies in
+        cycles/pixel.
+        """
+        x_0, y_0, width, height = roi_rect
+        if raw_image_para.raw_image is None:
+            roi = raw_image_para.rgb_image[y_0 : y_0 + height, x_0 : x_0 + width]
+            return [(np.float64(roi @ self.lum_weights), 0.0, 0.0)], 1
+
+        # Even aligned ROI keeps the bayer phase of the raw image
+        x_0, y_0 = x_0 // 2 * 2, y_0 // 2 * 2
+        roi = raw_image_para.raw_image[y_0 : y_0 + height, x_0 : x_0 + width]
+        _, gr_ch, gb_ch, _ = get_bayer_channels(roi, raw_image_para.bayer_pattern)
+        _, gr_off, gb_off, _ = bayer_channels_offsets[raw_image_para.bayer_pattern.upper()]
+        return [
+            (np.float64(gr_ch), gr_off[1] / 2, gr_off[0] / 2),
+            (np.float64(gb_ch), gb_off[1] / 2, gb_off[0] / 2),
+        ], 2
+
+    def get_edge_line(self, roi):
+        """
+        Locate the edge in each row as the centroid of the (windowed) row
+        derivative and fit a line x = slope x y + offset. The fit is repeated
+        once with the window centered on the first fitted line.
+        """
+        rows, cols = roi.shape
+
+        # Signed derivative, so the noise does not bias the centroids
+        derivative = np.diff(roi, axis=1)
+        if derivative.sum() < 0:
+            derivative = -derivative
+        x_coords = np.arange(cols - 1) + 0.5
+        y_coords = np.arange(rows)
+
+        window = np.ones_like(derivative)
+        for _ in range(2):
+            weighted = derivative * window
+            centroids = (weighted @ x_coords) / np.maximum(weighted.sum(axis=1), 1e-12)
+            slope, offset = np.polyfit(y_coords, centroids, 1)
+
+            # Hamming window of the ROI width centered on the edge of each row
+            centers = slope * y_coords + offset
+            dist = x_coords[np.newaxis, :] - centers[:, np.newaxis]
+            window = 0.54 + 0.46 * np.cos(np.pi * np.clip(dist / (cols / 2), -1, 1))
+
+        return slope, offset
+
+    def get_esf(self, planes, slope, offset):
+        """
+        Returns the oversampled edge spread function, i.e. the samples of all
+        the planes binned by their (horizontal) distance to the edge, at their
+        positions (sample index + plane shift), with vectorized histograms.
+        The edge line is given in these positions.
+        """
+        dists = []
+        for plane, x_shift, y_shift in planes:
+            rows, cols = plane.shape
+            y_grid, x_grid = np.mgrid[0:rows, 0:cols]
+            dists.append(
+                ((x_grid + x_shift) - (slope * (y_grid + y_shift) + offset)).ravel()
+            )
+        dist = np.concatenate(dists)
+        values = np.concatenate([plane.ravel() for plane, _, _ in planes])
+
+        # Distances are projected on the normal of the edge
+        dist *= np.cos(np.arctan(slope))
+
+        bins = np.floor((dist - dist.min()) * self.oversampling).astype(np.int64)
+        counts = np.bincount(bins)
+        sums = np.bincount(bins, weights=values)
+
+        # Empty bins (steep edges) are interpolated from their neighbours
+        valid = counts > 0
+        index = np.arange(len(counts))
+        esf = np.interp(index, index[valid], sums[valid] / counts[valid])
+
+        # Bins on both ends are partially filled, only the central part is used
+        margin = self.oversampling * 2
+        return esf[margin : len(esf) - margin]
+
+    def get_mtf(self, esf, pitch=1):
+        """
+        Returns the frequencies (cycles/pixel) and the MTF of the edge spread
+        function of samples of the given pitch (pixels). The line spread
+        function is windowed around its peak, and the MTF is corrected for
+        the discrete derivative.
+        """
+        lsf = np.gradient(esf)
+        if lsf.sum() < 0:
+            lsf = -lsf
+
+        total = len(lsf)
+        peak = np.argmax(lsf)
+        dist = (np.arange(total) - peak) / total
+        lsf = lsf * (0.54 + 0.46 * np.cos(2 * np.pi * np.clip(dist, -0.5, 0.5)))
+
+        spectrum = np.abs(np.fft.rfft(lsf))
+        freqs = np.fft.rfftfreq(total, d=1 / self.oversampling)
+
+        # Frequency response of the central difference derivative
+        arg = 2 * np.pi * freqs / self.oversampling
+        correction = np.ones_like(freqs)
+        correction[1:] = np.sin(arg[1:]) / arg[1:]
+        mtf = spectrum / spectrum[0] / np.clip(correction, 0.1, None)
+
+        # Frequencies above the Nyquist frequency of the pixels (0.5
+        # cycles/pixel) are not used
+        freqs = freqs / pitch
+        keep = freqs <= 0.5
+        return freqs[keep], mtf[keep]
+
+    @staticmethod
+    def get_frequency_at(freqs, mtf, level):
+        """
+        Returns the first frequency at which the MTF falls below the level
+        (linearly interpolated), None if it never falls below the level.
+        """
+        below = np.nonzero(mtf < level)[0]
+        if len(below) == 0 or below[0] == 0:
+            return None
+        idx = below[0]
+        ratio = (mtf[idx - 1] - level) / (mtf[idx - 1] - mtf[idx])
+        return float(freqs[idx - 1] + ratio * (freqs[idx] - freqs[idx - 1]))
+
+    def analyze(self, name, raw_image_para, roi_rect):
+        """
+        Measure the MTF of the slanted edge in the ROI (x, y, width, height)
+        of an image. Horizontal edges are transposed to vertical ones.
+        """
+        planes, pitch = self.get_roi_planes(raw_image_para, roi_rect)
+
+        roi = planes[0][0]
+        grad_x = np.abs(np.diff(roi, axis=1)).sum()
+        grad_y = np.abs(np.diff(roi, axis=0)).sum()
+        is_horizontal = grad_y > grad_x
+        if is_horizontal:
+            planes = [(plane.T, y_shift, x_shift) for plane, x_shift, y_shift in planes]
+
+        # The edge is located on the first plane, then its line is moved to
+        # the sample positions of the planes
+        roi, x_shift, y_shift = planes[0]
+        slope, offset = self.get_edge_line(roi)
+        offset += x_shift - slope * y_shift
+        angle = float(np.degrees(np.arctan(abs(slope))))
+        freqs, mtf = self.get_mtf(self.get_esf(planes, slope, offset), pitch)
+
+        mtf50 = self.get_frequency_at(freqs, mtf, 0.5)
+        mtf50p = self.get_frequency_at(freqs, mtf, 0.5 * mtf.max())
+
+        result = {
+            "name": name,
+            "roi": tuple(roi_rect),
+            "edge": "horizontal" if is_horizontal else "vertical",
+            "angle": angle,
+            "mtf50": mtf50,
+            "mtf50p": mtf50p,
+            "mtf_nyquist": float(np.interp(0.5, freqs, mtf)),
+            "overshoot": float(mtf.max()),
+            "is_valid": self.angle_range[0] <= angle <= self.angle_range[1],
+            "freqs": freqs,
+            "mtf": mtf,
+        }
+        self.results.append(result)
+        return result
+
+    def get_best_focus(self):
+        """
+        Returns the name of the image with the highest average MTF50.
+        """
+        mtf50 = {}
+        for result in self.results:
+            if result["mtf50"] is not None:
+                mtf50.setdefault(result["name"], []).append(result["mtf50"])
+        if not mtf50:
+            return None
+        return max(mtf50, key=lambda name: np.mean(mtf50[name]))
+
+    def display_report(self):
+        """
+        Display the measurements of all the edges
+        """
+        generate_separator("Slanted Edge MTF (cycles/pixel)", "-")
+        header = "{: <32}{: <22}{: <12}{: <8}{: <8}{: <8}{: <10}{: <8}"
+        print(header.format(
+            "Image", "ROI", "Edge", "Angle", "MTF50", "MTF50P", "MTF@Nyq", "Peak"))
+
+        def fmt(value):
+            return "-" if value is None else f"{value:.3f}"
+
+        for res in self.results:
+            print(
+                header.format(
+                    res["name"][:30],
+                    str(res["roi"]),
+                    res["edge"],
+                    f"{res['angle']:.1f}" + ("" if res["is_valid"] else "!"),
+                    fmt(res["mtf50"]),
+                    fmt(res["mtf50p"]),
+                    fmt(res["mtf_nyquist"]),
+                    fmt(res["overshoot"]),
+                )
+            )
+
+        if any(not res["is_valid"] for res in self.results):
+            print(
+                f"\n! Edge angle out of {self.angle_range[0]}-{self.angle_range[1]} "
+                "degrees, the measurement is unreliable."
+            )
+
+        best = self.get_best_focus()
+        if best is not None and len({res["name"] for res in self.results}) > 1:
+            print(f"\nBest focus (highest mean MTF50): \033[32m{best}\033[0m")
+
+        # A peak above 1 indicates over-sharpening (halos)
+        print()
+
+    def show_mtf_curves(self):
+        """
+        Plot the MTF curves of all the edges
+        """
+        plt.figure("Slanted Edge MTF")
+        for res in self.results:
+            plt.plot(res["freqs"], res["mtf"], label=f"{res['name']} {res['roi']}")
+        plt.axhline(0.5, color="gray", linestyle="--", linewidth=0.8)
+        plt.xlim(0, 0.5)
+        plt.xlabel("Frequency (cycles/pixel)")
+        plt.ylabel("MTF")
+        plt.legend(fontsize="small")
+        plt.grid(True, alpha=0.3)
+        plt.show()
+
+    def export_report(self, csv_file):
+        """
+        Save the measurements of all the edges in a csv file.
+        """
+        keys = ["edge", "angle", "mtf50", "mtf50p", "mtf_nyquist", "overshoot"]
+        with open(csv_file, "w", newline="", encoding="utf-8") as fil:
+            writer = csv.writer(fil)
+            writer.writerow(["image", "x", "y", "width", "height"] + keys)
+            for res in self.results:
+                writer.writerow(
+                    [res["name"], *res["roi"]]
+                    + [
+                        "" if res[key] is None
+                        else res[key] if isinstance(res[key], str)
+                        else f"{res[key]:.4f}"
+                        for key in keys
+                    ]
+                )
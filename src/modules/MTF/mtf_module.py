@@ -0,0 +1,145 @@
+"""
+File: mtf_module.py
+Description: Executes the module flow for the slanted edge MTF measurement
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+import numpy as np
+import cv2
+from src.modules.MTF.mtf_algo import SlantedEdgeAlgo
+from src.utils.algo_common_utils import select_files, load_image_para, get_rgb_preview
+from src.utils.gui_common_utils import file_saving_path, generate_separator
+
+
+class MtfModule:
+    """
+    Slanted Edge MTF Module
+    """
+
+    # Extensions of the images that can be measured
+    image_extensions = (".raw", ".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+    # Max size of the ROI selection window
+    max_display_size = (1600, 900)
+
+    def __init__(self):
+        self.file_names = []
+        self.rois = []
+        self.mtf_algo = None
+
+    def get_image_files(self, path):
+        """
+        Returns the sorted list of the images in a directory.
+        """
+        return [
+            os.path.join(path, file_name)
+            for file_name in sorted(os.listdir(path))
+            if file_name.lower().endswith(self.image_extensions)
+        ]
+
+    def is_images_selected(self):
+        """
+        Select the images to measure, e.g. the images of a focus sweep. The
+        same ROIs are measured on all the images.
+        """
+        file_type = (
+            ("Image Files", "*.raw *.png *.jpg *.jpeg *.bmp *.tif *.tiff"),
+            ("RAW Files", "*.raw"),
+        )
+        is_selected, file_names = select_files("Open the images.", file_type)
+        if not is_selected:
+            print("\033[31mError!\033[0m File is not selected.")
+            generate_separator("", "*")
+            return False
+
+        self.file_names = list(file_names)
+        return True
+
+    def is_rois_selected(self):
+        """
+        Select the ROIs of the slanted edges on the first image. Each ROI
+        must contain a single edge and both its sides.
+        """
+        raw_image_para = load_image_para(self.file_names[0])
+        if raw_image_para is None:
+            print("\033[31mError!\033[0m Invalid file name format or size.")
+            generate_separator("", "*")
+            return False
+
+        rgb_image = raw_image_para.rgb_image
+        if rgb_image is None:
+            rgb_image = get_rgb_preview(raw_image_para)
+
+        # Image is downscaled to fit the screen, the ROIs are scaled back
+        scale = max(
+            1,
+            rgb_image.shape[1] / self.max_display_size[0],
+            rgb_image.shape[0] / self.max_display_size[1],
+        )
+        display_image = cv2.resize(
+            cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR),
+            (int(rgb_image.shape[1] / scale), int(rgb_image.shape[0] / scale)),
+        )
+
+        print("Draw the ROIs of the slanted edges, press ENTER after each ROI")
+        print("and ESC when done.")
+        window = "Select the Slanted Edges"
+        rects = cv2.selectROIs(window, display_image, showCrosshair=False)
+        cv2.destroyWindow(window)
+
+        self.rois = [
+            tuple(int(val * scale) for val in rect)
+            for rect in rects
+            if rect[2] > 0 and rect[3] > 0
+        ]
+        if not self.rois:
+            print("\033[31mError!\033[0m No ROI is selected.")
+            generate_separator("", "*")
+            return False
+        return True
+
+    def execute(self):
+        """
+        Measure the MTF of all the ROIs on all the images.
+        """
+        self.mtf_algo = SlantedEdgeAlgo()
+
+        for file_name in self.file_names:
+            raw_image_para = load_image_para(file_name)
+            if raw_image_para is None:
+                print(
+                    f"\033[31mWarning!\033[0m {os.path.basename(file_name)} is skipped, "
+                    "invalid file name format or size."
+                )
+                continue
+
+            for roi in self.rois:
+                try:
+                    self.mtf_algo.analyze(os.path.basename(file_name), raw_image_para, roi)
+                except (ValueError, np.linalg.LinAlgError):
+                    print(
+                        f"\033[31mWarning!\033[0m No edge is found in {roi} of "
+                        f"{os.path.basename(file_name)}."
+                    )
+
+        if not self.mtf_algo.results:
+            print("\033[31mError!\033[0m No edge is measured.")
+            return False
+
+        self.mtf_algo.display_report()
+        return True
+
+    def save_report(self):
+        """
+        Save the measurements in a csv file.
+        """
+        file_path = file_saving_path(".csv", [("CSV Files", "*.csv")], "mtf.csv")
+        if not file_path:
+            print("\033[31mWarning!\033[0m File destination path is not selected.")
+            generate_separator("", "*")
+            return
+
+        self.mtf_algo.export_report(file_path)
+        print(f"Report saved to:\n {file_path}")
+        generate_separator("", "*")
@@ -14,6 +14,8 @@ from src.utils.gui_common_utils import (
     generate_separator,
     determine_image_scale_factor,
 )
+from src.utils.chart_layout import get_chart_layout
+from src.utils.profiling import timed
 
 
 class NEAlgo:
@@ -21,10 +23,17 @@ class NEAlgo:
     Bayer Noise Estimation Algorithm
     """
 
-    def __init__(self, img, patches_info):
+    def __init__(self, img, patches_info, gray_patches=None):
         self.rgb_cv_image = img
         self.sub_rect_points = patches_info
 
+        # Indices of the gray patches of the chart, from the lightest to the
+        # darkest (the gray patches of the ColorChecker 24 by default).
+        if gray_patches is None:
+            gray_patches = get_chart_layout().get_neutral_patches()
+        self.gray_points = [patches_info[i] for i in gray_patches]
+
+    @timed("rgb_to_yuv", "color")
     def rgb_to_yuv(self, img):
         """
         RGB-to-YUV Colorspace conversion (Analog)
@@ -59,7 +68,7 @@ class NEAlgo:
     def apply_algo(self):
         """
         Apply algorithm to the luminance channel
-        to estimate noise levels using last 6
+        to estimate noise levels using the
         gray patches
         """
         rgb_wb = self.rgb_cv_image
@@ -67,11 +76,11 @@ class NEAlgo:
         lum_y = yuv_image[:, :, 0]
         std = np.zeros(
             [
-                6,
+                len(self.gray_points),
             ]
         )
         ind = 0
-        for _, patch_cord in enumerate(self.sub_rect_points[-6:]):
+        for _, patch_cord in enumerate(self.gray_points):
             start_point = patch_cord[0]
             end_point = patch_cord[1]
 
@@ -85,7 +94,7 @@ class NEAlgo:
 
     def display_patches(self, rgb_wb, std):
         """
-        Display standard deviations along with the last 6 patches
+        Display standard deviations along with the gray patches
         """
         root = tk.Tk()
         root.title("Luma Noise Levels")
@@ -95,7 +104,7 @@ class NEAlgo:
         patches = tk.Frame(root)
         patches.grid(row=0, column=0, padx=10, pady=10)
 
-        for count_i, patch_coord in enumerate(self.sub_rect_points[-6:]):
+        for count_i, patch_coord in enumerate(self.gray_points):
             patch = rgb_wb[
                 patch_coord[0][1] : patch_coord[1][1],
                 patch_coord[0][0] : patch_coord[1][0],
@@ -105,7 +114,11 @@ class NEAlgo:
             pil_image = Image.fromarray(patch)
 
             image_scale_factor = determine_image_scale_factor(
-                root, patch.shape[1] * 6, patch.shape[0] * 6, 50, 50
+                root,
+                patch.shape[1] * len(self.gray_points),
+                patch.shape[0] * len(self.gray_points),
+                50,
+                50,
             )
             # Create a canvas for displaying the image
             canvas = tk.Canvas(
@@ -4,10 +4,15 @@ Description: Executes the module flow with the algorithm for the luma noise esti
 Author: 10xEngineers
 ------------------------------------------------------------
 """
+import os
+import numpy as np
 from src.modules.NR.noise_reduction_2d_algo import NEAlgo
+from src.modules.NR.nr2d_sweep_algo import NoiseReduction2dSweepAlgo
 from src.modules.WB.white_balance_algo import WhiteBalanceAlgo as wb
 from src.utils.algo_common_utils import select_image_and_get_para, generate_separator
 from src.utils.area_selection_frame import SelectAreaFrame as select_area_frame
+from src.utils.session_workspace import SessionWorkspace
+from src.utils.read_yaml_file import ReadWriteYMLFile
 
 
 class NEModule:
@@ -15,14 +20,28 @@ class NEModule:
     Luminance Noise Estimation Module
     """
 
-    def __init__(self):
+    def __init__(self, in_config_file=None, workspace=None):
+        self.in_config_file = in_config_file
+
+        # Image and patches shared with the other modules of the session
+        self.workspace = SessionWorkspace() if workspace is None else workspace
         self.raw_image_para = None
         self.selection_frame = None
+        self.recommended_wts = None
+
+        # Image used for the estimation (white balanced if required)
+        self.rgb_image = None
 
-    def is_image_and_para_loaded(self):
+    def is_image_and_para_loaded(self, raw_image_para=None):
         """
         To check if the image is loaded, if true store respective parameters.
+        The image of the session workspace is used if its parameters are given,
+        otherwise a newly loaded image is kept in the workspace.
         """
+        if raw_image_para is not None:
+            self.raw_image_para = raw_image_para
+            return True
+
         file_type = (
             ("RAW Files (*.raw)", "*.raw"),
             (
@@ -32,19 +51,26 @@ class NEModule:
             ("All Files (*.*)", ("*.raw", "*.png", "*.jpeg", "*.jpg")),
         )
         is_selected, self.raw_image_para = select_image_and_get_para(file_type)
+        if is_selected:
+            self.workspace.set_image(self.raw_image_para)
 
         return is_selected
 
-    def color_checker_selection_frame(self):
+    def color_checker_selection_frame(self, selection_frame=None):
         """
         Open the color checker patches selection frame and return true
         if patches are drawn and saved using continue button otherwise
-        return false
+        return false.
+        The patches of the session workspace are used if their selection
+        frame is given.
         """
-        self.selection_frame = select_area_frame(self.raw_image_para.rgb_image)
+        if selection_frame is None:
+            selection_frame = select_area_frame(self.raw_image_para.rgb_image)
+        self.selection_frame = selection_frame
 
         if self.selection_frame.data.is_data_saved is False:
             return False
+        self.workspace.set_selection(self.selection_frame)
         return True
 
     def implement_ne_algo(self, status):
@@ -53,11 +79,59 @@ class NEModule:
         to estimate luma noise levels.
         """
         sub_rect_points = self.selection_frame.get_sub_rect_points()
+        chart_layout = self.selection_frame.get_chart_layout()
 
+        # The loaded image is shared with the other modules of the session,
+        # so the white balanced image is kept separately.
+        self.rgb_image = self.raw_image_para.rgb_image
         if status == "1":
-            wb_obj = wb(self.raw_image_para.rgb_image, sub_rect_points)
-            self.raw_image_para.rgb_image = wb_obj.execute()
-        noise_est = NEAlgo(self.raw_image_para.rgb_image, sub_rect_points)
+            wb_obj = wb(self.raw_image_para.rgb_image, sub_rect_points, chart_layout)
+            self.rgb_image = wb_obj.execute()
+        noise_est = NEAlgo(
+            self.rgb_image, sub_rect_points, chart_layout.get_neutral_patches()
+        )
         noise_est.apply_algo()
         generate_separator("Noise Levels Estimated Successfully!", "-")
         generate_separator("", "*")
+
+    def implement_nr2d_sweep(self):
+        """
+        Sweep the 2DNR weighting parameter on the gray patches of the
+        (white balanced) image and recommend the wts parameter.
+        """
+        sub_rect_points = self.selection_frame.get_sub_rect_points()
+        gray_patches = self.selection_frame.get_chart_layout().get_neutral_patches()
+        rgb_image = self.rgb_image
+        lum = NEAlgo(rgb_image, sub_rect_points, gray_patches).rgb_to_yuv(rgb_image)[:, :, 0]
+
+        window_size, _ = ReadWriteYMLFile(self.in_config_file).get_2dnr_data()
+        sweep_algo = NoiseReduction2dSweepAlgo(
+            np.clip(lum * 255, 0, 255),
+            sub_rect_points,
+            window_size,
+            gray_patches=gray_patches,
+        )
+        sweep_algo.sweep()
+
+        self.recommended_wts = sweep_algo.recommend()
+        sweep_algo.display_results(self.recommended_wts)
+        generate_separator("", "*")
+
+    def save_config_file_with_2dnr_wts(self):
+        """
+        Save the recommended 2DNR wts in Config File.
+        """
+        if not os.path.exists(self.in_config_file):
+            print(
+                "\n\033[31mError!\033[0m File configs.yml does "
+                'not exist in "app_data" directory.'
+            )
+            generate_separator("", "*")
+            return
+
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        yaml_file.set_2dnr_data(self.recommended_wts)
+        yaml_file.save_file(self.in_config_file)
+
+        print("File saved at:", os.path.dirname(self.in_config_file))
+        generate_separator("", "*")
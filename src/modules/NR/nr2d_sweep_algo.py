@@ -0,0 +1,196 @@
+"""
+File: nr2d_sweep_algo.py
+Description: Sweeps the 2DNR weighting parameter on the gray patches
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2
+from src.utils.create_h_file.create_h_data import CreateHFileData
+from src.utils.chart_layout import get_chart_layout
+from src.utils.gui_common_utils import generate_separator
+from src.utils.profiling import timed
+
+
+def apply_nlm(lum, window_size, curve):
+    """
+    Reference non-local means filter of the 2DNR block: each pixel is the
+    weighted average of the pixels of its search window, the weights are
+    taken from the LUT (curve) using the absolute pixel differences.
+    """
+    pad = window_size // 2
+    padded = np.pad(lum, pad, mode="reflect")
+    height, width = lum.shape
+
+    filtered = np.zeros_like(lum)
+    sum_weights = np.zeros_like(lum)
+    for row in range(window_size):
+        for col in range(window_size):
+            shifted = padded[row : row + height, col : col + width]
+            index = np.searchsorted(curve[:, 0], np.abs(shifted - lum), side="right") - 1
+            weights = curve[index, 1]
+            filtered += weights * shifted
+            sum_weights += weights
+
+    # Weight of the center pixel is the max weight, so sum is never zero
+    return filtered / sum_weights
+
+
+def get_edge_contrast(lum, edge_mask):
+    """
+    Returns the gradient magnitude on the edge mask, after a 3x3 box filter
+    to reduce the contribution of the noise.
+    """
+    grad_y, grad_x = np.gradient(cv2.blur(lum, (3, 3)))
+    return np.sum(np.hypot(grad_x, grad_y)[edge_mask])
+
+
+def evaluate_nlm_candidate(h_par, window_size, rois):
+    """
+    Filter the ROIs with the LUT of the given h parameter and measure the
+    residual noise of the gray patches and the loss of the edge contrast
+    around them. This function runs in the worker processes.
+    """
+    curve = CreateHFileData.make_weighted_curve(32, h_par).astype(np.float32)
+
+    residual_std, noise_ratios, detail_ratios = [], [], []
+    for context, outer, inner, edge_mask in rois:
+        lum = context[outer]
+        filtered = apply_nlm(context, window_size, curve)[outer]
+
+        residual_std.append(np.std(filtered[inner]))
+        noise_ratios.append(residual_std[-1] / max(np.std(lum[inner]), 1e-6))
+        detail_ratios.append(
+            get_edge_contrast(filtered, edge_mask)
+            / max(get_edge_contrast(lum, edge_mask), 1e-6)
+        )
+
+    return {
+        "h": h_par,
+        "residual_std": float(np.mean(residual_std)),
+        "noise_reduction": float(1 - np.mean(noise_ratios)),
+        "detail_loss": float(max(1 - np.mean(detail_ratios), 0)),
+    }
+
+
+class NoiseReduction2dSweepAlgo:
+    """
+    2D Noise Reduction Parameter Sweep
+    """
+
+    # Candidate h parameters (wts) of the weighting LUT
+    candidates = [2, 3, 5, 8, 12, 16, 24, 32, 48, 64]
+
+    def __init__(
+        self,
+        lum,
+        sub_rect_points,
+        window_size=9,
+        max_detail_loss=0.05,
+        workers=None,
+        gray_patches=None,
+    ):
+        """
+        lum             : 8 bits luminance (Y) of the chart image
+        sub_rect_points : points of the patches of the chart
+        window_size     : search window size of the 2DNR block
+        max_detail_loss : max allowed loss (ratio) of the edge contrast
+        workers         : total worker processes, None for the cpu count
+        gray_patches    : indices of the gray patches, None for the ones of
+                          the ColorChecker 24
+        """
+        if gray_patches is None:
+            gray_patches = get_chart_layout().get_neutral_patches()
+
+        self.lum = np.float32(lum)
+        self.sub_rect_points = sub_rect_points
+        self.gray_points = [sub_rect_points[i] for i in gray_patches]
+        self.window_size = window_size
+        self.max_detail_loss = max_detail_loss
+        self.workers = workers
+        self.results = []
+
+    def get_rois(self):
+        """
+        Returns the ROI of each gray patch, i.e. the patch expanded by a quarter
+        of its size to include its edges with the chart, and with a context of
+        half of the search window, so only these areas are filtered. Each ROI
+        is (context, outer slices, inner slices, edge mask) where the outer area
+        is relative to the context and the inner (patch) area to the outer one.
+        """
+        height, width = self.lum.shape
+        pad = self.window_size // 2
+
+        rois = []
+        for start_point, end_point in self.gray_points:
+            (x_0, y_0), (x_1, y_1) = start_point, end_point
+            margin = max(x_1 - x_0, y_1 - y_0) // 4
+
+            out_x0, out_y0 = max(x_0 - margin, 0), max(y_0 - margin, 0)
+            out_x1, out_y1 = min(x_1 + margin, width), min(y_1 + margin, height)
+            ctx_x0, ctx_y0 = max(out_x0 - pad, 0), max(out_y0 - pad, 0)
+            ctx_x1, ctx_y1 = min(out_x1 + pad, width), min(out_y1 + pad, height)
+
+            context = self.lum[ctx_y0:ctx_y1, ctx_x0:ctx_x1]
+            outer = np.s_[out_y0 - ctx_y0 : out_y1 - ctx_y0, out_x0 - ctx_x0 : out_x1 - ctx_x0]
+            inner = np.s_[y_0 - out_y0 : y_1 - out_y0, x_0 - out_x0 : x_1 - out_x0]
+
+            # Edges are the 5% strongest (noise reduced) gradients of the outer area
+            grad_y, grad_x = np.gradient(cv2.blur(context[outer], (3, 3)))
+            grad = np.hypot(grad_x, grad_y)
+            edge_mask = grad >= np.percentile(grad, 95)
+
+            rois.append((context, outer, inner, edge_mask))
+
+        return rois
+
+    @timed("nr2d.sweep", "optimizer")
+    def sweep(self, candidates=None):
+        """
+        Evaluate all the candidates, distributing them on a process pool.
+        """
+        candidates = candidates if candidates else self.candidates
+        rois = self.get_rois()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(evaluate_nlm_candidate, h_par, self.window_size, rois)
+                for h_par in candidates
+            ]
+            self.results = [future.result() for future in futures]
+
+        return self.results
+
+    def recommend(self):
+        """
+        Returns the h parameter with the lowest residual noise whose detail
+        loss is within the limit, or the one with the lowest detail loss if
+        none is within the limit.
+        """
+        valid = [res for res in self.results if res["detail_loss"] <= self.max_detail_loss]
+        if valid:
+            return min(valid, key=lambda res: res["residual_std"])["h"]
+        return min(self.results, key=lambda res: res["detail_loss"])["h"]
+
+    def display_results(self, recommended):
+        """
+        Display the metrics of all the candidates
+        """
+        generate_separator("2DNR Parameter Sweep", "-")
+        print(f"Window size = {self.window_size}, max detail loss = "
+              f"{self.max_detail_loss * 100:.1f}%\n")
+        print("{: <8}{: <16}{: <18}{: <14}".format(
+            "wts", "Residual std", "Noise Reduction", "Detail Loss"))
+        for res in self.results:
+            mark = "  <- recommended" if res["h"] == recommended else ""
+            print(
+                "{: <8}{: <16}{: <18}{: <14}".format(
+                    res["h"],
+                    f"{res['residual_std']:.3f}",
+                    f"{res['noise_reduction'] * 100:.1f}%",
+                    f"{res['detail_loss'] * 100:.1f}%",
+                )
+                + mark
+            )
+        print()
@@ -0,0 +1,136 @@
+"""
+File: oecf_algo.py
+Description: Calibrates the OECF (linearization) LUT from an exposure series
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import numpy as np
+from src.utils.gui_common_utils import generate_separator
+from src.utils.algo_common_utils import extract_bayer_patch
+
+
+class OecfAlgo:
+    """
+    OECF Calibration
+    """
+
+    def __init__(self, bit_depth, reflectances, sat_ratio=0.95, fit_range=(0.02, 0.5)):
+        """
+        bit_depth    : bit depth of the raw images (and of the LUT)
+        reflectances : linear reflectances of the gray patches
+        sat_ratio    : measurements above sat_ratio x max value are discarded
+        fit_range    : range (ratios of the max value) of the measurements used
+                       to estimate the ideal linear response
+        """
+        self.bit_depth = bit_depth
+        self.max_value = 2**bit_depth - 1
+        self.reflectances = np.asarray(reflectances, dtype=np.float64)
+        self.sat_ratio = sat_ratio
+        self.fit_range = fit_range
+
+        # Stimulus (relative exposure x reflectance) and measured patch means
+        self.stimulus = []
+        self.measured = []
+
+        self.gain = None
+        self.lut = None
+
+    def get_gray_patches_avg(self, corrected_raw, bayer, patches_points):
+        """
+        Returns the average of all the bayer channels of each gray patch,
+        the points of the gray patches (white to black) are given.
+        """
+        gray_avg = []
+        for patch_points in patches_points:
+            channels = extract_bayer_patch(corrected_raw, bayer, patch_points)
+            gray_avg.append(np.mean([np.mean(channel, dtype=np.float64) for channel in channels]))
+        return np.array(gray_avg)
+
+    def add_measurements(self, exposure, gray_avg):
+        """
+        Add the gray patches averages of an image of the given relative exposure.
+        """
+        self.stimulus.extend(exposure * self.reflectances)
+        self.measured.extend(gray_avg)
+
+    def get_valid_points(self):
+        """
+        Returns the stimulus and measurements sorted by the measurements,
+        without the saturated and the non-positive measurements.
+        """
+        stimulus = np.array(self.stimulus)
+        measured = np.array(self.measured)
+
+        valid = (measured > 0) & (measured < self.sat_ratio * self.max_value)
+        order = np.argsort(measured[valid])
+        return stimulus[valid][order], measured[valid][order]
+
+    def calculate_lut(self):
+        """
+        There are 4 steps involved in the function.
+        1) Estimate the gain of the ideal linear response (least squares
+           through the origin) using the measurements in the fit range.
+        2) Enforce a monotonic response by a running maximum of the ideal
+           (linear) values sorted by the measurements.
+        3) Invert the response, i.e. interpolate the linear values at all the
+           LUT indices, extrapolating linearly above the last measurement.
+        4) Round and clip the LUT to the bit range.
+        """
+        stimulus, measured = self.get_valid_points()
+        if len(measured) < 2:
+            raise ValueError("Not enough valid measurements.")
+
+        low, high = self.fit_range[0] * self.max_value, self.fit_range[1] * self.max_value
+        in_range = (measured >= low) & (measured <= high)
+        if np.count_nonzero(in_range) < 2:
+            in_range = np.ones(len(measured), dtype=bool)
+
+        self.gain = np.sum(stimulus[in_range] * measured[in_range]) / np.sum(
+            stimulus[in_range] ** 2
+        )
+
+        linear = np.maximum.accumulate(self.gain * stimulus)
+        measured, index = np.unique(measured, return_index=True)
+        linear = linear[index]
+
+        # Anchors at zero and at the max value (linear extrapolation)
+        slope = linear[-1] / measured[-1]
+        x_points = np.concatenate([[0], measured, [self.max_value]])
+        y_points = np.concatenate([[0], linear, [slope * self.max_value]])
+
+        lut = np.interp(np.arange(self.max_value + 1), x_points, y_points)
+        lut = np.clip(np.rint(lut), 0, self.max_value)
+        self.lut = np.maximum.accumulate(lut).astype(np.int64)
+        return self.lut
+
+    def get_linearity_errors(self):
+        """
+        Returns the max error (ratio of the max value) of the measurements from
+        the ideal linear response before and after applying the LUT. Points
+        whose ideal value is out of the bit range are not considered.
+        """
+        stimulus, measured = self.get_valid_points()
+        ideal = self.gain * stimulus
+        in_range = ideal <= self.max_value
+        if not np.any(in_range):
+            return 0.0, 0.0
+
+        corrected = np.interp(measured, np.arange(self.max_value + 1), self.lut)
+        before = np.max(np.abs(measured - ideal)[in_range]) / self.max_value
+        after = np.max(np.abs(corrected - ideal)[in_range]) / self.max_value
+        return float(before), float(after)
+
+    def display_lut(self):
+        """
+        Display the summary of the calibrated LUT
+        """
+        before, after = self.get_linearity_errors()
+        _, measured = self.get_valid_points()
+
+        generate_separator("OECF LUT", "-")
+        print("Valid measurements  = ", len(measured))
+        print(f"Measured range      =  {measured.min():.1f} - {measured.max():.1f}")
+        print(f"Linearity error     =  {before * 100:.2f}% (before), {after * 100:.2f}% (after)")
+        samples = np.linspace(0, self.max_value, 9).astype(np.int64)
+        print("LUT samples         = ", dict(zip(samples.tolist(), self.lut[samples].tolist())))
+        print()
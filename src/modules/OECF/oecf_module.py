@@ -0,0 +1,157 @@
+"""
+File: oecf_module.py
+Description: Executes the module flow for the OECF calibration
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+import re
+from src.modules.OECF.oecf_algo import OecfAlgo
+from src.modules.BLC.blc_algo import BlackLevelsAlgo
+from src.utils.algo_common_utils import (
+    RawImageParameters,
+    select_files,
+    parse_file_name,
+    get_raw_image,
+    get_rgb_preview,
+)
+from src.utils.area_selection_frame import SelectAreaFrame as select_area_frame
+from src.utils.gui_common_utils import generate_separator
+from src.utils.read_yaml_file import ReadWriteYMLFile
+
+
+class OecfModule:
+    """
+    OECF Calibration Module
+    """
+
+    # Relative exposure (e.g. exposure time) in the file name, e.g.
+    # GrayChart_exp10_2592x1536_12bits_RGGB.raw
+    exposure_pattern = r"_exp(\d+(?:\.\d+)?)"
+
+    def __init__(self, in_config_file):
+        self.in_config_file = in_config_file
+        self.series = []
+        self.selection_frame = None
+        self.oecf_algo = None
+
+    def load_raw_image_para(self, file_name, parameters):
+        """
+        Load a raw image of the series and return its parameters.
+        """
+        raw_image_para = RawImageParameters(file_name)
+        raw_image_para.store_parameters(parameters)
+        _, raw_image_para.raw_image = get_raw_image(
+            file_name,
+            raw_image_para.width,
+            raw_image_para.height,
+            raw_image_para.bit_depth,
+        )
+        return raw_image_para
+
+    def is_series_loaded(self):
+        """
+        Select the raw images of the exposure series. All the images must have
+        the same size, bit depth and bayer pattern and the relative exposure
+        in the file name.
+        """
+        file_type = (("RAW Files", "*.raw"),)
+        is_selected, file_names = select_files("Open the exposure series.", file_type)
+        if not is_selected:
+            print("\033[31mError!\033[0m File is not selected.")
+            generate_separator("", "*")
+            return False
+
+        series = []
+        for file_name in file_names:
+            parameters = parse_file_name(os.path.basename(file_name))
+            exposure = re.search(self.exposure_pattern, os.path.basename(file_name), re.I)
+            if not parameters or not exposure:
+                print(
+                    "\033[31mError!\033[0m Invalid file name format: "
+                    f"{os.path.basename(file_name)}\n"
+                    "File name format: Name_expT_WxH_Nbits_Bayer.raw"
+                )
+                generate_separator("", "*")
+                return False
+            series.append((float(exposure.group(1)), file_name, parameters))
+
+        if any(para[1:] != series[0][2][1:] for _, _, para in series):
+            print("\033[31mError!\033[0m Files of different sizes.")
+            generate_separator("", "*")
+            return False
+
+        self.series = sorted(series)
+        return True
+
+    def color_checker_selection_frame(self):
+        """
+        Open the color checker patches selection frame on the middle image
+        of the series. The same patches are used for all the images.
+        """
+        _, file_name, parameters = self.series[len(self.series) // 2]
+        raw_image_para = self.load_raw_image_para(file_name, parameters)
+        if raw_image_para.raw_image is None:
+            return False
+
+        rgb_image = get_rgb_preview(raw_image_para)
+        self.selection_frame = select_area_frame(rgb_image)
+
+        return self.selection_frame.data.is_data_saved
+
+    def execute(self):
+        """
+        Measure the gray patches of all the images of the series, after black
+        level correction from the config, and calibrate the OECF LUT.
+        """
+        sub_rect_points = self.selection_frame.get_sub_rect_points()
+        bit_depth = self.series[0][2][3]
+
+        # Neutral patches (white to black) of the chart and their reflectances
+        chart_layout = self.selection_frame.get_chart_layout()
+        gray_patches = chart_layout.get_neutral_patches()
+        gray_points = [sub_rect_points[idx] for idx in gray_patches]
+        reflectances = chart_layout.get_reference_lin()[gray_patches].mean(axis=1)
+        self.oecf_algo = OecfAlgo(bit_depth, reflectances)
+
+        for exposure, file_name, parameters in self.series:
+            raw_image_para = self.load_raw_image_para(file_name, parameters)
+            if raw_image_para.raw_image is None:
+                continue
+
+            corrected_raw = BlackLevelsAlgo(raw_image_para).get_config_corrected_raw(
+                self.in_config_file
+            )
+            gray_avg = self.oecf_algo.get_gray_patches_avg(
+                corrected_raw, raw_image_para.bayer_pattern, gray_points
+            )
+            self.oecf_algo.add_measurements(exposure, gray_avg)
+
+        try:
+            self.oecf_algo.calculate_lut()
+        except ValueError as error:
+            print(f"\033[31mError!\033[0m {error}")
+            generate_separator("", "*")
+            return False
+
+        self.oecf_algo.display_lut()
+        return True
+
+    def save_config_file_with_oecf_lut(self):
+        """
+        Save the OECF LUT in Config File.
+        """
+        if not os.path.exists(self.in_config_file):
+            print(
+                "\n\033[31mError!\033[0m File configs.yml does "
+                'not exist in "app_data" directory.'
+            )
+            generate_separator("", "*")
+            return
+
+        yaml_file = ReadWriteYMLFile(self.in_config_file)
+        yaml_file.set_oecf_data(self.oecf_algo.lut.tolist())
+        yaml_file.save_file(self.in_config_file)
+
+        print("File saved at:", os.path.dirname(self.in_config_file))
+        generate_separator("", "*")
@@ -8,9 +8,11 @@ Author: 10xEngineers
 import os
 import tkinter as tk
 from matplotlib import pyplot as plt
-from src.modules.WB.white_balance_algo import WhiteBalanceAlgo
+from src.modules.WB.white_balance_algo import WhiteBalanceAlgo, RawWhiteBalanceAlgo
+from src.modules.BLC.blc_algo import BlackLevelsAlgo
 from src.utils.algo_common_utils import select_image_and_get_para, generate_separator
 from src.utils.area_selection_frame import SelectAreaFrame as select_area_frame
+from src.utils.session_workspace import SessionWorkspace
 from src.utils.read_yaml_file import ReadWriteYMLFile
 from src.utils.gui_common_utils import (
     determine_image_scale_factor,
@@ -26,8 +28,11 @@ class WhiteBalanceModule:
     White Balance Module
     """
 
-    def __init__(self, in_config_file):
+    def __init__(self, in_config_file, workspace=None):
         self.in_config_file = in_config_file
+
+        # Image and patches shared with the other modules of the session
+        self.workspace = SessionWorkspace() if workspace is None else workspace
         self.raw_image_para = None
         self.root_apply_wb_frame = None
         self.r_gain = 0
@@ -36,6 +41,7 @@ class WhiteBalanceModule:
         self.image_scale_factor = 2
         self.wb_algo = None
         self.selection_frame = None
+        self.is_raw_domain = False
 
     def display_gains(self):
         """
@@ -45,10 +51,16 @@ class WhiteBalanceModule:
         print("R gain = ", self.r_gain)
         print("B gain = ", self.b_gain)
 
-    def is_image_and_para_loaded(self):
+    def is_image_and_para_loaded(self, raw_image_para=None):
         """
         To check if the image is loaded, if true store respective parameters.
+        The image of the session workspace is used if its parameters are given,
+        otherwise a newly loaded image is kept in the workspace.
         """
+        if raw_image_para is not None:
+            self.raw_image_para = raw_image_para
+            return True
+
         file_type = (
             ("RAW Files (*.raw)", "*.raw"),
             (
@@ -59,18 +71,38 @@ class WhiteBalanceModule:
         )
 
         is_selected, self.raw_image_para = select_image_and_get_para(file_type)
+        if is_selected:
+            self.workspace.set_image(self.raw_image_para)
 
         return is_selected
 
-    def color_checker_selection_frame(self):
+    def is_raw_image_loaded(self):
+        """
+        Return true if the loaded image is a raw image.
+        """
+        return self.raw_image_para.raw_image is not None
+
+    def set_raw_domain(self, status):
+        """
+        Set flag to true if the gains need to be calculated
+        on the raw Bayer data instead of the rgb image.
+        """
+        self.is_raw_domain = status
+
+    def color_checker_selection_frame(self, selection_frame=None):
         """
         Open the color checker patches selection frame and return true
         if patches are drawn and saved using continue button
-        otherwise return false
+        otherwise return false.
+        The patches of the session workspace are used if their selection
+        frame is given.
         """
-        self.selection_frame = select_area_frame(self.raw_image_para.rgb_image)
+        if selection_frame is None:
+            selection_frame = select_area_frame(self.raw_image_para.rgb_image)
+        self.selection_frame = selection_frame
 
         if self.selection_frame.data.is_data_saved:
+            self.workspace.set_selection(self.selection_frame)
             return True
         return False
 
@@ -80,8 +112,25 @@ class WhiteBalanceModule:
         sub-rect points, rgb-image and execute the algo.
         """
         sub_rect_points = self.selection_frame.get_sub_rect_points()
-        self.wb_algo = WhiteBalanceAlgo(self.raw_image_para.rgb_image, sub_rect_points)
-        self.r_gain, self.b_gain = self.wb_algo.calculate_wb_gains()
+        chart_layout = self.selection_frame.get_chart_layout()
+        self.wb_algo = WhiteBalanceAlgo(
+            self.raw_image_para.rgb_image, sub_rect_points, chart_layout
+        )
+
+        if self.is_raw_domain and self.is_raw_image_loaded():
+            # Black levels and linearization are applied from the config
+            # file to match the input of the WB block of the ISP.
+            corrected_raw = BlackLevelsAlgo(
+                self.raw_image_para
+            ).get_config_corrected_raw(self.in_config_file)
+            raw_wb_algo = RawWhiteBalanceAlgo(
+                self.raw_image_para, sub_rect_points, corrected_raw, chart_layout
+            )
+            self.r_gain, self.b_gain = raw_wb_algo.calculate_wb_gains()
+            raw_wb_algo.patch_stats.display_uniformity()
+        else:
+            self.r_gain, self.b_gain = self.wb_algo.calculate_wb_gains()
+            self.wb_algo.patch_stats.display_uniformity()
         self.display_gains()
 
     def apply_cal_wb_gain(self):
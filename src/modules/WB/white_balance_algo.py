@@ -7,7 +7,31 @@ Author: 10xEngineers
 
 import numpy as np
 import cv2
-from src.utils.algo_common_utils import extract_patches_mat, cal_patches_avg
+from src.utils.algo_common_utils import (
+    extract_patches_mat,
+    cal_patches_avg,
+    extract_bayer_patch,
+)
+from src.menu.menu_common_func import end_tuning_tool
+from src.utils.chart_layout import get_chart_layout
+from src.utils.patch_statistics import PatchStatistics, refine_patch_points
+from src.utils.result_cache import result_cache
+
+
+def get_layout_wb_patches(chart_layout):
+    """
+    Returns the indices of the neutral patches of the chart layout used for
+    the white balance, the tool is ended if the chart has none.
+    """
+    wb_patches = chart_layout.get_wb_patches()
+    if wb_patches is None or wb_patches.size == 0:
+        print(
+            "\n\033[31mError!\033[0m Chart layout '"
+            + chart_layout.name
+            + "' has no neutral patches for the white balance."
+        )
+        end_tuning_tool()
+    return wb_patches
 
 
 class WhiteBalanceAlgo:
@@ -15,19 +39,24 @@ class WhiteBalanceAlgo:
     White Balance Algorithm
     """
 
-    def __init__(self, rgb_image, patches_points):
+    def __init__(self, rgb_image, patches_points, chart_layout=None):
         """
         Here following steps are performed:
-        1) Extract/ crop the patches of all the 24 patches and save into a mat array.
-        2) Calculate average of each channel using saved mat array.
-        3) Get the avg. of gray row only.
+        1) Refine the patches away from their edges.
+        2) Extract/ crop all the patches of the chart and save into a mat array.
+        3) Calculate robust average of each channel using saved mat array.
+        4) Get the avg. of the neutral (gray) patches only.
+        The ColorChecker 24 layout is used if no chart layout is given.
         """
 
         self.rgb_image = rgb_image
-        self.patches_points = patches_points
+        self.chart_layout = get_chart_layout() if chart_layout is None else chart_layout
+        self.patches_points = refine_patch_points(rgb_image, patches_points)
 
         patches_mat = extract_patches_mat(self.rgb_image, self.patches_points)
-        self.r_avg, self.g_avg, self.b_avg = cal_patches_avg(patches_mat)
+        self.r_avg, self.g_avg, self.b_avg, self.patch_stats = cal_patches_avg(
+            patches_mat
+        )
         self.r_avg_gray, self.g_avg_gray, self.b_avg_gray = self.get_gray_row_avg(
             self.r_avg, self.g_avg, self.b_avg
         )
@@ -92,13 +121,14 @@ class WhiteBalanceAlgo:
 
     def get_gray_row_avg(self, r_avg, g_avg, b_avg):
         """
-        Extract the only gray row patches except first and last patch
-         which are necessary for wb calculation.
+        Extract the only neutral patches of the chart except the white and
+         the black ones which are necessary for wb calculation.
         """
+        wb_patches = get_layout_wb_patches(self.chart_layout)
 
-        r_avg_gray = np.array(r_avg[19:23])
-        g_avg_gray = np.array(g_avg[19:23])
-        b_avg_gray = np.array(b_avg[19:23])
+        r_avg_gray = np.array(r_avg)[wb_patches]
+        g_avg_gray = np.array(g_avg)[wb_patches]
+        b_avg_gray = np.array(b_avg)[wb_patches]
 
         return r_avg_gray, g_avg_gray, b_avg_gray
 
@@ -107,3 +137,104 @@ class WhiteBalanceAlgo:
         Get mean values from the patches
         """
         return self.r_avg, self.g_avg, self.b_avg
+
+
+class RawWhiteBalanceAlgo:
+    """
+    White Balance Algorithm on the raw Bayer data
+    """
+
+    def __init__(self, raw_image_para, patches_points, corrected_raw, chart_layout=None):
+        """
+        Here following steps are performed:
+        1) Refine the patches away from their edges (on the rgb image if loaded).
+        2) Crop each patch from the black level corrected raw image and split it
+        into R, Gr, Gb and B channels using strided views (no demosaic is needed).
+        3) Calculate robust average of each channel.
+        4) Get the avg. of the neutral (gray) patches only.
+        The ColorChecker 24 layout is used if no chart layout is given.
+        """
+        self.raw_image_para = raw_image_para
+        self.chart_layout = get_chart_layout() if chart_layout is None else chart_layout
+        self.patches_points = refine_patch_points(raw_image_para.rgb_image, patches_points)
+        self.corrected_raw = corrected_raw
+        self.patch_stats = None
+
+        self.r_avg, self.gr_avg, self.gb_avg, self.b_avg = self.cal_raw_patches_avg()
+        self.g_avg = (self.gr_avg + self.gb_avg) / 2
+
+        wb_patches = get_layout_wb_patches(self.chart_layout)
+        self.r_avg_gray = self.r_avg[wb_patches]
+        self.g_avg_gray = self.g_avg[wb_patches]
+        self.b_avg_gray = self.b_avg[wb_patches]
+
+    def cal_raw_patches_avg(self):
+        """
+        Calculate the robust average of the R, Gr, Gb and B channels of each
+        patch. Averages below zero (i.e. below the black level) are clipped to
+        zero. The statistics are cached on disk by the content of the raw
+        file, its preprocessing (e.g. black levels) and the patch points.
+        """
+        bayer = self.raw_image_para.bayer_pattern
+
+        def compute():
+            patches = []
+            for patch_points in self.patches_points:
+                channels = extract_bayer_patch(self.corrected_raw, bayer, patch_points)
+
+                # Channels of a patch of odd size differ by a row or column
+                height = min(channel.shape[0] for channel in channels)
+                width = min(channel.shape[1] for channel in channels)
+                patches.append(
+                    np.dstack([channel[:height, :width] for channel in channels])
+                )
+
+            return PatchStatistics(patches, ["R", "Gr", "Gb", "B"])
+
+        # Unknown (not cached) preprocessing of the raw image is not cached
+        key = None
+        preprocessing = self.raw_image_para.get_preprocessing_key(self.corrected_raw)
+        if preprocessing is not None:
+            key = result_cache.get_key(
+                "raw_patch_robust_stats",
+                self.raw_image_para.file_name,
+                [bayer, preprocessing],
+                self.patches_points,
+            )
+        self.patch_stats = result_cache.get_or_compute(key, compute)
+        channels_avg = np.clip(self.patch_stats.get_means().T, 0, None)
+
+        return channels_avg[0], channels_avg[1], channels_avg[2], channels_avg[3]
+
+    def get_patches_averages(self):
+        """
+        Get mean values of the R, G and B channels of the patches
+        normalized between 0 and 1.
+        """
+        max_value = (2**self.raw_image_para.bit_depth) - 1
+        return self.r_avg / max_value, self.g_avg / max_value, self.b_avg / max_value
+
+    def calculate_wb_gains(self):
+        """
+        Calculate the wb gains as the ratio of the G average to the R and B
+        averages of the gray patches, as done by the WB block of the ISP.
+        """
+        # Gain is set to 1 for a channel with zero average.
+        wb_r = np.divide(
+            self.g_avg_gray,
+            self.r_avg_gray,
+            out=np.ones_like(self.g_avg_gray),
+            where=self.r_avg_gray != 0,
+        )
+        wb_b = np.divide(
+            self.g_avg_gray,
+            self.b_avg_gray,
+            out=np.ones_like(self.g_avg_gray),
+            where=self.b_avg_gray != 0,
+        )
+
+        # Round off value upto 4 decimal
+        r_gain = float(round(np.mean(wb_r), 4))
+        b_gain = float(round(np.mean(wb_b), 4))
+
+        return r_gain, b_gain
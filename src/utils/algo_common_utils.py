@@ -12,6 +12,9 @@ import os
 import numpy as np
 import cv2
 from src.utils.gui_common_utils import generate_separator
+from src.utils.profiling import span, timed
+from src.utils.result_cache import result_cache
+from src.utils.patch_statistics import PatchStatistics
 
 
 class RawImageParameters:
@@ -29,6 +32,11 @@ class RawImageParameters:
         self.rgb_image = None
         self.raw_image = None
 
+        # In-memory pre-processed version of the raw image (e.g. black
+        # level corrected), computed once and shared by all the modules.
+        # Only the latest preprocessing is kept, as each one is a full frame.
+        self.preprocessed_cache = {}
+
     def store_parameters(self, parameters):
         """
         Store parameters for a raw image
@@ -38,6 +46,33 @@ class RawImageParameters:
         self.bit_depth = parameters[3]
         self.bayer_pattern = parameters[4]
 
+    def get_preprocessed(self, key):
+        """
+        Returns the pre-processed raw image of the given key, None if it
+        is not cached.
+        """
+        return self.preprocessed_cache.get(key)
+
+    def store_preprocessed(self, key, image):
+        """
+        Cache a pre-processed raw image, the image of the previous
+        preprocessing (e.g. other black levels) is dropped.
+        """
+        self.preprocessed_cache = {key: image}
+
+    def get_preprocessing_key(self, image):
+        """
+        Returns the preprocessing key of an image, i.e. its key in the
+        preprocessed cache, "raw" for the raw image itself, None if the
+        image is not known.
+        """
+        if image is self.raw_image:
+            return "raw"
+        for key, preprocessed in self.preprocessed_cache.items():
+            if image is preprocessed:
+                return key
+        return None
+
 
 def select_file(title, filetypes):
     """
@@ -60,6 +95,47 @@ def select_file(title, filetypes):
         return False, file_name
 
 
+def select_files(title, filetypes):
+    """
+    Function to select multiple image files
+    """
+    root = tk.Tk()
+    # Open dialog box in the foreground
+    root.attributes("-topmost", True)
+    root.withdraw()
+    root.focus()
+    default_folder = "data_set"
+    default_path = os.path.join(os.getcwd(), default_folder)
+    file_names = fd.askopenfilenames(
+        title=title, initialdir=default_path, filetypes=filetypes
+    )
+    root.destroy()
+    if file_names:
+        return True, list(file_names)
+    else:
+        return False, []
+
+
+def select_directory(title):
+    """
+    Function to select a directory
+    """
+    root = tk.Tk()
+    # Open dialog box in the foreground
+    root.attributes("-topmost", True)
+    root.withdraw()
+    root.focus()
+    default_folder = "data_set"
+    default_path = os.path.join(os.getcwd(), default_folder)
+    dir_name = fd.askdirectory(title=title, initialdir=default_path)
+    root.destroy()
+    if dir_name:
+        return True, dir_name
+    else:
+        return False, dir_name
+
+
+@timed("demosaic", "demosaic")
 def get_rgb_image(raw_data, bayer):
     """
     Read the raw file
@@ -82,6 +158,22 @@ def get_rgb_image(raw_data, bayer):
     return image_demosaic
 
 
+def get_rgb_preview(raw_image_para):
+    """
+    Returns the demosaiced rgb image of the raw image of the raw image
+    parameters. It is cached on disk by the content of the raw file, so the
+    same capture is demosaiced only once.
+    """
+    key = result_cache.get_key(
+        "rgb_preview",
+        raw_image_para.file_name,
+        [raw_image_para.bayer_pattern, raw_image_para.bit_depth],
+    )
+    return result_cache.get_or_compute(
+        key, lambda: get_rgb_image(raw_image_para.raw_image, raw_image_para.bayer_pattern)
+    )
+
+
 def parse_file_name(file_name):
     """
     Parse the file name
@@ -117,6 +209,7 @@ def display_raw_parameters(parameters):
     print()
 
 
+@timed("extract_patches_mat", "patches")
 def extract_patches_mat(image, patches_points):
     """
     Crop the image into pataches with given points
@@ -138,23 +231,141 @@ def extract_patches_mat(image, patches_points):
     return patches_mat
 
 
-def cal_patches_avg(patches_mat):
+# Position (row, column) of the R, Gr, Gb and B channels in the 2x2 Bayer block.
+bayer_channels_offsets = {
+    "RGGB": ((0, 0), (0, 1), (1, 0), (1, 1)),
+    "GRBG": ((0, 1), (0, 0), (1, 1), (1, 0)),
+    "GBRG": ((1, 0), (1, 1), (0, 0), (0, 1)),
+    "BGGR": ((1, 1), (1, 0), (0, 1), (0, 0)),
+}
+
+
+def get_bayer_channels(raw_image, bayer):
+    """
+    Split the raw image into its four Bayer channels using strided views,
+    so that no copy of the raw data is made. The channels are returned in
+    the order R, Gr, Gb and B.
+    """
+    r_off, gr_off, gb_off, b_off = bayer_channels_offsets[bayer.upper()]
+
+    return (
+        raw_image[r_off[0] :: 2, r_off[1] :: 2],
+        raw_image[gr_off[0] :: 2, gr_off[1] :: 2],
+        raw_image[gb_off[0] :: 2, gb_off[1] :: 2],
+        raw_image[b_off[0] :: 2, b_off[1] :: 2],
+    )
+
+
+@timed("extract_bayer_patch", "patches")
+def extract_bayer_patch(raw_image, bayer, patch_points):
     """
-    Calculate the average of patches mat and return average
-    arrays for each channel r,g, and b after normalizing it.
+    Crop a patch from the raw image and return its R, Gr, Gb and B
+    channels as strided views. Each channel starts at the first row and
+    column of the patch having its Bayer phase.
     """
-    r_avg = []
-    g_avg = []
-    b_avg = []
+    (start_x, start_y), (end_x, end_y) = patch_points
+
+    def crop_channel(offset):
+        ch_start_y = start_y + (offset[0] - start_y) % 2
+        ch_start_x = start_x + (offset[1] - start_x) % 2
+        return raw_image[ch_start_y:end_y:2, ch_start_x:end_x:2]
 
-    for _, rgb_mat in enumerate(patches_mat):
-        r_channel, g_channel, b_channel = cv2.split(rgb_mat)
+    r_off, gr_off, gb_off, b_off = bayer_channels_offsets[bayer.upper()]
 
-        r_avg.append((cv2.mean(r_channel)[0]) / 255.0)
-        g_avg.append((cv2.mean(g_channel)[0]) / 255.0)
-        b_avg.append((cv2.mean(b_channel)[0]) / 255.0)
+    return (
+        crop_channel(r_off),
+        crop_channel(gr_off),
+        crop_channel(gb_off),
+        crop_channel(b_off),
+    )
 
-    return r_avg, g_avg, b_avg
+
+def block_means(channel, block_size):
+    """
+    Returns the grid of means of block_size x block_size blocks of a channel.
+    The rows and columns that do not fill a complete block are discarded.
+    """
+    grid_h = channel.shape[0] // block_size
+    grid_w = channel.shape[1] // block_size
+
+    blocks = channel[: grid_h * block_size, : grid_w * block_size].reshape(
+        grid_h, block_size, grid_w, block_size
+    )
+    return blocks.mean(axis=(1, 3), dtype=np.float64)
+
+
+def smooth_grid(grid, kernel_size=3):
+    """
+    Smooth a grid with a kernel_size x kernel_size box filter. Borders
+    are padded with the edge values so the grid size is unchanged.
+    """
+    pad = kernel_size // 2
+    padded = np.pad(grid, pad, mode="edge")
+
+    smoothed = np.zeros(grid.shape, dtype=np.float64)
+    for i in range(kernel_size):
+        for j in range(kernel_size):
+            smoothed += padded[i : i + grid.shape[0], j : j + grid.shape[1]]
+
+    return smoothed / (kernel_size**2)
+
+
+def get_poly_powers(order):
+    """
+    Returns the (x, y) powers of the terms of a 2D polynomial of the given
+    order, in the order of its coefficients.
+    """
+    return [(total - j, j) for total in range(order + 1) for j in range(total + 1)]
+
+
+@timed("fit_poly_surface", "optimizer")
+def fit_poly_surface(grid, x_coords, y_coords, order):
+    """
+    Least squares fit of a 2D polynomial surface of the given order on a grid.
+    x_coords and y_coords are the coordinates of the grid columns and rows
+    (normalized to [-1, 1]). Returns the polynomial coefficients.
+    """
+    x_mesh, y_mesh = np.meshgrid(x_coords, y_coords)
+
+    design = np.stack(
+        [
+            (x_mesh**x_pow * y_mesh**y_pow).ravel()
+            for x_pow, y_pow in get_poly_powers(order)
+        ],
+        axis=1,
+    )
+    coeffs, _, _, _ = np.linalg.lstsq(design, grid.ravel(), rcond=None)
+    return coeffs
+
+
+def eval_poly_surface(coeffs, x_coords, y_coords, order):
+    """
+    Evaluate a 2D polynomial surface on the grid of x_coords and y_coords.
+    The terms are separable, so the surface is computed as a matrix product
+    of row and column powers instead of evaluating each point.
+    """
+    powers = get_poly_powers(order)
+    coeff_mat = np.zeros((order + 1, order + 1), dtype=np.float64)
+    for coeff, (x_pow, y_pow) in zip(coeffs, powers):
+        coeff_mat[y_pow, x_pow] = coeff
+
+    y_pows = np.asarray(y_coords, dtype=np.float64)[:, np.newaxis] ** np.arange(order + 1)
+    x_pows = np.asarray(x_coords, dtype=np.float64)[:, np.newaxis] ** np.arange(order + 1)
+
+    return y_pows @ coeff_mat @ x_pows.T
+
+
+@timed("cal_patches_avg", "patches")
+def cal_patches_avg(patches_mat):
+    """
+    Calculate the robust (sigma-clipped) average of patches mat and return
+    average arrays for each channel r,g, and b after normalizing it, with
+    the statistics of the patches.
+    """
+    patch_stats = PatchStatistics(patches_mat, ["R", "G", "B"])
+    means = patch_stats.get_means() / 255.0
+
+    return list(means[:, 0]), list(means[:, 1]), list(means[:, 2]), patch_stats
 
 
 def select_image_and_get_para(file_types):
@@ -206,19 +417,21 @@ def select_image_and_get_para(file_types):
 
         # Convert the selected raw file into rgb_image.
         raw_image_para.raw_image = raw_img
-        raw_image_para.rgb_image = get_rgb_image(raw_img, raw_image_para.bayer_pattern)
+        raw_image_para.rgb_image = get_rgb_preview(raw_image_para)
 
         # Step 4
         display_raw_parameters(parameters)
 
     else:
-        rgb_image = cv2.imread(file_name)
-        rgb_image = cv2.cvtColor(rgb_image, cv2.COLOR_BGR2RGB)
+        with span("imread", "io"):
+            rgb_image = cv2.imread(file_name)
+            rgb_image = cv2.cvtColor(rgb_image, cv2.COLOR_BGR2RGB)
         raw_image_para.rgb_image = rgb_image
 
     return True, raw_image_para
 
 
+@timed("get_raw_image", "io")
 def get_raw_image(file_name, width, height, bits):
     """
     This function load the given file_name and return the raw image.
@@ -241,3 +454,85 @@ def get_raw_image(file_name, width, height, bits):
 
     raw_image = np.fromfile(file_name, dtype=data_type).reshape((height, width))
     return True, raw_image
+
+
+def get_total_frames(file_name, width, height, bits):
+    """
+    Return the total frames of the given size in a raw file containing
+    one or many frames. Returns 0 if the file size is not a multiple
+    of the frame size.
+    """
+    data_type = np.uint8 if bits == 8 else np.uint16
+    frame_size = height * width * np.dtype(data_type).itemsize
+    file_size = Path(file_name).stat().st_size
+
+    if file_size == 0 or file_size % frame_size != 0:
+        return 0
+    return file_size // frame_size
+
+
+@timed("read_raw_frame", "io")
+def read_raw_frame(file_name, width, height, bits, frame_idx):
+    """
+    Read a single frame from a raw file containing one or many frames,
+    so the other frames are never loaded in memory.
+    """
+    data_type = np.uint8 if bits == 8 else np.uint16
+    frame_size = height * width * np.dtype(data_type).itemsize
+
+    raw_image = np.fromfile(
+        file_name, dtype=data_type, count=height * width, offset=frame_idx * frame_size
+    )
+    return raw_image.reshape((height, width))
+
+
+def get_raw_frames_map(file_name, width, height, bits):
+    """
+    Return a read-only memory map (frames x height x width) of a raw file
+    containing one or many frames, so the data is only read when accessed.
+    Returns None if the file size is not a multiple of the frame size.
+    """
+    total_frames = get_total_frames(file_name, width, height, bits)
+    if total_frames == 0:
+        return None
+
+    data_type = np.uint8 if bits == 8 else np.uint16
+    return np.memmap(
+        file_name, dtype=data_type, mode="r", shape=(total_frames, height, width)
+    )
+
+
+@timed("load_image_para", "io")
+def load_image_para(file_name):
+    """
+    Load a raw or rgb image file without any dialog and return its
+    parameters, similar to select_image_and_get_para. The rgb image of a raw
+    file is not generated, as it is not needed by the batch tasks.
+    Returns None if the raw file name or size is invalid.
+    """
+    raw_image_para = RawImageParameters(file_name)
+
+    if Path(file_name).suffix.lower() == ".raw":
+        parameters = parse_file_name(os.path.basename(file_name))
+        if not parameters:
+            return None
+
+        raw_image_para.store_parameters(parameters)
+        data_type = np.uint8 if raw_image_para.bit_depth == 8 else np.uint16
+        expected_size = raw_image_para.width * raw_image_para.height
+        expected_size *= np.dtype(data_type).itemsize
+        if Path(file_name).stat().st_size != expected_size:
+            return None
+
+        raw_image_para.raw_image = np.fromfile(file_name, dtype=data_type).reshape(
+            (raw_image_para.height, raw_image_para.width)
+        )
+    else:
+        rgb_image = cv2.imread(file_name)
+        if rgb_image is None:
+            return None
+        raw_image_para.rgb_image = cv2.cvtColor(rgb_image, cv2.COLOR_BGR2RGB)
+        raw_image_para.height, raw_image_para.width = rgb_image.shape[:2]
+        raw_image_para.bit_depth = 8
+
+    return raw_image_para
@@ -6,11 +6,15 @@ Author: 10xEngineers
 """
 import tkinter as tk
 from tkinter import ttk
+from tkinter import filedialog as fd
 from PIL import ImageTk
 from src.utils.gui_common_utils import (
     cv2_to_pil_image,
     determine_image_scale_factor,
 )
+from src.utils.image_pyramid import ImagePyramid
+from src.utils.patch_geometry import StoredPatchGeometry
+from src.utils.chart_layout import get_chart_layout, get_chart_layouts
 
 
 class SelectAreaFrame:
@@ -18,9 +22,13 @@ class SelectAreaFrame:
     Define the class to select the ColorChecker patches.
     """
 
-    def __init__(self, rgb_image):
+    def __init__(self, rgb_image, chart_layout=None):
         self.data = SelectionFrameStorage()
         self.data.rgb_image = rgb_image
+
+        # The chart layout can be changed in the frame, ColorChecker 24 by default
+        self.data.chart_layouts = get_chart_layouts()
+        self.data.chart_layout = get_chart_layout() if chart_layout is None else chart_layout
         height, width, _ = rgb_image.shape
 
         self.data.image_width = width
@@ -57,12 +65,13 @@ class SelectAreaFrame:
 
         data.canvas.grid(row=0, column=0, padx=10, pady=10)
 
-        # Create scrollbars and attach them to the canvas to view canvas window
+        # Create scrollbars and attach them to the canvas to view canvas window,
+        # the visible region of the image is rendered again after scrolling
         self.scrollbar_x = ttk.Scrollbar(
-            scroll_window, orient="horizontal", command=data.canvas.xview
+            scroll_window, orient="horizontal", command=self.on_scroll_x
         )
         self.scrollbar_y = ttk.Scrollbar(
-            scroll_window, orient="vertical", command=data.canvas.yview
+            scroll_window, orient="vertical", command=self.on_scroll_y
         )
 
         # Set the size of the scrollbar
@@ -81,7 +90,7 @@ class SelectAreaFrame:
         self.scrollbar_x.grid(row=1, column=0, sticky="NSEW")
         self.scrollbar_y.grid(row=0, column=1, sticky="NS")
 
-        data.canvas.config(scrollregion=data.canvas.bbox(tk.ALL))
+        data.canvas.config(scrollregion=(0, 0, data.resize_width, data.resize_height))
         data.canvas.configure(
             xscrollcommand=self.scrollbar_x.set, yscrollcommand=self.scrollbar_y.set
         )
@@ -187,6 +196,19 @@ class SelectAreaFrame:
         )
         data.y_slider.grid(row=0, column=5, padx=10)
 
+        # Create a list of the available chart layouts and adding label to it
+        chart_label = tk.Label(sliders_frame, text="Chart", borderwidth=1)
+        chart_label.grid(row=0, column=6, padx=(20, 5), pady=5)
+        data.chart_combobox = ttk.Combobox(
+            sliders_frame,
+            values=list(data.chart_layouts),
+            state="readonly",
+            width=18,
+        )
+        data.chart_combobox.set(data.chart_layout.name)
+        data.chart_combobox.bind("<<ComboboxSelected>>", self.on_chart_layout_selected)
+        data.chart_combobox.grid(row=0, column=7, padx=10)
+
         # Set the size of the scrollbar
         style = ttk.Style()
         style.configure("TScale")
@@ -211,7 +233,17 @@ class SelectAreaFrame:
             relief=tk.RIDGE,
             command=self.on_btn_continue_clicked,
         )
-        btn_continue.grid(row=0, column=1, padx=50, pady=10)
+        btn_continue.grid(row=0, column=2, padx=50, pady=10)
+
+        # Create a button to save the patch geometry for the next images
+        btn_save_geometry = tk.Button(
+            button_frame,
+            text="Save Geometry",
+            borderwidth=1,
+            relief=tk.RIDGE,
+            command=self.on_btn_save_geometry_clicked,
+        )
+        btn_save_geometry.grid(row=0, column=1, padx=50, pady=10)
 
         btn_reset = tk.Button(
             button_frame,
@@ -228,7 +260,8 @@ class SelectAreaFrame:
     def customized_image(self):
         """
         Resized the image w.r.t. screen resolution and make it
-        ready to use for canvas.
+        ready to use for canvas. The image pyramid is created here,
+        only the visible region of the image is resized from it.
         """
 
         data = self.data
@@ -242,26 +275,73 @@ class SelectAreaFrame:
             data.root, data.image_width, data.image_height, width_offset, height_offset
         )
 
-        # convert the image mat into PIL image
-        pil_image = cv2_to_pil_image(data.rgb_image)
-
         data.resize_height = int(data.image_height / data.image_scale_factor)
         data.resize_width = int(data.image_width / data.image_scale_factor)
 
-        # Resize the pil image to fit on the image canvas
-        resized_image = pil_image.resize(
-            (
-                data.resize_width,
-                data.resize_height,
-            )
+        # Resize the image to fit on the image canvas
+        data.image_pyramid = ImagePyramid(data.rgb_image)
+        resized_image, _ = data.image_pyramid.get_region(
+            1 / data.image_scale_factor, 0, 0, data.resize_width, data.resize_height
         )
 
-        display_image = ImageTk.PhotoImage(image=resized_image)
+        display_image = ImageTk.PhotoImage(image=cv2_to_pil_image(resized_image))
 
         self.data = data
 
         return display_image
 
+    def render_visible_region(self):
+        """
+        Render only the region of the (zoomed) image that is visible on the
+        canvas, with a margin, and place it at its position on the canvas.
+        """
+        data = self.data
+        data.render_pending = False
+
+        scale = data.zoom_factor / data.image_scale_factor
+        display_width = int(data.resize_width * data.zoom_factor)
+        display_height = int(data.resize_height * data.zoom_factor)
+
+        # Visible region in canvas coordinates
+        margin = data.render_margin
+        x_0 = max(data.canvas.canvasx(0) - margin, 0)
+        y_0 = max(data.canvas.canvasy(0) - margin, 0)
+        x_1 = min(data.canvas.canvasx(data.resize_width) + margin, display_width)
+        y_1 = min(data.canvas.canvasy(data.resize_height) + margin, display_height)
+
+        region, (start_x, start_y) = data.image_pyramid.get_region(
+            scale, x_0, y_0, x_1, y_1
+        )
+
+        # Create a new Tkinter PhotoImage from the region and move the image to it
+        data.tk_image = ImageTk.PhotoImage(cv2_to_pil_image(region))
+        data.canvas.itemconfig("image", image=data.tk_image)
+        data.canvas.coords("image", round(start_x), round(start_y))
+
+    def schedule_render(self):
+        """
+        Render the visible region when the pending events are handled, so
+        the successive scroll events are rendered once.
+        """
+        data = self.data
+        if not data.render_pending:
+            data.render_pending = True
+            data.root.after_idle(self.render_visible_region)
+
+    def on_scroll_x(self, *args):
+        """
+        Horizontal scrollbar event handler
+        """
+        self.data.canvas.xview(*args)
+        self.schedule_render()
+
+    def on_scroll_y(self, *args):
+        """
+        Vertical scrollbar event handler
+        """
+        self.data.canvas.yview(*args)
+        self.schedule_render()
+
     def bind_canvas_event_handlers(self):
         """
         Bind event handlers with canvas.
@@ -312,23 +392,17 @@ class SelectAreaFrame:
         new_width = int(data.resize_width * self.data.zoom_factor)
         new_height = int(data.resize_height * self.data.zoom_factor)
 
-        # Resize the image
-        img = cv2_to_pil_image(data.rgb_image)
-        resized_image = img.resize((new_width, new_height))
-
-        # Create a new Tkinter PhotoImage from the resized image
-        data.tk_image = ImageTk.PhotoImage(resized_image)
-
-        # Update the canvas image and creating sub rect again
-        self.data.canvas.itemconfig("image", image=data.tk_image)
-        self.draw_patches_translated()
-
-        # Configuring the window scroll bar to updated image
-        data.canvas.config(scrollregion=data.canvas.bbox(tk.ALL))
+        # Configuring the window scroll bar to updated image size, only
+        # its visible region is rendered
+        data.canvas.config(scrollregion=(0, 0, new_width, new_height))
         data.canvas.configure(
             xscrollcommand=self.scrollbar_x.set, yscrollcommand=self.scrollbar_y.set
         )
 
+        # Update the canvas image and creating sub rect again
+        self.render_visible_region()
+        self.draw_patches_translated()
+
     def create_default_rect(self):
         """
         Reset the sub_rects
@@ -364,8 +438,8 @@ class SelectAreaFrame:
         )
 
         # W and H of each patch
-        self.data.patch_width = rect_width // 6
-        self.data.patch_height = rect_height // 4
+        self.data.patch_width = rect_width // self.data.chart_layout.columns
+        self.data.patch_height = rect_height // self.data.chart_layout.rows
 
         # Setting up default corner points for creating sub-rectangles
         self.data.upper_left = rect_start
@@ -418,6 +492,41 @@ class SelectAreaFrame:
         data.is_data_saved = True
         self.data = data
 
+    def on_btn_save_geometry_clicked(self):
+        """
+        Save geometry button event handler, the drawn patches are saved
+        (normalized to the image size) to be reused on the next images of
+        the same camera setup.
+        """
+        data = self.data
+        file_path = fd.asksaveasfilename(
+            parent=data.root,
+            defaultextension=".json",
+            filetypes=(("JSON Files", "*.json"),),
+            initialfile="patch_geometry.json",
+            title="Please select file storage path.",
+        )
+        if not file_path:
+            return
+
+        StoredPatchGeometry.save(
+            file_path,
+            data.sub_rect_points,
+            data.image_width,
+            data.image_height,
+            data.chart_layout.name,
+        )
+        print("Patch geometry saved at:", file_path)
+
+    def on_chart_layout_selected(self, event):
+        """
+        Chart layout selection event handler, the default patches of the
+        selected chart are drawn.
+        """
+        data = self.data
+        data.chart_layout = data.chart_layouts[data.chart_combobox.get()]
+        self.create_default_rect()
+
     def on_leave(self, event):
         """
         Cursor getting default state
@@ -563,6 +672,12 @@ class SelectAreaFrame:
         """
         return self.data.sub_rect_points
 
+    def get_chart_layout(self):
+        """
+        Return the layout of the chart of the sub-rects
+        """
+        return self.data.chart_layout
+
     def draw_patches_translated(self):
         """
         Fucntion to draw sub-rect inside the main rectangle
@@ -579,8 +694,8 @@ class SelectAreaFrame:
         self.delete_all()
 
         # Define total number of rows and columns of sub-rects
-        columns = 6
-        rows = 4
+        columns = data.chart_layout.columns
+        rows = data.chart_layout.rows
 
         # Calculate the W and H of sub_rect from user input
         patch_width = int(data.patch_width * data.sub_rect_scale_factor_x / 100)
@@ -588,10 +703,10 @@ class SelectAreaFrame:
 
         # Calculating vertical and horizontal offsets (dx & dy) for left and right
         # points in order to set starting and ending points of each row
-        dx_l = (-upper_left[0] + bottom_left[0]) / 3
-        dy_l = (-upper_left[1] + bottom_left[1]) / 3
-        dx_r = (-upper_right[0] + bottom_right[0]) / 3
-        dy_r = (-upper_right[1] + bottom_right[1]) / 3
+        dx_l = (-upper_left[0] + bottom_left[0]) / (rows - 1)
+        dy_l = (-upper_left[1] + bottom_left[1]) / (rows - 1)
+        dx_r = (-upper_right[0] + bottom_right[0]) / (rows - 1)
+        dy_r = (-upper_right[1] + bottom_right[1]) / (rows - 1)
 
         # Clear the array to save the sub-rects points
         data.sub_rect_points.clear()
@@ -608,8 +723,8 @@ class SelectAreaFrame:
             )
 
             # Calculating offset for each patch in a row (column wise)
-            offset_x1 = (end_row[0] - start_row[0]) / 5
-            offset_y1 = (end_row[1] - start_row[1]) / 5
+            offset_x1 = (end_row[0] - start_row[0]) / (columns - 1)
+            offset_y1 = (end_row[1] - start_row[1]) / (columns - 1)
             for col in range(columns):
                 # Calculating starting and ending point for each rectangle
                 start_rect = (
@@ -627,15 +742,15 @@ class SelectAreaFrame:
                     x_center = (start_rect[0] + end_rect[0]) / 2
                     y_center = (start_rect[1] + end_rect[1]) / 2 + 5
                     self.create_star(x_center, y_center, "upper_left")
-                elif row == 0 and col == 5:
+                elif row == 0 and col == columns - 1:
                     x_center = (start_rect[0] + end_rect[0]) / 2
                     y_center = (start_rect[1] + end_rect[1]) / 2 + 5
                     self.create_star(x_center, y_center, "upper_right")
-                elif row == 3 and col == 0:
+                elif row == rows - 1 and col == 0:
                     x_center = (start_rect[0] + end_rect[0]) / 2
                     y_center = (start_rect[1] + end_rect[1]) / 2 + 5
                     self.create_star(x_center, y_center, "bottom_left")
-                elif row == 3 and col == 5:
+                elif row == rows - 1 and col == columns - 1:
                     x_center = (start_rect[0] + end_rect[0]) / 2
                     y_center = (start_rect[1] + end_rect[1]) / 2 + 5
                     self.create_star(x_center, y_center, "bottom_right")
@@ -730,6 +845,12 @@ class SelectionFrameStorage:
     def __init__(self):
         self.rgb_image = None
         self.tk_image = None
+
+        # Pyramid of the image, its visible region (with a margin in canvas
+        # pixels) is rendered after zooming and scrolling
+        self.image_pyramid = None
+        self.render_margin = 32
+        self.render_pending = False
         self.image_width = 1920
         self.image_height = 1080
         self.root = None
@@ -763,6 +884,11 @@ class SelectionFrameStorage:
         self.s_slider = None
         self.maxsize_flag = False
 
+        # Layout of the chart and the available layouts
+        self.chart_combobox = None
+        self.chart_layout = None
+        self.chart_layouts = {}
+
         # Default value of sliders to set 0
         self.x_size = 0
         self.y_size = 0
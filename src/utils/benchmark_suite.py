@@ -0,0 +1,376 @@
+"""
+File: benchmark_suite.py
+Description: Headless benchmarks of the algorithms on synthetic bayer frames
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+import json
+import time
+import shutil
+import platform
+import tempfile
+import tracemalloc
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.modules.BLC.blc_algo import BlackLevelsAlgo
+from src.modules.WB.white_balance_algo import WhiteBalanceAlgo
+from src.modules.BNR.bnr_algo import BneAlgo
+from src.modules.NR.noise_reduction_2d_algo import NEAlgo
+from src.modules.CCM.ccm_algo import ColorCorrectionMatrixAlgo
+from src.utils.algo_common_utils import RawImageParameters, get_raw_image, get_rgb_image
+from src.utils.read_yaml_file import ReadWriteYMLFile
+from src.utils.create_h_file.generate_h_file import GenerateHFile
+from src.utils.gui_common_utils import generate_separator
+from src.utils.profiling import get_memory_usage
+from src.utils.result_cache import result_cache
+from src.utils.synthetic_chart import SyntheticColorChecker
+
+
+# Frame sizes (width, height) of the benchmarks
+BENCH_SIZES = {
+    "2MP": (1920, 1080),
+    "8MP": (3840, 2160),
+    "24MP": (6000, 4000),
+    "50MP": (8192, 6144),
+}
+
+BENCH_BAYERS = ["RGGB", "GRBG", "GBRG", "BGGR"]
+BENCH_BITS = [8, 10, 12, 14, 16]
+
+# Benchmarks run on each frame (size, bits and bayer)
+FRAME_BENCHMARKS = [
+    "get_raw_image",
+    "get_rgb_image",
+    "calculate_blc",
+    "apply_blclevels",
+    "white_balance",
+    "bne_patches_stats",
+    "rgb_to_yuv",
+]
+
+# Benchmarks whose cost does not depend on the frame, run once per suite
+SUITE_BENCHMARKS = ["calculate_ccm_matrix", "yaml_load", "yaml_save", "generate_h_file"]
+
+DEFAULT_CONFIG_FILE = os.path.join("config", "default_configs.yml")
+
+
+def prepare_benchmark(bench, raw_image_para, generator, work_dir, config_file):
+    """
+    Prepare the inputs of a benchmark, outside of the measured time, and
+    return the function to be measured. The interactive parts of the modules
+    (dialogs and windows) are not included.
+    """
+    raw_image = raw_image_para.raw_image
+    bayer = raw_image_para.bayer_pattern
+    points = generator.get_patch_points()
+
+    if bench in ("get_raw_image", "apply_blclevels"):
+        raw_image.tofile(raw_image_para.file_name)
+
+    if bench == "get_raw_image":
+        return lambda: get_raw_image(
+            raw_image_para.file_name,
+            raw_image_para.width,
+            raw_image_para.height,
+            raw_image_para.bit_depth,
+        )
+
+    if bench == "get_rgb_image":
+        return lambda: get_rgb_image(raw_image, bayer)
+
+    if bench == "calculate_blc":
+        return BlackLevelsAlgo(raw_image_para).calculate_blc
+
+    if bench == "apply_blclevels":
+        # Streaming core of apply_blclevels, without the file saving dialog
+        blc_algo = BlackLevelsAlgo(raw_image_para)
+        blc_levels = [generator.black_level] * 4
+        out_file = os.path.join(work_dir, "BLC-" + os.path.basename(raw_image_para.file_name))
+        return lambda: blc_algo.apply_blclevels_to_file(out_file, blc_levels)
+
+    if bench == "bne_patches_stats":
+        # Statistics of BneAlgo.apply_algo, without the table window
+        return BneAlgo(raw_image_para, points).get_patches_stats
+
+    rgb_image = get_rgb_image(raw_image, bayer)
+
+    if bench == "white_balance":
+        def white_balance():
+            wb_algo = WhiteBalanceAlgo(rgb_image, points)
+            return wb_algo.apply_wb_gains(*wb_algo.calculate_wb_gains())
+        return white_balance
+
+    if bench == "rgb_to_yuv":
+        ne_algo = NEAlgo(rgb_image, points)
+        return lambda: ne_algo.rgb_to_yuv(rgb_image)
+
+    if bench == "calculate_ccm_matrix":
+        ccm_algo = ColorCorrectionMatrixAlgo()
+        ccm_algo.set_parameters(points, rgb_image, True, False, False)
+        wb_algo = WhiteBalanceAlgo(rgb_image, points)
+        data = ccm_algo.data
+        data.r_avg, data.g_avg, data.b_avg = wb_algo.get_patches_averages()
+        ccm_algo.find_initial_ccm()
+        return ccm_algo.calculate_ccm_matrix
+
+    if bench == "yaml_load":
+        return lambda: ReadWriteYMLFile(config_file)
+
+    if bench == "yaml_save":
+        yaml_file = ReadWriteYMLFile(config_file)
+        out_file = os.path.join(work_dir, "bench_config.yml")
+        return lambda: yaml_file.save_file(out_file)
+
+    if bench == "generate_h_file":
+        out_file = os.path.join(work_dir, "bench_isp_init.h")
+        return lambda: GenerateHFile(config_file, "v1.0").write_to_h_file(out_file)
+
+    raise ValueError(f"Unknown benchmark {bench}.")
+
+
+def run_benchmark_case(case, repeat, work_dir, config_file):
+    """
+    Run a single benchmark case and return its measurements. This function
+    runs in a fresh process per case, so the peak RSS is of the case only.
+    The wall times are measured without tracing, the allocations (peak of
+    the traced memory) are measured in an extra traced run.
+    """
+    width, height, bits, bayer = case["width"], case["height"], case["bits"], case["bayer"]
+
+    # Results are always computed, never loaded from the cache
+    result_cache.enabled = False
+    file_name = os.path.join(work_dir, f"bench_{width}x{height}_{bits}bits_{bayer}.raw")
+
+    raw_image_para = RawImageParameters(file_name)
+    raw_image_para.store_parameters(["bench", width, height, bits, bayer])
+    generator = SyntheticColorChecker(width, height, bits, bayer)
+    raw_image_para.raw_image = generator.generate()
+
+    func = prepare_benchmark(case["bench"], raw_image_para, generator, work_dir, config_file)
+    setup_rss = get_memory_usage()[1]
+
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start_time)
+    peak_rss = get_memory_usage()[1]
+
+    tracemalloc.start()
+    func()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = dict(case)
+    result.update(
+        {
+            "repeat": repeat,
+            "time_min_s": min(times),
+            "time_median_s": float(np.median(times)),
+            "time_mean_s": float(np.mean(times)),
+            "peak_rss_mb": peak_rss,
+            "rss_delta_mb": None if peak_rss is None else peak_rss - setup_rss,
+            "alloc_peak_mb": alloc_peak / 2**20,
+        }
+    )
+    return result
+
+
+class BenchmarkSuite:
+    """
+    Benchmark Suite
+    """
+
+    # Compared metrics of the results
+    compared_metrics = ["time_median_s", "alloc_peak_mb"]
+
+    # Differences below these values (s, MB) are considered as noise
+    min_differences = {"time_median_s": 0.005, "alloc_peak_mb": 1.0}
+
+    def __init__(
+        self,
+        sizes=None,
+        bayers=None,
+        bits=None,
+        benchmarks=None,
+        repeat=3,
+        config_file=DEFAULT_CONFIG_FILE,
+    ):
+        """
+        sizes      : names of the frame sizes (keys of BENCH_SIZES)
+        bayers     : bayer patterns of the frames
+        bits       : bit depths of the frames
+        benchmarks : names of the benchmarks, None for all
+        repeat     : total measured runs of each case
+        """
+        self.sizes = sizes if sizes else list(BENCH_SIZES)
+        self.bayers = bayers if bayers else BENCH_BAYERS
+        self.bits = bits if bits else BENCH_BITS
+        self.benchmarks = benchmarks if benchmarks else FRAME_BENCHMARKS + SUITE_BENCHMARKS
+        self.repeat = repeat
+        self.config_file = config_file
+        self.results = []
+
+    @staticmethod
+    def get_case_key(result):
+        """
+        Returns the key identifying a case in the results.
+        """
+        return (
+            f"{result['bench']}/{result['width']}x{result['height']}/"
+            f"{result['bits']}bits/{result['bayer']}"
+        )
+
+    def get_cases(self):
+        """
+        Returns all the cases of the suite. The suite benchmarks are run on
+        the first frame only.
+        """
+        frames = [
+            (size, bits, bayer)
+            for size in self.sizes
+            for bits in self.bits
+            for bayer in self.bayers
+        ]
+
+        cases = []
+        for bench in self.benchmarks:
+            for size, bits, bayer in frames[:1] if bench in SUITE_BENCHMARKS else frames:
+                width, height = BENCH_SIZES[size]
+                cases.append(
+                    {
+                        "bench": bench,
+                        "size": size,
+                        "width": width,
+                        "height": height,
+                        "bits": bits,
+                        "bayer": bayer,
+                    }
+                )
+        return cases
+
+    def run(self):
+        """
+        Run all the cases, each one in a fresh (spawned) process.
+        """
+        cases = self.get_cases()
+        work_dir = tempfile.mkdtemp(prefix="tuning_tool_bench_")
+        context = multiprocessing.get_context("spawn")
+
+        self.results = []
+        try:
+            for count, case in enumerate(cases):
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(
+                        run_benchmark_case, case, self.repeat, work_dir, self.config_file
+                    ).result()
+                self.results.append(result)
+                print(
+                    f"[{count + 1}/{len(cases)}] {self.get_case_key(result): <48}"
+                    f"{result['time_median_s'] * 1000:10.2f} ms"
+                )
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        return self.results
+
+    @staticmethod
+    def get_meta():
+        """
+        Returns the description of the machine and the packages.
+        """
+        return {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        }
+
+    def save_results(self, json_file):
+        """
+        Save the results and the meta data in a json file.
+        """
+        with open(json_file, "w", encoding="utf-8") as fil:
+            json.dump({"meta": self.get_meta(), "results": self.results}, fil, indent=2)
+
+    @staticmethod
+    def load_results(json_file):
+        """
+        Returns the results of a json file saved by save_results.
+        """
+        with open(json_file, "r", encoding="utf-8") as fil:
+            return json.load(fil)["results"]
+
+    def compare(self, baseline, threshold=0.1):
+        """
+        Compare the results with the baseline results. A metric is a
+        regression if it is higher than the baseline by more than the
+        threshold (ratio) and by more than its min difference.
+        Returns the list of comparisons (key, metric, baseline, current,
+        ratio, is_regression) of the cases present in both.
+        """
+        baseline = {self.get_case_key(result): result for result in baseline}
+
+        comparisons = []
+        for result in self.results:
+            key = self.get_case_key(result)
+            if key not in baseline:
+                continue
+
+            for metric in self.compared_metrics:
+                old, new = baseline[key].get(metric), result.get(metric)
+                if old is None or new is None:
+                    continue
+                ratio = new / old if old > 0 else 1.0
+                is_regression = (
+                    ratio > 1 + threshold and new - old > self.min_differences[metric]
+                )
+                comparisons.append((key, metric, old, new, ratio, is_regression))
+
+        return comparisons
+
+    def display_results(self):
+        """
+        Display the measurements of all the cases
+        """
+        generate_separator("Benchmark Results", "-")
+        header = "{: <52}{: <14}{: <14}{: <14}{: <14}"
+        print(header.format("Case", "Median (ms)", "Min (ms)", "Peak RSS (MB)", "Alloc (MB)"))
+
+        def fmt(value, scale=1):
+            return "-" if value is None else f"{value * scale:.2f}"
+
+        for res in self.results:
+            print(
+                header.format(
+                    self.get_case_key(res),
+                    fmt(res["time_median_s"], 1000),
+                    fmt(res["time_min_s"], 1000),
+                    fmt(res["peak_rss_mb"]),
+                    fmt(res["alloc_peak_mb"]),
+                )
+            )
+        print()
+
+    def display_comparison(self, comparisons, threshold):
+        """
+        Display the comparison with the baseline and the regressions
+        """
+        generate_separator("Comparison with the Baseline", "-")
+        header = "{: <52}{: <16}{: <14}{: <14}{: <10}"
+        print(header.format("Case", "Metric", "Baseline", "Current", "Ratio"))
+        for key, metric, old, new, ratio, is_regression in comparisons:
+            line = header.format(key, metric, f"{old:.4f}", f"{new:.4f}", f"{ratio:.2f}")
+            print(f"\033[31m{line}\033[0m" if is_regression else line)
+
+        total = sum(1 for comparison in comparisons if comparison[5])
+        if total:
+            print(f"\n\033[31m{total} regressions\033[0m above {threshold * 100:.0f}%.")
+        else:
+            print(f"\n\033[32mNo regression\033[0m above {threshold * 100:.0f}%.")
+        print()
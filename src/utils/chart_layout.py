@@ -0,0 +1,211 @@
+"""
+File: chart_layout.py
+Description: Layouts and reference data of the supported color charts
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+import json
+import numpy as np
+
+# Directory of the reference files and of the custom layouts file
+APP_DATA_DIR = "app_data"
+CUSTOM_LAYOUTS_FILE = "chart_layouts.json"
+DEFAULT_LAYOUT_NAME = "ColorChecker 24"
+
+
+class ChartLayout:
+    """
+    Layout of a color chart: a grid of columns x rows patches numbered row
+    by row from the upper left patch, and the files of their D65 Lab and
+    linear RGB reference values (one row per patch). The neutral, white
+    balance and black patches are found from the Lab references, so no
+    patch index is hard-coded for a chart.
+    """
+
+    # Max chroma (C*ab) of a neutral patch
+    neutral_chroma = 5.0
+    # Lightness (L*) range of the neutral patches used for the white balance,
+    # the white (may clip) and the black (noisy) patches are excluded
+    wb_lightness_range = (25.0, 90.0)
+
+    def __init__(self, name, columns, rows, reference_lab, reference_lin):
+        """
+        name          : name of the chart
+        columns       : patches in a row of the chart
+        rows          : rows of patches of the chart
+        reference_lab : file (in app_data) of the Lab reference values
+        reference_lin : file (in app_data) of the linear RGB reference values
+        """
+        self.name = name
+        self.columns = columns
+        self.rows = rows
+        self.total_patches = columns * rows
+        self.reference_lab = reference_lab
+        self.reference_lin = reference_lin
+
+        self.ref_lab = None
+        self.ref_lin = None
+
+    def get_reference_path(self, file_name):
+        """
+        Returns the path of a reference file of the chart.
+        """
+        return os.path.join(os.getcwd(), APP_DATA_DIR, file_name)
+
+    def read_reference_file(self, file_name):
+        """
+        Returns the reference values (total patches x 3) of a file, None if
+        the file does not exist or does not contain 3 values per patch.
+        """
+        try:
+            values = np.loadtxt(self.get_reference_path(file_name), ndmin=2)
+        except (OSError, ValueError):
+            return None
+
+        if values.shape != (self.total_patches, 3):
+            return None
+        return values
+
+    def get_reference_lab(self):
+        """
+        Returns the Lab reference values of the patches, None if their file
+        is missing or invalid.
+        """
+        if self.ref_lab is None:
+            self.ref_lab = self.read_reference_file(self.reference_lab)
+        return self.ref_lab
+
+    def get_reference_lin(self):
+        """
+        Returns the linear RGB reference values of the patches, None if their
+        file is missing or invalid.
+        """
+        if self.ref_lin is None:
+            self.ref_lin = self.read_reference_file(self.reference_lin)
+        return self.ref_lin
+
+    def is_available(self):
+        """
+        Returns true if the reference files of the chart are valid.
+        """
+        return self.get_reference_lab() is not None and self.get_reference_lin() is not None
+
+    def get_neutral_patches(self):
+        """
+        Returns the indices of the neutral patches, from the lightest to the
+        darkest, None if the Lab references are not available.
+        """
+        ref_lab = self.get_reference_lab()
+        if ref_lab is None:
+            return None
+
+        chroma = np.hypot(ref_lab[:, 1], ref_lab[:, 2])
+        neutral = np.flatnonzero(chroma <= self.neutral_chroma)
+        return neutral[np.argsort(-ref_lab[neutral, 0], kind="stable")]
+
+    def get_wb_patches(self):
+        """
+        Returns the indices of the neutral patches used to calculate the
+        white balance gains, in the order of the chart.
+        """
+        neutral = self.get_neutral_patches()
+        if neutral is None:
+            return None
+
+        lightness = self.get_reference_lab()[neutral, 0]
+        low, high = self.wb_lightness_range
+        return np.sort(neutral[(lightness > low) & (lightness < high)])
+
+    def get_black_patch(self):
+        """
+        Returns the index of the darkest neutral patch.
+        """
+        neutral = self.get_neutral_patches()
+        if neutral is None or neutral.size == 0:
+            return None
+        return int(neutral[-1])
+
+    def has_neutral_patches(self):
+        """
+        Returns true if the chart has neutral patches for the white balance
+        and a black patch.
+        """
+        wb_patches = self.get_wb_patches()
+        return (
+            wb_patches is not None
+            and wb_patches.size > 0
+            and self.get_black_patch() is not None
+        )
+
+
+# Built-in charts, the reference files of the ColorChecker SG (specific to
+# the chart batch) are not shipped and need to be added in app_data from the
+# chart data. Charts whose gray scale is outside of the patches grid (e.g.
+# the IT8.7/2) are not supported as they have no neutral patches in the grid.
+builtin_layouts = [
+    ChartLayout(DEFAULT_LAYOUT_NAME, 6, 4, "refD65Lab.txt", "refD65Lin.txt"),
+    ChartLayout("ColorChecker SG", 14, 10, "refD65Lab_SG.txt", "refD65Lin_SG.txt"),
+]
+
+
+def load_custom_layouts():
+    """
+    Returns the custom layouts of the chart_layouts.json file of app_data,
+    given as {"name": {"columns", "rows", "reference_lab", "reference_lin"}}.
+    Invalid layouts are skipped with a warning.
+    """
+    file_path = os.path.join(os.getcwd(), APP_DATA_DIR, CUSTOM_LAYOUTS_FILE)
+    if not os.path.exists(file_path):
+        return []
+
+    try:
+        with open(file_path, "r", encoding="utf-8") as fil:
+            layouts_data = json.load(fil)
+    except (OSError, ValueError):
+        print(f"\033[31mWarning!\033[0m Invalid {CUSTOM_LAYOUTS_FILE} file.")
+        return []
+
+    layouts = []
+    for name, layout in layouts_data.items():
+        try:
+            columns = int(layout["columns"])
+            rows = int(layout["rows"])
+            if columns < 2 or rows < 2:
+                raise ValueError
+            layouts.append(
+                ChartLayout(
+                    name, columns, rows, layout["reference_lab"], layout["reference_lin"]
+                )
+            )
+        except (KeyError, TypeError, ValueError):
+            print(f"\033[31mWarning!\033[0m Invalid chart layout '{name}' is skipped.")
+    return layouts
+
+
+def get_chart_layouts():
+    """
+    Returns the built-in and the custom chart layouts whose reference files
+    are available, by their names. Layouts without neutral patches (for the
+    white balance and the black patch) are skipped with a warning.
+    """
+    layouts = {}
+    for layout in builtin_layouts + load_custom_layouts():
+        if layout.name in layouts or not layout.is_available():
+            continue
+        if not layout.has_neutral_patches():
+            print(
+                f"\033[31mWarning!\033[0m Chart layout '{layout.name}' has no neutral "
+                "patches for the white balance or no black patch, it is skipped."
+            )
+            continue
+        layouts[layout.name] = layout
+    return layouts
+
+
+def get_chart_layout(name=DEFAULT_LAYOUT_NAME):
+    """
+    Returns the chart layout of the given name, None if it is unknown or
+    its reference files are not available.
+    """
+    return get_chart_layouts().get(name)
@@ -7,6 +7,8 @@ Author: 10xEngineers
 import warnings
 import yaml
 import numpy as np
+from src.utils.fixed_point import FixedPoint
+from src.utils.profiling import span
 
 
 class CreateHFileData:
@@ -15,7 +17,7 @@ class CreateHFileData:
     """
 
     def __init__(self, config_path):
-        with open(config_path, "r", encoding="utf-8") as fil:
+        with span("yaml.load", "yaml"), open(config_path, "r", encoding="utf-8") as fil:
             self.c_yaml = yaml.safe_load(fil)
 
         # Defined the ISP enable / disable parameters. The one which are independent
@@ -127,19 +129,82 @@ class CreateHFileData:
         self.h_data["BLC"]["gr_offset"] = black_levels[1]
         self.h_data["BLC"]["gb_offset"] = black_levels[2]
         self.h_data["BLC"]["b_offset"] = black_levels[3]
-        self.h_data["BLC"]["linear_r"] = self.sat_to_hex(sat_levels[0], black_levels[0])
-        self.h_data["BLC"]["linear_gr"] = self.sat_to_hex(sat_levels[1], black_levels[1])
-        self.h_data["BLC"]["linear_gb"] = self.sat_to_hex(sat_levels[2], black_levels[2])
-        self.h_data["BLC"]["linear_b"] = self.sat_to_hex(sat_levels[3], black_levels[3])
+
+        # Linearization factors of all the channels are converted in one call
+        linear_r, linear_gr, linear_gb, linear_b = self.sat_to_hex(
+            sat_levels[:4], black_levels[:4]
+        )
+        self.h_data["BLC"]["linear_r"] = linear_r
+        self.h_data["BLC"]["linear_gr"] = linear_gr
+        self.h_data["BLC"]["linear_gb"] = linear_gb
+        self.h_data["BLC"]["linear_b"] = linear_b
+
+    def update_blc_map(self, blc_map):
+        """
+        Update the black level map data. The section is added after the BLC
+        section only if the config has a black level map. The grids are
+        rounded to integers and the surface coefficients are converted to
+        signed S32.12 fixed-point numbers (in hexadecimal).
+        """
+        block_size, poly_order, grids, surfaces = blc_map
+
+        map_data = {
+            "blc_map_block_size": block_size,
+            "blc_map_width": len(grids[0][0]),
+            "blc_map_height": len(grids[0]),
+            "blc_map_poly_order": poly_order,
+        }
+
+        fixed_point = FixedPoint(True, 32, 12, rounding="around")
+        for channel, grid, coeffs in zip(["r", "gr", "gb", "b"], grids, surfaces):
+            map_data[f"blc_map_{channel}[]"] = self.rtl_array(
+                np.rint(np.array(grid)).astype(np.int32)
+            )
+            coeffs_hex = fixed_point.to_hex(fixed_point.to_int(coeffs), prefix="0X")
+            map_data[f"blc_surface_{channel}[]"] = "{" + ",".join(coeffs_hex) + "}"
+
+        self.insert_section("BLC_MAP", map_data, after="BLC")
+
+    def update_lsc(self, lsc):
+        """
+        Update the lens shading data. The section is added after the DGAIN
+        section only if the config has the gain grids. The gains are
+        converted to U16.12 fixed-point numbers.
+        """
+        block_size, gains = lsc
+
+        lsc_data = {
+            "lsc_block_size": block_size,
+            "lsc_width": len(gains[0][0]),
+            "lsc_height": len(gains[0]),
+        }
+
+        fixed_point = FixedPoint(False, 16, 12, rounding="around")
+        for channel, grid in zip(["r", "gr", "gb", "b"], gains):
+            lsc_data[f"lsc_gain_{channel}[]"] = self.rtl_array(fixed_point.to_int(grid))
+
+        self.insert_section("LSC", lsc_data, after="DGAIN")
+
+    def insert_section(self, section, data, after):
+        """
+        Insert a section in the h_data after the given section.
+        """
+        h_data = {}
+        for key, value in self.h_data.items():
+            h_data[key] = value
+            if key == after:
+                h_data[section] = data
+        self.h_data = h_data
 
     def sat_to_hex(self, sat, blc):
         """
-        Convert saturation value to hexadecimal
+        Convert saturation values to hexadecimal U16.14 linearization factors
         """
-        # Converting number into hexadecimal
-        number = (hex(int(sat * np.power(2, 14) / (sat - blc)))).upper()
-        # Selecting 16 most significant digits
-        return number[:16]
+        sat = np.asarray(sat, dtype=np.float64)
+        blc = np.asarray(blc, dtype=np.float64)
+
+        fixed_point = FixedPoint(False, 16, 14, rounding="fix")
+        return fixed_point.to_hex(fixed_point.to_int(sat / (sat - blc)), prefix="0X")
 
     def update_oecf(self, oecf):
         """
@@ -235,8 +300,12 @@ class CreateHFileData:
         """
         Update wb data
         """
-        self.h_data["WB"]["r_gain"] = int(np.floor(wbgain[0] * 256))
-        self.h_data["WB"]["b_gain"] = int(np.floor(wbgain[1] * 256))
+        # Gains are converted to fixed-point with 8 fractional bits
+        fixed_point = FixedPoint(False, 16, 8, rounding="floor")
+        r_gain, b_gain = fixed_point.to_int(wbgain[:2])
+
+        self.h_data["WB"]["r_gain"] = int(r_gain)
+        self.h_data["WB"]["b_gain"] = int(b_gain)
 
     def update_2dnr(self, dnr):
         """
@@ -261,7 +330,9 @@ class CreateHFileData:
         Update ae data
         """
         self.h_data["AE"]["center_illuminance"] = ae_par[0]
-        self.h_data["AE"]["histogram_skewnes"] = int(np.floor(ae_par[1] * 256))
+        self.h_data["AE"]["histogram_skewnes"] = int(
+            FixedPoint(False, 16, 8, rounding="floor").to_int(ae_par[1])
+        )
 
     def update_isp_modules_state(self, modules_state):
         """
@@ -331,12 +402,15 @@ class CreateHFileData:
         """
         # Generating exact format needed in .h file that is to add commas
         # between each entry of the row and replacing [] with {}
-        final_array = np.array2string(array.flatten(), separator=",")[1:-1]
+        final_array = np.array2string(
+            array.flatten(), separator=",", threshold=array.size
+        )[1:-1]
         final_array = final_array.replace("\n", "")
         final_string = "{" + final_array + "}"
         return final_string
 
-    def x_bf_make_color_curve(self, n_ind, max_diff, sigma_color, factor):
+    @staticmethod
+    def x_bf_make_color_curve(n_ind, max_diff, sigma_color, factor):
         """
         Generating Look-up-table based on color difference
         """
@@ -359,7 +433,8 @@ class CreateHFileData:
             )
         return curve
 
-    def gauss_kern_raw(self, kern, std_dev, stride):
+    @staticmethod
+    def gauss_kern_raw(kern, std_dev, stride):
         """
         Creating spatial kernel
         """
@@ -388,7 +463,8 @@ class CreateHFileData:
         out_kern = np.uint8(255 * out_kern + 0.5)
         return out_kern
 
-    def make_weighted_curve(self, n_ind, h_par):
+    @staticmethod
+    def make_weighted_curve(n_ind, h_par):
         """
         Creating weighting LUT
         """
@@ -6,6 +6,7 @@ Author: 10xEngineers
 """
 from src.utils.read_yaml_file import ReadWriteYMLFile
 from src.utils.create_h_file.create_h_data import CreateHFileData
+from src.utils.profiling import timed
 
 
 class GenerateHFile:
@@ -13,6 +14,7 @@ class GenerateHFile:
     Generate H File
     """
 
+    @timed("h_file.create_data", "h_file")
     def __init__(self, in_config_file, version):
         self.version = version
         self.in_config_file = in_config_file
@@ -31,12 +33,22 @@ class GenerateHFile:
         # Update the blc data
         self.h_file.update_blc(read_file.get_blc_data(), read_file.get_blc_sat_data())
 
+        # Update the black level map data, if present in the config
+        blc_map = read_file.get_blc_map_data()
+        if blc_map is not None:
+            self.h_file.update_blc_map(blc_map)
+
         # Update oecf data
         self.h_file.update_oecf(read_file.get_oecf_data())
 
         # Update dgain data
         self.h_file.update_dgain(read_file.get_dgain_data())
 
+        # Update the lens shading data, if present in the config
+        lsc = read_file.get_lsc_data()
+        if lsc is not None:
+            self.h_file.update_lsc(lsc)
+
         # Update bnr data
         self.h_file.update_bnr(read_file.get_bnr_data(), read_file.get_bits_depth())
         # Update awb data
@@ -169,6 +181,7 @@ class GenerateHFile:
         else:
             return 0
 
+    @timed("h_file.write", "h_file")
     def write_to_h_file(self, h_file):
         """
         Writing h_data to .h file
@@ -5,6 +5,7 @@ Author: 10xEngineers
 ------------------------------------------------------------
 """
 import yaml
+from src.utils.profiling import span
 
 
 class CustomDumper(yaml.Dumper):
@@ -26315,7 +26316,7 @@ class Config:
         """
         Writing data to file
         """
-        with open(self.filename, "w", encoding="utf-8") as fil:
+        with span("yaml.save", "yaml"), open(self.filename, "w", encoding="utf-8") as fil:
             yaml.dump(
                 self.data,
                 fil,
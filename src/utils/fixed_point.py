@@ -0,0 +1,135 @@
+"""
+File: fixed_point.py
+Description: Vectorized fixed-point quantization of numbers and arrays
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import numpy as np
+
+
+class FixedPoint:
+    """
+    Fixed-point number format. All the conversions work on scalars
+    as well as on numpy arrays in a single call.
+    """
+
+    # Rounding methods to convert the scaled values to integers
+    # trunc  : towards zero (drops the fractional part)
+    # floor  : towards minus infinity
+    # ceil   : towards plus infinity
+    # fix    : towards zero (same as trunc)
+    # around : to the nearest integer, halves to the nearest even integer
+    rounding_methods = {
+        "trunc": np.trunc,
+        "floor": np.floor,
+        "ceil": np.ceil,
+        "fix": np.fix,
+        "around": np.around,
+    }
+
+    # Overflow methods for the integers out of the word range
+    # saturate : clip the integer to the minimum / maximum value
+    # wrap     : keep the n_word least significant bits (two's complement)
+    overflow_methods = ["saturate", "wrap"]
+
+    def __init__(self, signed, n_word, n_frac, rounding="trunc", overflow="saturate"):
+        """
+        signed   : flag to indicate if the numbers are signed (two's complement)
+        n_word   : total number of bits of the fixed-point number
+        n_frac   : number of bits of the fractional part
+        rounding : rounding method, one of the rounding_methods keys
+        overflow : overflow method, one of the overflow_methods
+        """
+        if rounding not in self.rounding_methods:
+            raise ValueError(f"Invalid rounding method: {rounding}")
+
+        if overflow not in self.overflow_methods:
+            raise ValueError(f"Invalid overflow method: {overflow}")
+
+        if n_word <= 0 or n_word > 63 or n_frac > n_word:
+            raise ValueError(f"Invalid fixed-point format: {n_word}.{n_frac}")
+
+        self.signed = signed
+        self.n_word = n_word
+        self.n_frac = n_frac
+        self.n_int = n_word - n_frac - int(signed)
+        self.rounding = rounding
+        self.overflow = overflow
+
+        if signed:
+            self.min_int = -(2 ** (n_word - 1))
+            self.max_int = 2 ** (n_word - 1) - 1
+        else:
+            self.min_int = 0
+            self.max_int = 2**n_word - 1
+
+    def to_int(self, values):
+        """
+        Returns the integer representation (value * 2^n_frac)
+        of the given values.
+        """
+        scaled = np.asarray(values, dtype=np.float64) * (2**self.n_frac)
+        ints = self.rounding_methods[self.rounding](scaled)
+
+        if self.overflow == "saturate":
+            ints = np.clip(ints, self.min_int, self.max_int)
+        else:
+            ints = np.mod(ints - self.min_int, 2**self.n_word) + self.min_int
+
+        return ints.astype(np.int64)
+
+    def to_float(self, ints):
+        """
+        Returns the real values of the given integer representation.
+        """
+        return np.asarray(ints, dtype=np.float64) / (2**self.n_frac)
+
+    def quantize(self, values):
+        """
+        Returns the quantized values along with their integer representation.
+        """
+        ints = self.to_int(values)
+        return self.to_float(ints), ints
+
+    def to_bin(self, ints):
+        """
+        Render the integer representation as binary strings of n_word bits
+        (two's complement for signed numbers). Returns a string for a scalar
+        input and an array of strings otherwise.
+        """
+        bits = self.get_digits(ints, 1, self.n_word)
+        return self.digits_to_str(bits, b"01", "")
+
+    def to_hex(self, ints, prefix="0x"):
+        """
+        Render the integer representation as hexadecimal strings with
+        ceil(n_word / 4) digits (two's complement for signed numbers).
+        Returns a string for a scalar input and an array of strings otherwise.
+        """
+        n_digits = -(-self.n_word // 4)
+        nibbles = self.get_digits(ints, 4, n_digits)
+        return self.digits_to_str(nibbles, b"0123456789ABCDEF", prefix)
+
+    def get_digits(self, ints, bits_per_digit, n_digits):
+        """
+        Split the n_word least significant bits of the integers into digits
+        of bits_per_digit bits, most significant digit first.
+        """
+        mask = (1 << self.n_word) - 1
+        unsigned = np.asarray(ints, dtype=np.int64) & mask
+
+        shifts = np.arange(n_digits - 1, -1, -1) * bits_per_digit
+        return (unsigned[..., np.newaxis] >> shifts) & ((1 << bits_per_digit) - 1)
+
+    def digits_to_str(self, digits, symbols, prefix):
+        """
+        Map the digits on the given symbols and join them into strings.
+        """
+        n_digits = digits.shape[-1]
+        chars = np.frombuffer(symbols, dtype=np.uint8)[digits]
+        strings = np.ascontiguousarray(chars).view(f"S{n_digits}")[..., 0]
+        strings = np.char.add(prefix, strings.astype(str))
+
+        if strings.ndim == 0:
+            return str(strings)
+        return strings
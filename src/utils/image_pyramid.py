@@ -0,0 +1,90 @@
+"""
+File: image_pyramid.py
+Description: Image pyramid to display the visible region of large images
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import math
+import cv2
+
+
+class ImagePyramid:
+    """
+    Image pyramid of an rgb image: each level is half the size of the
+    previous one (level 0 is the image). The levels are calculated on first
+    use. A region of the image displayed at any scale is resized from the
+    smallest level that is at least as large as the display, so only the
+    visible region is resized whatever the image size.
+    """
+
+    # Levels are not reduced below this size (pixels of the shortest side)
+    min_level_size = 64
+
+    def __init__(self, image):
+        """
+        image : rgb image (H x W x 3)
+        """
+        self.levels = [image]
+        self.image_height, self.image_width = image.shape[:2]
+
+    def get_level(self, level):
+        """
+        Returns the image of a level, the missing levels up to it are
+        calculated by halving the previous level (box filter).
+        """
+        while len(self.levels) <= level:
+            previous = self.levels[-1]
+            self.levels.append(
+                cv2.resize(
+                    previous,
+                    (max(previous.shape[1] // 2, 1), max(previous.shape[0] // 2, 1)),
+                    interpolation=cv2.INTER_AREA,
+                )
+            )
+        return self.levels[level]
+
+    def select_level(self, scale):
+        """
+        Returns the smallest level that is at least as large as the image
+        displayed at the given scale (display size / image size).
+        """
+        if scale >= 1:
+            return 0
+
+        max_level = int(
+            math.log2(max(min(self.image_width, self.image_height) / self.min_level_size, 1))
+        )
+        return min(int(math.floor(math.log2(1 / scale))), max_level)
+
+    def get_region(self, scale, x_0, y_0, x_1, y_1):
+        """
+        Returns the region (x_0, y_0) - (x_1, y_1) of the image displayed at
+        the given scale (display coordinates), and the display coordinates
+        of its upper left corner. The region is aligned on the pixels of the
+        level it is resized from, so its corner can be up to half a display
+        pixel away from (x_0, y_0).
+        """
+        level = self.select_level(scale)
+        level_image = self.get_level(level)
+        level_height, level_width = level_image.shape[:2]
+
+        # Display to level coordinates ratios
+        ratio_x = level_width / (self.image_width * scale)
+        ratio_y = level_height / (self.image_height * scale)
+
+        # Level pixels covering the region
+        start_x = min(max(int(math.floor(x_0 * ratio_x)), 0), level_width - 1)
+        start_y = min(max(int(math.floor(y_0 * ratio_y)), 0), level_height - 1)
+        end_x = min(max(int(math.ceil(x_1 * ratio_x)), start_x + 1), level_width)
+        end_y = min(max(int(math.ceil(y_1 * ratio_y)), start_y + 1), level_height)
+
+        size = (
+            max(int(round((end_x - start_x) / ratio_x)), 1),
+            max(int(round((end_y - start_y) / ratio_y)), 1),
+        )
+        interpolation = cv2.INTER_AREA if ratio_x >= 1 else cv2.INTER_LINEAR
+        region = cv2.resize(
+            level_image[start_y:end_y, start_x:end_x], size, interpolation=interpolation
+        )
+
+        return region, (start_x / ratio_x, start_y / ratio_y)
@@ -0,0 +1,141 @@
+"""
+File: patch_geometry.py
+Description: Saves and loads the ColorChecker patch geometry of a camera setup
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import json
+from src.utils.chart_layout import DEFAULT_LAYOUT_NAME, get_chart_layout
+
+
+class PatchGeometryData:
+    """
+    Data of a stored patch geometry, in the format of the selection
+    frame storage (the patches are saved and their points are given).
+    """
+
+    def __init__(self, sub_rect_points, image_width, image_height):
+        self.sub_rect_points = sub_rect_points
+        self.image_width = image_width
+        self.image_height = image_height
+        self.is_data_saved = True
+
+
+class StoredPatchGeometry:
+    """
+    ColorChecker patch geometry stored in a file. The patch points are
+    normalized to the image size, so the geometry of a fixed test bench can
+    be reused on all its images, at any resolution. It can be used in place
+    of the selection frame by the modules, as it gives the sub-rect points
+    of the patches and the chart layout the same way.
+    """
+
+    # Max difference of the aspect ratios of the stored and the used images
+    aspect_ratio_tolerance = 0.01
+
+    def __init__(self, normalized_points, image_width, image_height, chart_layout=None):
+        """
+        normalized_points : (x_0, y_0, x_1, y_1) of each patch, normalized
+                            to the image size
+        image_width       : width of the image the points are mapped on
+        image_height      : height of the image the points are mapped on
+        chart_layout      : layout of the chart, ColorChecker 24 if None
+        """
+        self.normalized_points = normalized_points
+        self.stored_size = None
+        self.chart_layout = get_chart_layout() if chart_layout is None else chart_layout
+
+        sub_rect_points = [
+            (
+                (int(round(x_0 * image_width)), int(round(y_0 * image_height))),
+                (int(round(x_1 * image_width)), int(round(y_1 * image_height))),
+            )
+            for x_0, y_0, x_1, y_1 in normalized_points
+        ]
+        self.data = PatchGeometryData(sub_rect_points, image_width, image_height)
+
+    @staticmethod
+    def normalize_points(sub_rect_points, image_width, image_height):
+        """
+        Returns the (x_0, y_0, x_1, y_1) of each patch normalized to the
+        image size.
+        """
+        return [
+            [
+                round(start[0] / image_width, 6),
+                round(start[1] / image_height, 6),
+                round(end[0] / image_width, 6),
+                round(end[1] / image_height, 6),
+            ]
+            for start, end in sub_rect_points
+        ]
+
+    @staticmethod
+    def save(
+        file_name, sub_rect_points, image_width, image_height, layout_name=DEFAULT_LAYOUT_NAME
+    ):
+        """
+        Save the sub-rect points of the patches of a chart selected on an
+        image of the given size in a json file.
+        """
+        geometry = {
+            "image_size": [image_width, image_height],
+            "chart_layout": layout_name,
+            "patches": StoredPatchGeometry.normalize_points(
+                sub_rect_points, image_width, image_height
+            ),
+        }
+        with open(file_name, "w", encoding="utf-8") as fil:
+            json.dump(geometry, fil, indent=2)
+
+    @classmethod
+    def load(cls, file_name, image_width, image_height):
+        """
+        Returns the geometry of a json file mapped on an image of the given
+        size, None if the file can not be read or is not a patch geometry of
+        an available chart layout. Files without a layout are geometries of
+        the ColorChecker 24.
+        """
+        try:
+            with open(file_name, "r", encoding="utf-8") as fil:
+                geometry = json.load(fil)
+            normalized_points = [
+                [float(value) for value in points] for points in geometry["patches"]
+            ]
+            stored_size = [int(value) for value in geometry["image_size"]]
+            chart_layout = get_chart_layout(geometry.get("chart_layout", DEFAULT_LAYOUT_NAME))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+        if chart_layout is None or len(normalized_points) != chart_layout.total_patches:
+            return None
+        if any(len(points) != 4 for points in normalized_points):
+            return None
+
+        stored_geometry = cls(normalized_points, image_width, image_height, chart_layout)
+        stored_geometry.stored_size = stored_size
+        return stored_geometry
+
+    def is_aspect_ratio_matched(self):
+        """
+        Returns true if the aspect ratio of the image the geometry is mapped
+        on matches the one of the image it was selected on.
+        """
+        if self.stored_size is None:
+            return True
+
+        stored_ratio = self.stored_size[0] / self.stored_size[1]
+        image_ratio = self.data.image_width / self.data.image_height
+        return abs(image_ratio / stored_ratio - 1) <= self.aspect_ratio_tolerance
+
+    def get_sub_rect_points(self):
+        """
+        Return the sub-rect points of the patches on the image
+        """
+        return self.data.sub_rect_points
+
+    def get_chart_layout(self):
+        """
+        Return the layout of the chart of the patches
+        """
+        return self.chart_layout
@@ -0,0 +1,277 @@
+"""
+File: patch_statistics.py
+Description: Refines the ColorChecker patches and calculates their robust statistics
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import numpy as np
+from src.utils.gui_common_utils import generate_separator
+from src.utils.profiling import timed
+
+
+def stack_patches(patches):
+    """
+    Stack patches of different sizes (H x W or H x W x C) into one float32
+    array (N x H_max x W_max [x C]) padded with NaN, so that the statistics
+    of all the patches are computed at once.
+    """
+    max_height = max(patch.shape[0] for patch in patches)
+    max_width = max(patch.shape[1] for patch in patches)
+
+    stacked = np.full(
+        (len(patches), max_height, max_width) + patches[0].shape[2:],
+        np.nan,
+        dtype=np.float32,
+    )
+    for idx, patch in enumerate(patches):
+        stacked[idx, : patch.shape[0], : patch.shape[1]] = patch
+    return stacked
+
+
+def get_sample(stacked, max_size=256):
+    """
+    Returns a strided view of the stacked patches of at most max_size rows
+    and columns, to estimate the median and the noise of large patches
+    without reading all their pixels.
+    """
+    step = max(1, int(np.ceil(max(stacked.shape[1:3]) / max_size)))
+    return stacked[:, ::step, ::step]
+
+
+def nan_mean(stacked, axis):
+    """
+    Returns the mean of the non-NaN values along an axis, NaN where all the
+    values are NaN (without the warning of np.nanmean).
+    """
+    valid = ~np.isnan(stacked)
+    total = np.count_nonzero(valid, axis=axis)
+    sums = np.sum(np.where(valid, stacked, 0), axis=axis, dtype=np.float64)
+    return np.divide(sums, total, out=np.full(sums.shape, np.nan), where=total > 0)
+
+
+def count_leading(mask, lengths):
+    """
+    Returns the number of leading and trailing true values of each row of a
+    mask whose rows have the given lengths (the rest of a row is ignored).
+    """
+    leading = np.cumprod(mask, axis=1).sum(axis=1)
+
+    # Reverse each row within its length
+    idx = lengths[:, np.newaxis] - 1 - np.arange(mask.shape[1])[np.newaxis, :]
+    reversed_mask = np.where(
+        idx >= 0, mask[np.arange(mask.shape[0])[:, np.newaxis], np.maximum(idx, 0)], False
+    )
+    trailing = np.cumprod(reversed_mask, axis=1).sum(axis=1)
+    return leading, trailing
+
+
+@timed("refine_patch_points", "patches")
+def refine_patch_points(
+    guide_image, patches_points, margin=0.05, max_shrink=0.25, threshold=3.0, tolerance=0.02
+):
+    """
+    Shrink the patches away from their edges. Each patch is shrunk by the
+    margin (ratio of its size) on each side, then its border rows and columns
+    whose mean departs from the patch median (e.g. the chart frame or the
+    next patch of a patch drawn slightly off) are removed, up to max_shrink
+    of its size on each side. A row or column departs if its difference is
+    larger than threshold times its noise and the tolerance (ratio of the
+    median). The rows and columns of all the patches are tested at once on
+    the guide image (rgb or single channel). Only the margin is applied if
+    there is no guide image.
+    """
+    points = np.array(
+        [[start[0], start[1], end[0], end[1]] for start, end in patches_points],
+        dtype=np.float64,
+    )
+    widths = points[:, 2] - points[:, 0]
+    heights = points[:, 3] - points[:, 1]
+
+    start_x = np.ceil(points[:, 0] + margin * widths).astype(int)
+    start_y = np.ceil(points[:, 1] + margin * heights).astype(int)
+    end_x = np.maximum(np.floor(points[:, 2] - margin * widths).astype(int), start_x + 2)
+    end_y = np.maximum(np.floor(points[:, 3] - margin * heights).astype(int), start_y + 2)
+
+    if guide_image is not None:
+        patches = [
+            guide_image[y_0:y_1, x_0:x_1]
+            for x_0, y_0, x_1, y_1 in zip(start_x, start_y, end_x, end_y)
+        ]
+        if guide_image.ndim == 3:
+            patches = [patch.mean(axis=2, dtype=np.float32) for patch in patches]
+        stacked = stack_patches(patches)
+        patch_h = end_y - start_y
+        patch_w = end_x - start_x
+
+        # Median and robust (MAD) noise of each patch
+        sample = get_sample(stacked)
+        center = np.nanmedian(sample, axis=(1, 2))
+        scale = 1.4826 * np.nanmedian(np.abs(sample - center[:, None, None]), axis=(1, 2))
+        min_diff = tolerance * np.abs(center)
+
+        row_diff = np.abs(nan_mean(stacked, axis=2) - center[:, None])
+        row_limit = np.maximum(threshold * scale / np.sqrt(patch_w), min_diff)
+        col_diff = np.abs(nan_mean(stacked, axis=1) - center[:, None])
+        col_limit = np.maximum(threshold * scale / np.sqrt(patch_h), min_diff)
+
+        # NaN differences (padding) are never departing
+        top, bottom = count_leading(row_diff > row_limit[:, None], patch_h)
+        left, right = count_leading(col_diff > col_limit[:, None], patch_w)
+
+        max_rows = np.floor(max_shrink * patch_h).astype(int)
+        max_cols = np.floor(max_shrink * patch_w).astype(int)
+        start_y = start_y + np.minimum(top, max_rows)
+        end_y = end_y - np.minimum(bottom, max_rows)
+        start_x = start_x + np.minimum(left, max_cols)
+        end_x = end_x - np.minimum(right, max_cols)
+
+    return [
+        ((int(x_0), int(y_0)), (int(x_1), int(y_1)))
+        for x_0, y_0, x_1, y_1 in zip(start_x, start_y, end_x, end_y)
+    ]
+
+
+class PatchStatistics:
+    """
+    Robust statistics of the ColorChecker patches. Outlier pixels (e.g.
+    specular spots or dust) are rejected by sigma-clipping around the patch
+    median, and the uniformity of each patch (noise, illumination gradient
+    and rejected pixels) is measured. All the patches are processed at once
+    on their NaN padded stack.
+    """
+
+    # Limits of a uniform patch (ratios)
+    max_gradient = 0.05
+    max_rejected = 0.05
+
+    def __init__(self, patches, channel_names, clip_sigma=3.5, clip_iterations=3):
+        """
+        patches         : list of N patches (H x W x C), one per ColorChecker patch
+        channel_names   : names of the C channels
+        clip_sigma      : pixels further than clip_sigma std from the median
+                          (in any channel) are rejected
+        clip_iterations : max iterations of the sigma-clipping
+        """
+        self.channel_names = channel_names
+        stacked = stack_patches(patches)
+        heights = np.array([patch.shape[0] for patch in patches])
+        widths = np.array([patch.shape[1] for patch in patches])
+
+        # The clipping is iterated on a sample of the pixels, then its final
+        # limits are applied on all the pixels (rejected pixels set to NaN)
+        sample = get_sample(stacked).copy()
+        for _ in range(clip_iterations):
+            center = np.nanmedian(sample, axis=(1, 2), keepdims=True)
+            limit = clip_sigma * np.nanstd(sample, axis=(1, 2), keepdims=True)
+            outliers = np.any(np.abs(sample - center) > limit, axis=3)
+            if not outliers.any():
+                break
+            sample[outliers] = np.nan
+
+        deviation = np.subtract(stacked, center, dtype=np.float32)
+        np.abs(deviation, out=deviation)
+        stacked[np.any(deviation > limit, axis=3)] = np.nan
+        del deviation
+
+        # The statistics are calculated from the sums of the rows and the
+        # columns of the valid pixels (NaN set to 0). The row sums are only
+        # used for the gradient, so they are summed in float32 (einsum is
+        # much faster than a sum along the rows of this layout).
+        valid = ~np.isnan(stacked[..., 0])
+        stacked[~valid] = 0
+        col_sums = stacked.sum(axis=1, dtype=np.float64)
+        row_sums = np.einsum("nhwc->nhc", stacked).astype(np.float64)
+        row_counts = np.count_nonzero(valid, axis=2)
+        col_counts = np.count_nonzero(valid, axis=1)
+        valid_pixels = row_counts.sum(axis=1)
+
+        # Mean and std (N x C) and ratio of the rejected pixels (N), the std
+        # is summed on the deviations from the mean to keep its precision
+        self.mean = col_sums.sum(axis=1) / valid_pixels[:, None]
+        deviation = stacked - self.mean[:, None, None].astype(np.float32)
+        deviation *= valid[..., None]
+        self.std = np.sqrt(
+            np.einsum("nhwc,nhwc->nc", deviation, deviation) / valid_pixels[:, None]
+        )
+        del deviation
+        self.rejected = 1 - valid_pixels / (heights * widths)
+
+        # Gradient: largest difference between the halves (top / bottom and
+        # left / right) of a patch, ratio of the patch mean (max of the channels)
+        top = np.arange(stacked.shape[1]) < heights[:, None] // 2
+        left = np.arange(stacked.shape[2]) < widths[:, None] // 2
+        vertical = np.abs(
+            self.get_half_mean(row_sums, row_counts, top)
+            - self.get_half_mean(row_sums, row_counts, ~top)
+        )
+        horizontal = np.abs(
+            self.get_half_mean(col_sums, col_counts, left)
+            - self.get_half_mean(col_sums, col_counts, ~left)
+        )
+        mean = np.where(self.mean > 0, self.mean, np.nan)
+        self.gradient = np.nan_to_num(np.max(np.maximum(vertical, horizontal) / mean, axis=1))
+
+    @staticmethod
+    def get_half_mean(sums, counts, half):
+        """
+        Returns the mean (N x C) of a half of the patches, from the sums
+        (N x L x C) and the pixel counts (N x L) of their rows or columns.
+        """
+        half_counts = np.sum(counts * half, axis=1)[:, None]
+        half_sums = np.sum(sums * half[..., None], axis=1)
+        return np.divide(
+            half_sums, half_counts, out=np.zeros_like(half_sums), where=half_counts > 0
+        )
+
+    def get_means(self):
+        """
+        Returns the robust means (N x C) of the channels of the patches.
+        """
+        return self.mean
+
+    def get_non_uniform_patches(self):
+        """
+        Returns the indices of the patches exceeding the gradient or the
+        rejected pixels limits.
+        """
+        return np.flatnonzero(
+            (self.gradient > self.max_gradient) | (self.rejected > self.max_rejected)
+        )
+
+    def display_uniformity(self):
+        """
+        Display the uniformity of each patch, the non-uniform patches are
+        displayed in red.
+        """
+        generate_separator("Patches Uniformity", "-")
+        row_format = "{: <8}" + "{: <10}" * len(self.channel_names) + "{: <12}{: <12}"
+        print(
+            row_format.format(
+                "Patch",
+                *[f"CV {name}" for name in self.channel_names],
+                "Gradient",
+                "Rejected",
+            )
+        )
+
+        non_uniform = set(self.get_non_uniform_patches().tolist())
+        cv_values = np.divide(
+            self.std, self.mean, out=np.zeros_like(self.std), where=self.mean > 0
+        )
+        for idx, cv_value in enumerate(cv_values):
+            row = row_format.format(
+                idx + 1,
+                *[f"{value * 100:.2f}%" for value in cv_value],
+                f"{self.gradient[idx] * 100:.2f}%",
+                f"{self.rejected[idx] * 100:.2f}%",
+            )
+            print(f"\033[31m{row}\033[0m" if idx in non_uniform else row)
+
+        if non_uniform:
+            print(
+                f"\n\033[31mWarning!\033[0m {len(non_uniform)} patches are not uniform "
+                f"(gradient > {self.max_gradient * 100:.0f}% or rejected pixels > "
+                f"{self.max_rejected * 100:.0f}%), check the chart illumination and the "
+                "patches selection."
+            )
+        print()
@@ -0,0 +1,426 @@
+"""
+File: profiling.py
+Description: Lightweight timing spans of the hot paths and their trace / summary
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+import sys
+import json
+import time
+import functools
+import threading
+import tracemalloc
+from contextlib import nullcontext
+from datetime import datetime
+from src.utils.gui_common_utils import generate_separator
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+# Environment variable enabling the profiling, its value is the directory
+# of the trace files ("1" for the default directory)
+PROFILE_ENV_VAR = "TUNING_TOOL_PROFILE"
+DEFAULT_PROFILE_DIR = "profiles"
+
+# Environment variable enabling the memory profiling, its value is the total
+# allocation sites reported ("1" for the default total)
+MEMORY_PROFILE_ENV_VAR = "TUNING_TOOL_PROFILE_MEMORY"
+DEFAULT_TOP_SITES = 10
+
+
+def get_memory_usage():
+    """
+    Returns the current and the peak resident memory (MB) of the process.
+    On Linux they are read from /proc, elsewhere the current RSS is None and
+    the peak is the lifetime peak of the process (None on Windows).
+    """
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as fil:
+            status = dict(line.split(":", 1) for line in fil if ":" in line)
+        return int(status["VmRSS"].split()[0]) / 2**10, int(status["VmHWM"].split()[0]) / 2**10
+    except (OSError, KeyError, ValueError):
+        pass
+
+    if resource is None:
+        return None, None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in KB on Linux
+    return None, peak_rss / 2 ** (20 if sys.platform == "darwin" else 10)
+
+
+def reset_peak_rss():
+    """
+    Reset the peak resident memory of the process to its current RSS, so
+    the peak of a module execution can be measured. Only supported on Linux,
+    returns False if the peak is not reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="utf-8") as fil:
+            fil.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class Span:
+    """
+    Timing Span, records a complete event in the profiler on exit
+    """
+
+    __slots__ = ("profiler", "name", "category", "start")
+
+    def __init__(self, profiler, name, category):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.start = 0
+
+    def __enter__(self):
+        if self.profiler.memory is not None:
+            self.profiler.memory.enter_span()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        alloc_peak = None
+        if self.profiler.memory is not None:
+            alloc_peak = self.profiler.memory.exit_span()
+        self.profiler.events.append(
+            (
+                self.name,
+                self.category,
+                self.start,
+                end - self.start,
+                threading.get_ident(),
+                alloc_peak,
+            )
+        )
+        return False
+
+
+class MemoryProfiler:
+    """
+    Memory Profiler of a module execution, using tracemalloc. The peak of
+    the traced memory of each span is measured above the memory at its
+    start, including the peaks of its nested spans.
+    """
+
+    def __init__(self, top_sites=DEFAULT_TOP_SITES):
+        """
+        top_sites : total allocation sites reported
+        """
+        self.top_sites = top_sites
+
+        # Memory at the start and peak of the run and of the open spans
+        self.stack = []
+        self.start_rss = None
+
+        # Snapshot of the highest traced memory seen at the exit of a span
+        self.snapshot = None
+        self.snapshot_size = 0
+
+    def start_run(self):
+        """
+        Start tracing the allocations of a new run.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+
+        reset_peak_rss()
+        self.start_rss = get_memory_usage()[0]
+        self.stack = [[0, 0]]
+        self.snapshot = None
+        self.snapshot_size = 0
+
+    def enter_span(self):
+        """
+        Save the traced memory at the start of a span. The tracemalloc peak is
+        reset for the span, the peak of the parent so far is kept in the stack.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        self.stack[-1][1] = max(self.stack[-1][1], peak)
+        self.stack.append([current, 0])
+        tracemalloc.reset_peak()
+
+    def exit_span(self):
+        """
+        Returns the peak traced memory (bytes) of the span above its start.
+        The traced memory is saved in a snapshot if it is the highest so far,
+        to report the allocation sites.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        start, nested_peak = self.stack.pop()
+        peak = max(peak, nested_peak)
+        self.stack[-1][1] = max(self.stack[-1][1], peak)
+
+        if current > self.snapshot_size:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = current
+
+        return peak - start
+
+    def get_run_peak(self):
+        """
+        Returns the peak traced memory (bytes) of the run.
+        """
+        return max(tracemalloc.get_traced_memory()[1], self.stack[0][1])
+
+    def get_top_sites(self):
+        """
+        Returns the top allocation sites (file:line, size in MB, total blocks)
+        of the highest traced memory seen at the exit of a span.
+        """
+        if self.snapshot is None:
+            return []
+
+        snapshot = self.snapshot.filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+        sites = []
+        for stat in snapshot.statistics("lineno")[: self.top_sites]:
+            frame = stat.traceback[0]
+            site = f"{os.path.relpath(frame.filename)}:{frame.lineno}"
+            sites.append((site, stat.size / 2**20, stat.count))
+        return sites
+
+    def display_report(self, title, events):
+        """
+        Display the peak RSS and traced memory of the run, the peak of each
+        span and the top allocation sites
+        """
+        current_rss, peak_rss = get_memory_usage()
+
+        generate_separator(f"Memory Profile: {title}", "-")
+        if peak_rss is not None:
+            print(f"Peak RSS         = {peak_rss:.2f} MB")
+        if current_rss is not None and self.start_rss is not None:
+            print(f"RSS (start, end) = {self.start_rss:.2f} MB, {current_rss:.2f} MB")
+        print(f"Traced peak      = {self.get_run_peak() / 2**20:.2f} MB\n")
+
+        peaks = {}
+        for event in events:
+            peaks[event[0]] = max(peaks.get(event[0], 0), event[5])
+
+        header = "{: <44}{: <16}"
+        print(header.format("Span", "Peak (MB)"))
+        for name, peak in sorted(peaks.items(), key=lambda item: item[1], reverse=True):
+            print(header.format(name[:42], f"{peak / 2**20:.2f}"))
+
+        sites = self.get_top_sites()
+        if sites:
+            print(f"\nTop allocation sites (at {self.snapshot_size / 2**20:.2f} MB traced)")
+            header = "{: <60}{: <14}{: <10}"
+            print(header.format("Site", "Size (MB)", "Blocks"))
+            for site, size, count in sites:
+                print(header.format(site[-58:], f"{size:.2f}", count))
+        print()
+
+
+class Profiler:
+    """
+    Profiler of the timing spans. When it is disabled, the spans are a
+    shared no-op context, so the instrumented code is not slowed down.
+    """
+
+    # Shared no-op context of the disabled spans
+    null_span = nullcontext()
+
+    def __init__(self):
+        # Spans are recorded if the timing or the memory profiling is enabled
+        self.enabled = False
+        self.timing = False
+        self.memory = None
+        self.out_dir = DEFAULT_PROFILE_DIR
+
+        # Recorded events (name, category, start ns, duration ns, thread id,
+        # peak traced memory in bytes or None)
+        self.events = []
+        self.run_start = time.perf_counter_ns()
+
+    def enable(self, out_dir=None):
+        """
+        Enable the profiling, the trace files are saved in out_dir.
+        """
+        self.enabled = True
+        self.timing = True
+        if out_dir:
+            self.out_dir = out_dir
+        self.reset()
+
+    def enable_memory(self, top_sites=DEFAULT_TOP_SITES):
+        """
+        Enable the memory profiling. Tracing the allocations slows down the
+        execution, so the times are not reliable in this mode.
+        """
+        self.enabled = True
+        self.memory = MemoryProfiler(top_sites)
+        self.reset()
+
+    def enable_from_env(self):
+        """
+        Enable the profiling if the environment variables are set.
+        """
+        value = os.environ.get(PROFILE_ENV_VAR, "")
+        if value and value != "0":
+            self.enable(None if value == "1" else value)
+
+        value = os.environ.get(MEMORY_PROFILE_ENV_VAR, "")
+        if value and value != "0":
+            self.enable_memory(DEFAULT_TOP_SITES if value == "1" else int(value))
+
+    def reset(self):
+        """
+        Clear the recorded events and start a new run.
+        """
+        self.events = []
+        self.run_start = time.perf_counter_ns()
+        if self.memory is not None:
+            self.memory.start_run()
+
+    def span(self, name, category="span"):
+        """
+        Returns a context measuring the time of the enclosed code.
+        """
+        if not self.enabled:
+            return self.null_span
+        return Span(self, name, category)
+
+    def get_summary(self):
+        """
+        Returns the statistics (name, category, calls, total, mean and max
+        in ms) of the recorded events, sorted by the total time.
+        """
+        stats = {}
+        for name, category, _, duration, *_ in self.events:
+            stat = stats.setdefault(name, [category, 0, 0, 0])
+            stat[1] += 1
+            stat[2] += duration
+            stat[3] = max(stat[3], duration)
+
+        summary = [
+            (name, category, calls, total / 1e6, total / calls / 1e6, longest / 1e6)
+            for name, (category, calls, total, longest) in stats.items()
+        ]
+        return sorted(summary, key=lambda stat: stat[3], reverse=True)
+
+    def get_trace(self):
+        """
+        Returns the events in the Chrome trace format (chrome://tracing or
+        Perfetto), as complete events with microsecond times.
+        """
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self.run_start) / 1e3,
+                    "dur": duration / 1e3,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {} if alloc_peak is None else {"alloc_peak_mb": alloc_peak / 2**20},
+                }
+                for name, category, start, duration, tid, alloc_peak in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def save_trace(self, trace_file):
+        """
+        Save the recorded events in a Chrome trace json file.
+        """
+        with open(trace_file, "w", encoding="utf-8") as fil:
+            json.dump(self.get_trace(), fil)
+
+    def display_summary(self, title):
+        """
+        Display the statistics of the recorded events
+        """
+        run_time = (time.perf_counter_ns() - self.run_start) / 1e6
+
+        generate_separator(f"Profile: {title}", "-")
+        header = "{: <44}{: <12}{: <8}{: <12}{: <12}{: <12}"
+        print(header.format("Span", "Category", "Calls", "Total (ms)", "Mean (ms)", "Max (ms)"))
+        for name, category, calls, total, mean, longest in self.get_summary():
+            print(
+                header.format(
+                    name[:42], category, calls, f"{total:.2f}", f"{mean:.2f}", f"{longest:.2f}"
+                )
+            )
+        print(f"\nRun time = {run_time:.2f} ms")
+
+    def end_run(self, title):
+        """
+        Display the summaries, save the trace of the run and start a new run.
+        Nothing is done if the profiling is disabled or no event is recorded.
+        """
+        if not self.enabled or not self.events:
+            self.reset()
+            return None
+
+        if self.memory is not None:
+            self.memory.display_report(title, self.events)
+        if not self.timing:
+            self.reset()
+            return None
+
+        self.display_summary(title)
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        name = "".join(char if char.isalnum() else "_" for char in title.strip()).lower()
+        trace_file = os.path.join(
+            self.out_dir, f"trace_{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        self.save_trace(trace_file)
+        print(f"Trace saved to:\n {trace_file}")
+        generate_separator("", "-")
+
+        self.reset()
+        return trace_file
+
+
+# Profiler of the tool, shared by all the modules
+profiler = Profiler()
+profiler.enable_from_env()
+
+
+def span(name, category="span"):
+    """
+    Returns a context measuring the time of the enclosed code, e.g.
+        with span("ccm.minimize", "optimizer"):
+            ...
+    """
+    return profiler.span(name, category)
+
+
+def timed(name=None, category="function"):
+    """
+    Decorator measuring the time of each call of a function. The span name
+    is the qualified name of the function by default.
+    """
+
+    def decorator(func):
+        span_name = name if name else func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with Span(profiler, span_name, category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
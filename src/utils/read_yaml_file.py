@@ -5,6 +5,7 @@ Author: 10xEngineers
 ------------------------------------------------------------
 """
 import yaml
+from src.utils.profiling import span
 
 
 class CustomDumper(yaml.Dumper):
@@ -37,7 +38,7 @@ class ReadWriteYMLFile:
     """
 
     def __init__(self, config_path):
-        with open(config_path, "r", encoding="utf-8") as fil:
+        with span("yaml.load", "yaml"), open(config_path, "r", encoding="utf-8") as fil:
             self.c_yaml = yaml.safe_load(fil)
 
     def get_bits_depth(self):
@@ -92,6 +93,34 @@ class ReadWriteYMLFile:
 
         return (r_sat, gr_sat, gb_sat, b_sat, is_linear)
 
+    def get_blc_map_data(self):
+        """
+        Get the black level map, None if the config does not have it
+        """
+        parm_map = self.c_yaml.get("black_level_map")
+        if not parm_map:
+            return None
+
+        return (
+            parm_map["block_size"],
+            parm_map["poly_order"],
+            [parm_map[f"{ch}_grid"] for ch in ["r", "gr", "gb", "b"]],
+            [parm_map[f"{ch}_surface"] for ch in ["r", "gr", "gb", "b"]],
+        )
+
+    def get_lsc_data(self):
+        """
+        Get the lens shading gain grids, None if the config does not have them
+        """
+        parm_lsc = self.c_yaml.get("lens_shading_correction")
+        if not parm_lsc or "r_gain" not in parm_lsc:
+            return None
+
+        return (
+            parm_lsc["block_size"],
+            [parm_lsc[f"{ch}_gain"] for ch in ["r", "gr", "gb", "b"]],
+        )
+
     def get_oecf_data(self):
         """
         Get the OECF LUT
@@ -121,6 +150,12 @@ class ReadWriteYMLFile:
 
         return (under_exp, over_exp)
 
+    def get_awb_stats_window(self):
+        """
+        Get AWB stats window offsets
+        """
+        return self.c_yaml["auto_white_balance"]["stats_window_offset"]
+
     def get_wb_data(self):
         """
         Get WB gains
@@ -180,6 +215,12 @@ class ReadWriteYMLFile:
 
         return (center_illu, hist_skew)
 
+    def get_ae_stats_window(self):
+        """
+        Get AE stats window offsets
+        """
+        return self.c_yaml["auto_exposure"]["stats_window_offset"]
+
     def get_csc_data(self):
         """
         Get CSC data
@@ -225,6 +266,54 @@ class ReadWriteYMLFile:
             self.c_yaml["invalid_region_crop"]["height_start_idx"],
         )
 
+    def set_dpc_data(self, dp_threshold):
+        """
+        Save the dead pixel correction threshold
+        """
+        self.c_yaml["dead_pixel_correction"]["dp_threshold"] = int(dp_threshold)
+
+    def set_awb_data(self, underexposed_percentage, overexposed_percentage):
+        """
+        Save the AWB thresholds
+        """
+        awb_data = self.c_yaml["auto_white_balance"]
+        awb_data["underexposed_percentage"] = underexposed_percentage
+        awb_data["overexposed_percentage"] = overexposed_percentage
+
+    def set_bnr_data(
+        self, filter_window, r_std_s, r_std_r, g_std_s, g_std_r, b_std_s, b_std_r
+    ):
+        """
+        Save the bayer noise reduction parameters
+        """
+        bnr = self.c_yaml["bayer_noise_reduction"]
+        bnr["filter_window"] = int(filter_window)
+        bnr["r_std_dev_s"] = float(r_std_s)
+        bnr["r_std_dev_r"] = float(r_std_r)
+        bnr["g_std_dev_s"] = float(g_std_s)
+        bnr["g_std_dev_r"] = float(g_std_r)
+        bnr["b_std_dev_s"] = float(b_std_s)
+        bnr["b_std_dev_r"] = float(b_std_r)
+
+    def set_2dnr_data(self, wts):
+        """
+        Save the 2DNR weighting parameter
+        """
+        self.c_yaml["2d_noise_reduction"]["wts"] = int(wts)
+
+    def set_ae_data(self, center_illuminance, histogram_skewness):
+        """
+        Save the proposed AE targets
+        """
+        self.c_yaml["auto_exposure"]["center_illuminance"] = int(center_illuminance)
+        self.c_yaml["auto_exposure"]["histogram_skewness"] = float(histogram_skewness)
+
+    def set_oecf_data(self, r_lut):
+        """
+        Save the calibrated OECF LUT
+        """
+        self.c_yaml["oecf"]["r_lut"] = [int(val) for val in r_lut]
+
     def set_blc_data(self, r_offset=200, gr_offset=200, gb_offset=200, b_offset=200):
         """
         Save the calculated black levels
@@ -237,6 +326,38 @@ class ReadWriteYMLFile:
 
         self.c_yaml["black_level_correction"] = parm_blc
 
+    def set_blc_map_data(self, block_size, poly_order, grids, surfaces):
+        """
+        Save the calculated black level map. The grids and surfaces
+        (polynomial coefficients) are given in the order R, Gr, Gb and B.
+        """
+        parm_map = {
+            "block_size": int(block_size),
+            "grid_width": len(grids[0][0]),
+            "grid_height": len(grids[0]),
+            "poly_order": int(poly_order),
+        }
+        for channel, grid in zip(["r", "gr", "gb", "b"], grids):
+            parm_map[f"{channel}_grid"] = [[round(float(val), 2) for val in row] for row in grid]
+        for channel, coeffs in zip(["r", "gr", "gb", "b"], surfaces):
+            parm_map[f"{channel}_surface"] = [float(val) for val in coeffs]
+
+        self.set_section("black_level_map", parm_map, after="black_level_correction")
+
+    def set_lsc_data(self, block_size, gains):
+        """
+        Save the lens shading gain grids given in the order R, Gr, Gb and B.
+        The section is created (disabled) if the config does not have it.
+        """
+        parm_lsc = self.c_yaml.get("lens_shading_correction", {"is_enable": False})
+        parm_lsc["block_size"] = int(block_size)
+        parm_lsc["grid_width"] = len(gains[0][0])
+        parm_lsc["grid_height"] = len(gains[0])
+        for channel, grid in zip(["r", "gr", "gb", "b"], gains):
+            parm_lsc[f"{channel}_gain"] = [[round(float(val), 4) for val in row] for row in grid]
+
+        self.set_section("lens_shading_correction", parm_lsc, after="digital_gain")
+
     def set_wb_data(self, r_gain, b_gain):
         """
         Save the calculated white balance gains
@@ -275,12 +396,28 @@ class ReadWriteYMLFile:
 
         self.c_yaml["color_correction_matrix"] = parm_ccm
 
+    def set_section(self, section, data, after):
+        """
+        Set the data of a section, a missing section is inserted
+        after the given one to keep the related modules together.
+        """
+        if section in self.c_yaml or after not in self.c_yaml:
+            self.c_yaml[section] = data
+            return
+
+        c_yaml = {}
+        for key, value in self.c_yaml.items():
+            c_yaml[key] = value
+            if key == after:
+                c_yaml[section] = data
+        self.c_yaml = c_yaml
+
     def save_file(self, out_file):
         """
         Save file
         """
         # file_name = "test_config.yml"
-        with open(out_file, "w", encoding="utf-8") as fil:
+        with span("yaml.save", "yaml"), open(out_file, "w", encoding="utf-8") as fil:
             yaml.dump(
                 self.c_yaml,
                 fil,
@@ -0,0 +1,257 @@
+"""
+File: result_cache.py
+Description: On-disk cache of the intermediate results of the modules
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+import json
+import pickle
+import hashlib
+import numpy as np
+
+# Environment variables of the cache settings, the cache is disabled if
+# TUNING_TOOL_CACHE is set to 0
+CACHE_ENV_VAR = "TUNING_TOOL_CACHE"
+CACHE_DIR_ENV_VAR = "TUNING_TOOL_CACHE_DIR"
+CACHE_SIZE_ENV_VAR = "TUNING_TOOL_CACHE_SIZE_MB"
+DEFAULT_CACHE_DIR = "cache"
+DEFAULT_CACHE_SIZE_MB = 1024
+
+
+def get_digest(value):
+    """
+    Returns the hex digest of a value made of numbers, strings, arrays and
+    (nested) lists, tuples or dicts of them.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+
+    def update(item):
+        if isinstance(item, np.ndarray):
+            hasher.update(f"{item.dtype}{item.shape}".encode())
+            hasher.update(np.ascontiguousarray(item).tobytes())
+        elif isinstance(item, (list, tuple)):
+            hasher.update(b"[")
+            for sub_item in item:
+                update(sub_item)
+            hasher.update(b"]")
+        elif isinstance(item, dict):
+            hasher.update(b"{")
+            for key in sorted(item):
+                update(key)
+                update(item[key])
+            hasher.update(b"}")
+        else:
+            hasher.update(repr(item).encode())
+
+    update(value)
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of the results, keyed by the content of the input files,
+    the parameters and the patch geometry. The least recently used entries
+    are evicted when the cache is larger than its max size.
+    """
+
+    # Index of the content hashes of the files, so a file is hashed only once
+    # while its size and modification time are unchanged
+    hash_index_file = "file_hashes.json"
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_CACHE_SIZE_MB):
+        """
+        cache_dir   : directory of the cache entries
+        max_size_mb : max total size of the entries
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 2**20
+        self.enabled = True
+        self.hash_index = None
+
+        # Total hits and misses of the session
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Returns the cache with the settings of the environment variables.
+        """
+        cache = cls(
+            os.environ.get(CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR),
+            float(os.environ.get(CACHE_SIZE_ENV_VAR, DEFAULT_CACHE_SIZE_MB)),
+        )
+        cache.enabled = os.environ.get(CACHE_ENV_VAR, "1") != "0"
+        return cache
+
+    def load_hash_index(self):
+        """
+        Returns the index of the file hashes, loaded once from the cache.
+        """
+        if self.hash_index is None:
+            try:
+                with open(
+                    os.path.join(self.cache_dir, self.hash_index_file), "r", encoding="utf-8"
+                ) as fil:
+                    self.hash_index = json.load(fil)
+            except (OSError, ValueError):
+                self.hash_index = {}
+        return self.hash_index
+
+    def get_file_hash(self, file_name, chunk_size=2**24):
+        """
+        Returns the content hash of a file. The hash is reused while the
+        size and the modification time of the file are unchanged.
+        """
+        file_name = os.path.abspath(file_name)
+        stat = os.stat(file_name)
+        index = self.load_hash_index()
+
+        entry = index.get(file_name)
+        if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(file_name, "rb") as fil:
+            for chunk in iter(lambda: fil.read(chunk_size), b""):
+                hasher.update(chunk)
+        file_hash = hasher.hexdigest()
+
+        index[file_name] = [stat.st_size, stat.st_mtime_ns, file_hash]
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(
+                os.path.join(self.cache_dir, self.hash_index_file), "w", encoding="utf-8"
+            ) as fil:
+                json.dump(index, fil)
+        except OSError:
+            pass
+        return file_hash
+
+    def get_key(self, kind, file_name=None, params=None, points=None):
+        """
+        Returns the key of a result of the given kind (e.g. "rgb_preview"),
+        from the content of the input file, the parameters and the patch
+        points. None is returned if the cache is disabled or the input file
+        can not be read.
+        """
+        if not self.enabled:
+            return None
+
+        file_hash = None
+        if file_name is not None:
+            try:
+                file_hash = self.get_file_hash(file_name)
+            except OSError:
+                return None
+
+        return f"{kind}_{get_digest([file_hash, params, points])}"
+
+    def get_entry_path(self, key):
+        """
+        Returns the path of the entry of a key.
+        """
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def load(self, key):
+        """
+        Returns the cached result of a key, None if it is not cached. The
+        access time of the entry is updated for the LRU eviction.
+        """
+        if key is None:
+            return None
+
+        path = self.get_entry_path(key)
+        try:
+            with open(path, "rb") as fil:
+                result = pickle.load(fil)
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return result
+
+    def save(self, key, result):
+        """
+        Save the result of a key and evict the least recently used entries
+        if the cache is too large. The entry is written to a temporary file
+        first, so a partially written entry is never loaded.
+        """
+        if key is None:
+            return
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.get_entry_path(key)
+            with open(path + ".tmp", "wb") as fil:
+                pickle.dump(result, fil, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            return
+
+        self.evict()
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached result of a key, computing and saving it if it is
+        not cached.
+        """
+        result = self.load(key)
+        if result is None:
+            result = compute()
+            self.save(key, result)
+        return result
+
+    def get_entries(self):
+        """
+        Returns the (path, size, access time) of all the entries.
+        """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+                entries.append(
+                    (os.path.join(self.cache_dir, file_name), stat.st_size, stat.st_mtime)
+                )
+        return entries
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the total size is
+        below the max size. Returns the total removed entries.
+        """
+        entries = sorted(self.get_entries(), key=lambda entry: entry[2])
+        total_size = sum(entry[1] for entry in entries)
+
+        removed = 0
+        for path, size, _ in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """
+        Remove all the entries and the index of the file hashes.
+        """
+        for path, _, _ in self.get_entries():
+            os.remove(path)
+        index_file = os.path.join(self.cache_dir, self.hash_index_file)
+        if os.path.exists(index_file):
+            os.remove(index_file)
+        self.hash_index = None
+
+
+# Cache of the tool, shared by all the modules
+result_cache = ResultCache.from_env()
@@ -0,0 +1,77 @@
+"""
+File: session_workspace.py
+Description: Keeps the loaded image and the selected patches across the modules
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+
+
+class SessionWorkspace:
+    """
+    Session workspace of the tool. It keeps the last loaded image (with its
+    rgb image and pre-processed versions) and the ColorChecker patches
+    selected on it, so that the next modules can reuse them instead of
+    loading the image and selecting the patches again.
+    """
+
+    def __init__(self):
+        self.raw_image_para = None
+        self.selection_frame = None
+
+    def set_image(self, raw_image_para):
+        """
+        Keep a newly loaded image, the patches selected on the previous
+        image are invalidated.
+        """
+        self.raw_image_para = raw_image_para
+        self.selection_frame = None
+
+    def get_image(self, raw_only=False):
+        """
+        Returns the parameters of the loaded image, None if no image is
+        loaded or if a raw image is required and the loaded one is not raw.
+        """
+        if self.raw_image_para is None:
+            return None
+        if raw_only and self.raw_image_para.raw_image is None:
+            return None
+        return self.raw_image_para
+
+    def get_image_name(self):
+        """
+        Returns the file name of the loaded image.
+        """
+        return os.path.basename(self.raw_image_para.file_name)
+
+    def set_selection(self, selection_frame):
+        """
+        Keep the patches selected on the loaded image.
+        """
+        self.selection_frame = selection_frame
+
+    def get_selection(self):
+        """
+        Returns the selection frame of the patches of the loaded image,
+        None if no patches are selected.
+        """
+        return self.selection_frame
+
+    def invalidate_selection(self):
+        """
+        Discard the selected patches, the loaded image is kept.
+        """
+        self.selection_frame = None
+
+    def clear(self):
+        """
+        Discard the loaded image and its selected patches.
+        """
+        self.raw_image_para = None
+        self.selection_frame = None
+
+    def is_empty(self):
+        """
+        Returns true if no image is loaded.
+        """
+        return self.raw_image_para is None
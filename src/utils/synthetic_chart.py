@@ -0,0 +1,266 @@
+"""
+File: synthetic_chart.py
+Description: Generates synthetic bayer raw frames of a ColorChecker with ground truth
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+import os
+import json
+import numpy as np
+from src.utils.chart_layout import get_chart_layout
+
+
+class SyntheticColorChecker:
+    """
+    Synthetic ColorChecker Raw Generator
+    """
+
+    # Reflectance of the chart frame (between the patches) and of the scene
+    chart_frame_level = 0.03
+    scene_level = 0.18
+
+    # Fraction of the frame covered by the chart and of a chart cell
+    # covered by its patch
+    chart_fraction = 0.8
+    patch_fraction = 0.6
+
+    def __init__(
+        self,
+        width=1920,
+        height=1080,
+        bits=12,
+        bayer="RGGB",
+        black_level=None,
+        wb_gains=(1.0, 1.0),
+        color_mixing=None,
+        exposure=0.8,
+        full_well=10000,
+        read_noise=3.0,
+        seed=0,
+        chart_layout=None,
+    ):
+        """
+        width, height : frame size (even)
+        bits          : bit depth of the raw frame
+        bayer         : bayer pattern (RGGB, GRBG, GBRG or BGGR)
+        black_level   : black level in DN, 16 at 8 bits (scaled) by default
+        wb_gains      : (r_gain, b_gain) that white balance the frame, the
+                        R and B channels are divided by them (color cast)
+        color_mixing  : 3x3 sensor color mixing matrix (rows sum to 1), its
+                        inverse is the ground truth CCM, identity by default
+        exposure      : G level of the white patch, ratio of the range above
+                        the black level
+        full_well     : electrons at the max level, sets the shot noise
+        read_noise    : read noise std in electrons
+        seed          : seed of the noise
+        chart_layout  : layout of the chart, ColorChecker 24 by default
+        """
+        self.width = width // 2 * 2
+        self.height = height // 2 * 2
+        self.bits = bits
+        self.bayer = bayer.upper()
+        self.max_value = 2**bits - 1
+        self.black_level = 16 * 2 ** (bits - 8) if black_level is None else black_level
+        self.wb_gains = tuple(wb_gains)
+        self.color_mixing = np.eye(3) if color_mixing is None else np.array(color_mixing)
+        self.exposure = exposure
+        self.full_well = full_well
+        self.read_noise = read_noise
+        self.seed = seed
+
+        # Linear reference values of the patches (D65)
+        self.chart_layout = get_chart_layout() if chart_layout is None else chart_layout
+        self.ref_lin = self.chart_layout.get_reference_lin()
+        self.total_patches = self.chart_layout.total_patches
+
+    @staticmethod
+    def get_crosstalk_mixing(crosstalk):
+        """
+        Returns a color mixing matrix where each channel gets the crosstalk
+        ratio of its signal from the other two channels (rows sum to 1).
+        """
+        return (1 - 1.5 * crosstalk) * np.eye(3) + crosstalk / 2
+
+    def get_patch_points(self):
+        """
+        Returns the points of the patches of the chart, in the format of the
+        selected sub-rect points. The points are even, so the patches keep the bayer
+        phase of the frame.
+        """
+        chart_w = int(self.width * self.chart_fraction)
+        chart_h = int(self.height * self.chart_fraction)
+        columns, rows = self.chart_layout.columns, self.chart_layout.rows
+        cell_w, cell_h = chart_w / columns, chart_h / rows
+        margin_x = cell_w * (1 - self.patch_fraction) / 2
+        margin_y = cell_h * (1 - self.patch_fraction) / 2
+        origin_x = (self.width - chart_w) // 2
+        origin_y = (self.height - chart_h) // 2
+
+        points = []
+        for row in range(rows):
+            for col in range(columns):
+                x_0 = int(origin_x + col * cell_w + margin_x) // 2 * 2
+                y_0 = int(origin_y + row * cell_h + margin_y) // 2 * 2
+                x_1 = int(origin_x + (col + 1) * cell_w - margin_x) // 2 * 2
+                y_1 = int(origin_y + (row + 1) * cell_h - margin_y) // 2 * 2
+                points.append(((x_0, y_0), (x_1, y_1)))
+        return points
+
+    def get_chart_rect(self):
+        """
+        Returns the (x_0, y_0, x_1, y_1) corners of the chart frame.
+        """
+        chart_w = int(self.width * self.chart_fraction)
+        chart_h = int(self.height * self.chart_fraction)
+        x_0, y_0 = (self.width - chart_w) // 2, (self.height - chart_h) // 2
+        return x_0, y_0, x_0 + chart_w, y_0 + chart_h
+
+    def get_levels(self):
+        """
+        Returns the noise free sensor levels (total patches + 2 x 3, DN above
+        the black level) of the patches, the chart frame and the scene: the linear
+        references are mixed by the sensor, cast by the illuminant (R and B
+        divided by the wb gains) and exposed.
+        """
+        reflectances = np.vstack(
+            [self.ref_lin, [self.chart_frame_level] * 3, [self.scene_level] * 3]
+        )
+        levels = reflectances @ self.color_mixing.T
+        levels /= np.array([self.wb_gains[0], 1, self.wb_gains[1]])
+
+        # White (lightest neutral) patch G level is the exposure
+        white_patch = self.chart_layout.get_neutral_patches()[0]
+        scale = (
+            self.exposure * (self.max_value - self.black_level) / self.ref_lin[white_patch, 1]
+        )
+        return levels * scale
+
+    def get_patch_means(self):
+        """
+        Returns the expected means (total patches x 3, DN with the black
+        level) of the R, G and B channels of the patches, clipped at the max
+        level.
+        """
+        levels = self.get_levels()[: self.total_patches] + self.black_level
+        return np.clip(levels, 0, self.max_value)
+
+    def generate(self, band_rows=256):
+        """
+        Returns the synthetic bayer raw frame. The frame is generated in bands
+        of rows so that the memory used besides the frame does not depend on
+        the frame size.
+        """
+        lut = np.float32(self.get_levels())
+
+        # Label (patch index, total patches for the chart frame and total
+        # patches + 1 for the scene) of each row and column, the labels of a
+        # pixel are combined below
+        points = self.get_patch_points()
+        chart_x0, chart_y0, chart_x1, chart_y1 = self.get_chart_rect()
+        columns = self.chart_layout.columns
+
+        col_patch = np.full(self.width, -1)
+        row_patch = np.full(self.height, -1)
+        for idx in range(columns):
+            (x_0, _), (x_1, _) = points[idx]
+            col_patch[x_0:x_1] = idx
+        for idx in range(self.chart_layout.rows):
+            (_, y_0), (_, y_1) = points[idx * columns]
+            row_patch[y_0:y_1] = idx
+
+        col_in_chart = (np.arange(self.width) >= chart_x0) & (np.arange(self.width) < chart_x1)
+        row_in_chart = (np.arange(self.height) >= chart_y0) & (np.arange(self.height) < chart_y1)
+
+        # Color channel (0: R, 1: G, 2: B) of each position of the 2x2 bayer block
+        cfa = np.array(["RGB".index(color) for color in self.bayer]).reshape(2, 2)
+        col_phase = np.arange(self.width) % 2
+
+        # Gain (DN / electron) and read noise in DN
+        gain = (self.max_value - self.black_level) / self.full_well
+        read_noise = self.read_noise * gain
+
+        rng = np.random.default_rng(self.seed)
+        frame = np.empty(
+            (self.height, self.width), dtype=np.uint8 if self.bits == 8 else np.uint16
+        )
+
+        for row in range(0, self.height, band_rows):
+            rows = np.arange(row, min(row + band_rows, self.height))
+            in_patch = (row_patch[rows, np.newaxis] >= 0) & (col_patch[np.newaxis, :] >= 0)
+            in_chart = row_in_chart[rows, np.newaxis] & col_in_chart[np.newaxis, :]
+            labels = np.where(
+                in_patch,
+                row_patch[rows, np.newaxis] * columns + col_patch[np.newaxis, :],
+                np.where(in_chart, self.total_patches, self.total_patches + 1),
+            )
+            signal = lut[labels, cfa[rows[:, np.newaxis] % 2, col_phase[np.newaxis, :]]]
+
+            noise = rng.standard_normal(signal.shape, dtype=np.float32)
+            noise *= np.sqrt(signal * gain + read_noise**2)
+            signal += noise + self.black_level
+            frame[rows[0] : rows[-1] + 1] = np.clip(np.rint(signal), 0, self.max_value)
+
+        return frame
+
+    def get_file_name(self, name="synth"):
+        """
+        Returns the raw file name in the format of parse_file_name.
+        """
+        return f"{name}_{self.width}x{self.height}_{self.bits}bits_{self.bayer}.raw"
+
+    def get_ground_truth(self):
+        """
+        Returns the generation parameters and the expected calibration
+        results of the frame. The reference gray patches are not exactly
+        neutral, so the gains measured on the white balance patches of the
+        chart (e.g. patches 20-23 of the ColorChecker 24) are also given.
+        """
+        gain = (self.max_value - self.black_level) / self.full_well
+        gray_levels = self.get_levels()[self.chart_layout.get_wb_patches()]
+        return {
+            "chart_layout": self.chart_layout.name,
+            "width": self.width,
+            "height": self.height,
+            "bits": self.bits,
+            "bayer": self.bayer,
+            "black_levels": [self.black_level] * 4,
+            "sat_level": self.max_value,
+            "r_gain": self.wb_gains[0],
+            "b_gain": self.wb_gains[1],
+            "gray_r_gain": float(np.mean(gray_levels[:, 1] / gray_levels[:, 0])),
+            "gray_b_gain": float(np.mean(gray_levels[:, 1] / gray_levels[:, 2])),
+            "color_mixing": self.color_mixing.tolist(),
+            "ccm": np.linalg.inv(self.color_mixing).tolist(),
+            "exposure": self.exposure,
+            "noise_gain": gain,
+            "read_noise_dn": self.read_noise * gain,
+            "seed": self.seed,
+            "patch_points": [list(map(list, points)) for points in self.get_patch_points()],
+            "patch_means": self.get_patch_means().tolist(),
+        }
+
+    def save(self, out_dir, name="synth"):
+        """
+        Write the raw file and its ground truth json sidecar (same name with
+        the .json extension) in out_dir. Returns the raw file path.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        raw_file = os.path.join(out_dir, self.get_file_name(name))
+
+        self.generate().tofile(raw_file)
+        with open(os.path.splitext(raw_file)[0] + ".json", "w", encoding="utf-8") as fil:
+            json.dump(self.get_ground_truth(), fil, indent=2)
+
+        return raw_file
+
+    @staticmethod
+    def read_ground_truth(raw_file):
+        """
+        Returns the ground truth of the sidecar of a raw file, None if the
+        raw file has no sidecar.
+        """
+        json_file = os.path.splitext(raw_file)[0] + ".json"
+        if not os.path.exists(json_file):
+            return None
+        with open(json_file, "r", encoding="utf-8") as fil:
+            return json.load(fil)
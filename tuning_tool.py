@@ -7,6 +7,7 @@ Author: 10xEngineers
 
 import os
 import shutil
+import argparse
 from src.menu.black_level_calibration_menu import BlackLevelCalibrationMenu as BlcMenu
 from src.menu.color_correction_matrix_menu import ColorCorrectionMatrixMenu as CcmMenu
 from src.menu.gamma_menu import GammaMenu
@@ -19,8 +20,17 @@ from src.menu.menu_common_func import (
 )
 from src.menu.white_balance_menu import WhiteBalanceMenu as WbMenu
 from src.menu.bayer_noise_menu import BNEMenu as bne
+from src.menu.dead_pixel_menu import DeadPixelMenu as DpcMenu
+from src.menu.lens_shading_menu import LensShadingMenu as LscMenu
+from src.menu.oecf_menu import OecfMenu
+from src.menu.auto_exposure_menu import AutoExposureMenu as AeMenu
+from src.menu.auto_white_balance_menu import AutoWhiteBalanceMenu as AwbMenu
+from src.menu.mtf_menu import MtfMenu
 from src.utils.algo_common_utils import select_file
 from src.utils.gui_common_utils import generate_separator
+from src.utils.profiling import profiler, DEFAULT_PROFILE_DIR, DEFAULT_TOP_SITES
+from src.utils.result_cache import result_cache
+from src.utils.session_workspace import SessionWorkspace
 
 
 # -------------------------------Tuning Tool Menu----------------------------#
@@ -47,7 +57,14 @@ class TuningTool:
         "Generate Gamma Curves",
         "Estimate Bayer Noise Levels",
         "Estimate Luminance Noise Levels",
+        "Detect Defective Pixels",
+        "Calibrate Lens Shading",
+        "Calibrate OECF",
+        "Analyze Auto Exposure",
+        "Evaluate Auto White Balance",
+        "Measure Sharpness (MTF)",
         "Generate Configuration Files",
+        "Clear the Loaded Image and Patches",
         "Quit\n",
     ]
 
@@ -59,6 +76,9 @@ class TuningTool:
         """
 
         self.in_config_file = None
+
+        # Image and patches shared by the WB, CCM and noise estimation tools
+        self.workspace = SessionWorkspace()
         display_welcome_note()
 
         # Load pipeline configuration YML
@@ -84,12 +104,12 @@ class TuningTool:
 
             elif choice == "2":
                 # Start White Balance tool
-                wb_menu = WbMenu(self.in_config_file)
+                wb_menu = WbMenu(self.in_config_file, self.workspace)
                 wb_menu.start_menu()
 
             elif choice == "3":
                 # Start Color Correction Matrix calculation tool
-                ccm_menu = CcmMenu(self.in_config_file)
+                ccm_menu = CcmMenu(self.in_config_file, self.workspace)
                 ccm_menu.start_menu()
 
             elif choice == "4":
@@ -99,23 +119,75 @@ class TuningTool:
 
             elif choice == "5":
                 # Start Bayer Noise Levels estimation tool
-                bne_module = bne()
+                bne_module = bne(self.in_config_file, self.workspace)
                 bne_module.start_menu()
 
             elif choice == "6":
                 # Start Luma Noise Levels estimation tool
-                ne_menu = neMenu()
+                ne_menu = neMenu(self.in_config_file, self.workspace)
                 ne_menu.start_menu()
 
             elif choice == "7":
+                # Start defective pixels detection tool
+                dpc_menu = DpcMenu(self.in_config_file)
+                dpc_menu.start_menu()
+
+            elif choice == "8":
+                # Start lens shading calibration tool
+                lsc_menu = LscMenu(self.in_config_file)
+                lsc_menu.start_menu()
+
+            elif choice == "9":
+                # Start OECF calibration tool
+                oecf_menu = OecfMenu(self.in_config_file)
+                oecf_menu.start_menu()
+
+            elif choice == "10":
+                # Start auto exposure analysis tool
+                ae_menu = AeMenu(self.in_config_file)
+                ae_menu.start_menu()
+
+            elif choice == "11":
+                # Start auto white balance evaluation tool
+                awb_menu = AwbMenu(self.in_config_file)
+                awb_menu.start_menu()
+
+            elif choice == "12":
+                # Start sharpness measurement tool
+                mtf_menu = MtfMenu()
+                mtf_menu.start_menu()
+
+            elif choice == "13":
                 # Start file generation menu
                 fmenu = ConfigFilesMenu(self.in_config_file)
                 fmenu.start_menu()
 
-            elif choice == "8":
+            elif choice == "14":
+                # Discard the image and patches of the session
+                self.clear_workspace()
+
+            elif choice == "15":
                 # Exit the application
                 end_tuning_tool()
 
+            # Profiling summaries and trace of the menu flow, if profiling is enabled
+            profiler.end_run(self.tuning_tool_menu_options[int(choice) - 1])
+
+    def clear_workspace(self):
+        """
+        Discard the image and patches kept in the session workspace, so that
+        the next tool loads a new image.
+        """
+        if self.workspace.is_empty():
+            print("No image is loaded.")
+        else:
+            print(
+                "\033[32m" + self.workspace.get_image_name() + "\033[0m"
+                + " and its patches are cleared."
+            )
+            self.workspace.clear()
+        generate_separator("", "*")
+
     def load_config(self):
         """
         At the start of tuning tool. There should be a config.yml file present
@@ -211,4 +283,35 @@ class TuningTool:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Infinite-ISP Tuning Tool")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=DEFAULT_PROFILE_DIR,
+        metavar="DIR",
+        help="time the hot paths, print a summary and save a Chrome trace in DIR "
+        "after each menu flow",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        nargs="?",
+        type=int,
+        const=DEFAULT_TOP_SITES,
+        metavar="N",
+        help="report the peak memory of the hot paths and the top N allocation sites "
+        "after each menu flow",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="do not load or save the results in the on-disk cache",
+    )
+    args = parser.parse_args()
+    if args.profile:
+        profiler.enable(args.profile)
+    if args.profile_memory:
+        profiler.enable_memory(args.profile_memory)
+    if args.no_cache:
+        result_cache.enabled = False
+
     TuningTool()
@@ -0,0 +1,558 @@
+"""
+File: tuning_tool_cli.py
+Description: Command line entry point of the tool for the batch (non-interactive) tasks
+Author: 10xEngineers
+------------------------------------------------------------
+"""
+
+import os
+import sys
+import argparse
+from src.modules.BLC.blc_batch_algo import BlackLevelsBatchAlgo
+from src.modules.AE.ae_module import AutoExposureModule
+from src.modules.AWB.awb_eval_algo import AwbEvalAlgo
+from src.modules.AWB.awb_eval_module import AwbEvalModule
+from src.modules.MTF.mtf_module import MtfModule
+from src.modules.WB.wb_module import WhiteBalanceModule
+from src.modules.CCM.ccm_module import ColorCorrectionMatrixModule
+from src.utils.algo_common_utils import load_image_para, get_rgb_preview
+from src.utils.patch_geometry import StoredPatchGeometry
+from src.utils.chart_layout import DEFAULT_LAYOUT_NAME, get_chart_layout, get_chart_layouts
+from src.utils.read_yaml_file import ReadWriteYMLFile
+from src.utils.benchmark_suite import (
+    BenchmarkSuite,
+    BENCH_SIZES,
+    BENCH_BAYERS,
+    BENCH_BITS,
+    FRAME_BENCHMARKS,
+    SUITE_BENCHMARKS,
+)
+from src.utils.gui_common_utils import generate_separator
+from src.utils.synthetic_chart import SyntheticColorChecker
+from src.utils.profiling import profiler, DEFAULT_PROFILE_DIR, DEFAULT_TOP_SITES
+from src.utils.result_cache import result_cache
+
+
+DEFAULT_CONFIG_FILE = os.path.join("config", "default_configs.yml")
+
+
+def get_raw_files(inputs, batch_algo):
+    """
+    Expand the given inputs (directories and / or raw files) into a list of raw files.
+    """
+    raw_files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            raw_files.extend(batch_algo.get_raw_files(path))
+        elif os.path.isfile(path):
+            raw_files.append(path)
+        else:
+            print(f"\033[31mWarning!\033[0m {path} does not exist.")
+    return raw_files
+
+
+def blc_apply(args):
+    """
+    Apply black levels on a directory or a list of raw files.
+    """
+    yaml_file = ReadWriteYMLFile(args.config)
+
+    blc_levels = args.levels if args.levels else yaml_file.get_blc_data()
+    sat_levels = yaml_file.get_blc_sat_data() if args.linear else None
+
+    batch_algo = BlackLevelsBatchAlgo(blc_levels, sat_levels, workers=args.workers)
+    if args.levels_csv:
+        batch_algo.read_per_file_levels(args.levels_csv)
+
+    raw_files = get_raw_files(args.input, batch_algo)
+    if not raw_files:
+        print("\033[31mError!\033[0m No raw file is found.")
+        return 1
+
+    generate_separator("Batch Black Level Application", "*")
+    print(f"Applying black levels on {len(raw_files)} raw files...")
+    batch_algo.apply(raw_files, args.output)
+    batch_algo.display_summary()
+    generate_separator("", "*")
+
+    return int(any(result[3] is not None for result in batch_algo.results))
+
+
+def ae_analyze(args):
+    """
+    Analyze the auto exposure statistics of a directory or a list of images.
+    """
+    ae_module = AutoExposureModule(args.config)
+
+    for path in args.input:
+        if os.path.isdir(path):
+            ae_module.file_names.extend(ae_module.get_image_files(path))
+        elif os.path.isfile(path):
+            ae_module.file_names.append(path)
+        else:
+            print(f"\033[31mWarning!\033[0m {path} does not exist.")
+
+    if not ae_module.file_names:
+        print("\033[31mError!\033[0m No image is found.")
+        return 1
+
+    generate_separator("Auto Exposure Analysis", "*")
+    if not ae_module.execute():
+        return 1
+
+    if args.csv:
+        ae_module.ae_algo.export_report(args.csv)
+        print(f"Report saved to:\n {args.csv}")
+    if args.save:
+        ae_module.save_config_file_with_ae_targets()
+    generate_separator("", "*")
+
+    return 0
+
+
+def awb_eval(args):
+    """
+    Evaluate the AWB estimators on a directory or a list of images.
+    """
+    awb_module = AwbEvalModule(args.config)
+    awb_module.ground_truth = AwbEvalAlgo.read_ground_truth(args.ground_truth)
+
+    for path in args.input:
+        if os.path.isdir(path):
+            awb_module.file_names.extend(awb_module.get_image_files(path))
+        elif os.path.isfile(path):
+            awb_module.file_names.append(path)
+        else:
+            print(f"\033[31mWarning!\033[0m {path} does not exist.")
+
+    if not awb_module.file_names:
+        print("\033[31mError!\033[0m No image is found.")
+        return 1
+
+    if args.sweep:
+        awb_module.sweep_percentages = args.sweep
+
+    generate_separator("Auto White Balance Evaluation", "*")
+    if not awb_module.execute(args.sweep is not None, args.methods, args.workers):
+        return 1
+
+    if args.csv:
+        awb_module.awb_algo.export_report(args.csv)
+        print(f"Report saved to:\n {args.csv}")
+    if args.save:
+        awb_module.save_config_file_with_awb_thresholds()
+    generate_separator("", "*")
+
+    return 0
+
+
+def mtf_measure(args):
+    """
+    Measure the slanted edge MTF of the given ROIs on a directory or a list of images.
+    """
+    mtf_module = MtfModule()
+    mtf_module.rois = [tuple(roi) for roi in args.roi]
+
+    for path in args.input:
+        if os.path.isdir(path):
+            mtf_module.file_names.extend(mtf_module.get_image_files(path))
+        elif os.path.isfile(path):
+            mtf_module.file_names.append(path)
+        else:
+            print(f"\033[31mWarning!\033[0m {path} does not exist.")
+
+    if not mtf_module.file_names:
+        print("\033[31mError!\033[0m No image is found.")
+        return 1
+
+    generate_separator("Slanted Edge MTF", "*")
+    if not mtf_module.execute():
+        return 1
+
+    if args.csv:
+        mtf_module.mtf_algo.export_report(args.csv)
+        print(f"Report saved to:\n {args.csv}")
+    generate_separator("", "*")
+
+    return 0
+
+
+def chart_calibrate(args):
+    """
+    Calculate the white balance gains (and the CCM) of a ColorChecker image
+    with a stored patch geometry, without the selection frame.
+    """
+    raw_image_para = load_image_para(args.input)
+    if raw_image_para is None:
+        print(f"\033[31mError!\033[0m {args.input} is not a valid image.")
+        return 1
+    if raw_image_para.raw_image is not None:
+        raw_image_para.rgb_image = get_rgb_preview(raw_image_para)
+
+    stored_patches = StoredPatchGeometry.load(
+        args.patches, raw_image_para.width, raw_image_para.height
+    )
+    if stored_patches is None:
+        print(f"\033[31mError!\033[0m {args.patches} is not a valid patch geometry file.")
+        return 1
+    if not stored_patches.is_aspect_ratio_matched():
+        print(
+            "\033[31mWarning!\033[0m The patch geometry is stored for images "
+            "of a different aspect ratio."
+        )
+
+    generate_separator("ColorChecker Calibration", "*")
+    wb_module = WhiteBalanceModule(args.config)
+    wb_module.is_image_and_para_loaded(raw_image_para)
+    wb_module.color_checker_selection_frame(stored_patches)
+    wb_module.set_raw_domain(args.raw_stats)
+    wb_module.implement_wb_algo()
+    if args.save:
+        wb_module.save_wb_config_file()
+
+    if args.ccm:
+        ccm_module = ColorCorrectionMatrixModule(args.config)
+        ccm_module.is_image_and_para_loaded(raw_image_para)
+        ccm_module.color_checker_selection_frame(stored_patches)
+        ccm_module.set_raw_stats_flag(args.raw_stats)
+        ccm_module.set_wb_flag(True)
+        ccm_module.start_algo(display=False)
+        if args.save:
+            ccm_module.save_ccm_config_file()
+    generate_separator("", "*")
+
+    return 0
+
+
+def bench(args):
+    """
+    Run the benchmark suite and compare the results with a saved baseline.
+    """
+    if args.quick:
+        args.sizes, args.bayers, args.bits = ["2MP"], ["RGGB"], [12]
+
+    suite = BenchmarkSuite(
+        args.sizes, args.bayers, args.bits, args.benchmarks, args.repeat, args.config
+    )
+
+    generate_separator("Benchmark Suite", "*")
+    suite.run()
+    suite.display_results()
+
+    if args.output:
+        suite.save_results(args.output)
+        print(f"Results saved to:\n {args.output}")
+
+    total_regressions = 0
+    if args.baseline:
+        comparisons = suite.compare(BenchmarkSuite.load_results(args.baseline), args.threshold)
+        suite.display_comparison(comparisons, args.threshold)
+        total_regressions = sum(1 for comparison in comparisons if comparison[5])
+    generate_separator("", "*")
+
+    return int(total_regressions > 0)
+
+
+def synth(args):
+    """
+    Generate synthetic ColorChecker raw files and their ground truth sidecars.
+    """
+    generate_separator("Synthetic ColorChecker", "*")
+    for bits in args.bits:
+        for bayer in args.bayer:
+            generator = SyntheticColorChecker(
+                args.size[0],
+                args.size[1],
+                bits,
+                bayer,
+                black_level=args.black_level,
+                wb_gains=args.wb_gains,
+                color_mixing=SyntheticColorChecker.get_crosstalk_mixing(args.crosstalk),
+                exposure=args.exposure,
+                full_well=args.full_well,
+                read_noise=args.read_noise,
+                seed=args.seed,
+                chart_layout=get_chart_layout(args.chart),
+            )
+            print(f"Raw file saved to:\n {generator.save(args.output, args.name)}")
+    generate_separator("", "*")
+
+    return 0
+
+
+def get_parser():
+    """
+    Return the argument parser with a sub-command for each batch task.
+    """
+    parser = argparse.ArgumentParser(
+        description="Infinite-ISP Tuning Tool batch commands"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=DEFAULT_PROFILE_DIR,
+        metavar="DIR",
+        help="time the hot paths, print a summary and save a Chrome trace in DIR",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        nargs="?",
+        type=int,
+        const=DEFAULT_TOP_SITES,
+        metavar="N",
+        help="report the peak memory of the hot paths and the top N allocation sites",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="do not load or save the results in the on-disk cache",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    blc_parser = subparsers.add_parser(
+        "blc-apply", help="apply black levels on a directory or a list of raw files"
+    )
+    blc_parser.add_argument(
+        "-i", "--input", nargs="+", required=True, help="raw files and / or directories"
+    )
+    blc_parser.add_argument(
+        "-o", "--output", required=True, help="output directory"
+    )
+    blc_parser.add_argument(
+        "-c", "--config", default=DEFAULT_CONFIG_FILE, help="config file"
+    )
+    blc_parser.add_argument(
+        "--levels",
+        nargs=4,
+        type=int,
+        metavar=("R", "GR", "GB", "B"),
+        help="black levels for all the files, default from the config file",
+    )
+    blc_parser.add_argument(
+        "--levels-csv",
+        help="csv file with per-file black levels "
+        "(file, r_offset, gr_offset, gb_offset, b_offset)",
+    )
+    blc_parser.add_argument(
+        "--linear",
+        action="store_true",
+        help="apply linearization with saturation levels from the config file",
+    )
+    blc_parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="total worker processes"
+    )
+    blc_parser.set_defaults(func=blc_apply)
+
+    ae_parser = subparsers.add_parser(
+        "ae-analyze", help="analyze the auto exposure statistics of a set of images"
+    )
+    ae_parser.add_argument(
+        "-i", "--input", nargs="+", required=True, help="images and / or directories"
+    )
+    ae_parser.add_argument(
+        "-c", "--config", default=DEFAULT_CONFIG_FILE, help="config file"
+    )
+    ae_parser.add_argument("--csv", help="save the per-image statistics in a csv file")
+    ae_parser.add_argument(
+        "--save",
+        action="store_true",
+        help="save the proposed AE targets in the config file",
+    )
+    ae_parser.set_defaults(func=ae_analyze)
+
+    awb_parser = subparsers.add_parser(
+        "awb-eval", help="evaluate the AWB estimators against ground truth gains"
+    )
+    awb_parser.add_argument(
+        "-i", "--input", nargs="+", required=True, help="images and / or directories"
+    )
+    awb_parser.add_argument(
+        "-g",
+        "--ground-truth",
+        required=True,
+        help="csv file with the ground truth gains (file, r_gain, b_gain)",
+    )
+    awb_parser.add_argument(
+        "-c", "--config", default=DEFAULT_CONFIG_FILE, help="config file"
+    )
+    awb_parser.add_argument(
+        "--sweep",
+        nargs="*",
+        type=float,
+        metavar="PERCENT",
+        help="sweep the under / overexposed percentages over the given values "
+        f"(default {AwbEvalModule.sweep_percentages}) instead of the config values",
+    )
+    awb_parser.add_argument(
+        "--methods",
+        nargs="+",
+        choices=list(AwbEvalAlgo.methods),
+        help="estimators to evaluate, default all",
+    )
+    awb_parser.add_argument("--csv", help="save the error statistics in a csv file")
+    awb_parser.add_argument(
+        "--save",
+        action="store_true",
+        help=f"save the best thresholds of {AwbEvalAlgo.isp_method} in the config file",
+    )
+    awb_parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="total worker processes"
+    )
+    awb_parser.set_defaults(func=awb_eval)
+
+    mtf_parser = subparsers.add_parser(
+        "mtf", help="measure the slanted edge MTF of ROIs on a set of images"
+    )
+    mtf_parser.add_argument(
+        "-i", "--input", nargs="+", required=True, help="images and / or directories"
+    )
+    mtf_parser.add_argument(
+        "-r",
+        "--roi",
+        nargs=4,
+        type=int,
+        action="append",
+        required=True,
+        metavar=("X", "Y", "W", "H"),
+        help="ROI of a slanted edge, can be repeated",
+    )
+    mtf_parser.add_argument("--csv", help="save the measurements in a csv file")
+    mtf_parser.set_defaults(func=mtf_measure)
+
+    chart_parser = subparsers.add_parser(
+        "chart-calib",
+        help="calculate the WB gains and the CCM of a ColorChecker image "
+        "with a stored patch geometry",
+    )
+    chart_parser.add_argument("-i", "--input", required=True, help="ColorChecker image")
+    chart_parser.add_argument(
+        "-p",
+        "--patches",
+        required=True,
+        help="patch geometry json file (saved from the selection frame)",
+    )
+    chart_parser.add_argument(
+        "-c", "--config", default=DEFAULT_CONFIG_FILE, help="config file"
+    )
+    chart_parser.add_argument(
+        "--raw-stats",
+        action="store_true",
+        help="calculate the statistics on the raw Bayer data (black levels "
+        "from the config file)",
+    )
+    chart_parser.add_argument(
+        "--ccm", action="store_true", help="also calculate the CCM (white balanced)"
+    )
+    chart_parser.add_argument(
+        "--save", action="store_true", help="save the results in the config file"
+    )
+    chart_parser.set_defaults(func=chart_calibrate)
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="benchmark the algorithms on synthetic bayer frames"
+    )
+    bench_parser.add_argument(
+        "--sizes", nargs="+", choices=list(BENCH_SIZES), help="frame sizes (default: all)"
+    )
+    bench_parser.add_argument(
+        "--bayers", nargs="+", choices=BENCH_BAYERS, help="bayer patterns (default: all)"
+    )
+    bench_parser.add_argument(
+        "--bits", nargs="+", type=int, choices=range(8, 17), metavar="BITS",
+        help=f"bit depths (default: {' '.join(str(bits) for bits in BENCH_BITS)})",
+    )
+    bench_parser.add_argument(
+        "--benchmarks",
+        nargs="+",
+        choices=FRAME_BENCHMARKS + SUITE_BENCHMARKS,
+        help="benchmarks to run (default: all)",
+    )
+    bench_parser.add_argument(
+        "--repeat", type=int, default=3, help="measured runs of each case"
+    )
+    bench_parser.add_argument(
+        "--quick", action="store_true", help="2MP, RGGB and 12 bits frames only"
+    )
+    bench_parser.add_argument(
+        "-c",
+        "--config",
+        default=DEFAULT_CONFIG_FILE,
+        help="config file of the yaml and .h benchmarks",
+    )
+    bench_parser.add_argument("-o", "--output", help="save the results in a json file")
+    bench_parser.add_argument(
+        "--baseline", help="json results to compare with, exits with 1 on regressions"
+    )
+    bench_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="max allowed increase (ratio) of the time and allocations",
+    )
+    bench_parser.set_defaults(func=bench)
+
+    synth_parser = subparsers.add_parser(
+        "synth", help="generate synthetic ColorChecker raw files with ground truth"
+    )
+    synth_parser.add_argument("-o", "--output", required=True, help="output directory")
+    synth_parser.add_argument("--name", default="synth", help="name of the raw files")
+    synth_parser.add_argument(
+        "--size", nargs=2, type=int, default=[1920, 1080], metavar=("W", "H"),
+        help="frame size",
+    )
+    synth_parser.add_argument(
+        "--bits", nargs="+", type=int, default=[12], choices=range(8, 17), metavar="BITS",
+        help="bit depths, a file is generated for each bit depth and bayer pattern",
+    )
+    synth_parser.add_argument(
+        "--bayer", nargs="+", default=["RGGB"], choices=BENCH_BAYERS, help="bayer patterns"
+    )
+    synth_parser.add_argument(
+        "--black-level", type=int, default=None, help="black level (default: 16 at 8 bits)"
+    )
+    synth_parser.add_argument(
+        "--wb-gains", nargs=2, type=float, default=[1.0, 1.0], metavar=("R", "B"),
+        help="white balance gains of the color cast",
+    )
+    synth_parser.add_argument(
+        "--crosstalk", type=float, default=0.0, help="color mixing ratio between the channels"
+    )
+    synth_parser.add_argument(
+        "--exposure", type=float, default=0.8,
+        help="G level of the white patch (0 for a dark frame)",
+    )
+    synth_parser.add_argument(
+        "--full-well", type=float, default=10000, help="electrons at the max level"
+    )
+    synth_parser.add_argument(
+        "--read-noise", type=float, default=3.0, help="read noise std in electrons"
+    )
+    synth_parser.add_argument("--seed", type=int, default=0, help="seed of the noise")
+    synth_parser.add_argument(
+        "--chart", default=DEFAULT_LAYOUT_NAME, choices=list(get_chart_layouts()),
+        help="layout of the chart",
+    )
+    synth_parser.set_defaults(func=synth)
+
+    return parser
+
+
+def main():
+    """
+    Parse the arguments and run the selected command.
+    """
+    args = get_parser().parse_args()
+    if args.profile:
+        profiler.enable(args.profile)
+    if args.profile_memory:
+        profiler.enable_memory(args.profile_memory)
+    if args.no_cache:
+        result_cache.enabled = False
+
+    exit_code = args.func(args)
+    profiler.end_run(args.command)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())